@@ -1,6 +1,10 @@
 import json
 import os
+import threading
 import time
+from dotenv import load_dotenv
+
+load_dotenv() # STATE_BUS must be set the same way in the engine and the dashboard
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 CONFIG_FILE = os.path.join(BASE_DIR, 'data', 'config.json')
@@ -13,30 +17,82 @@ DEFAULT_CONFIG = {
     "max_open_positions": 1
 }
 
-def load_config():
-    """Reads config.json or returns defaults"""
+# Engine <-> dashboard channels (see state_bus.py). STATE_BUS=off (or no shared memory on this
+# host) falls back to the JSON files alone. config.json stays the persistent copy of the config:
+# the engine re-publishes it at startup (reload_config), so edits made while it was stopped apply.
+_channels = {}
+_channels_lock = threading.Lock()
+
+def channel(kind):
+    """Shared-memory channel 'status' / 'config', or None when the bus is unavailable"""
+    with _channels_lock:
+        if kind not in _channels:
+            _channels[kind] = None
+            prefix = os.getenv("STATE_BUS", "btc_bot") # read on first use, after .env is loaded
+            if prefix.lower() != "off":
+                try:
+                    from app.config.state_bus import StateChannel
+                    _channels[kind] = StateChannel(f"{prefix}_{kind}")
+                except (ImportError, OSError) as e:
+                    print(f"State bus unavailable ({e}), using {kind} file")
+        return _channels[kind]
+
+def config_version():
+    """Changes on every save_config (None without the bus)"""
+    bus = channel("config")
+    return bus.version() if bus else None
+
+def write_json(path, data, **kwargs):
+    """Atomic write: readers see the old or the new file, never a partial one"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp, path)
+
+def read_config_file():
+    """config.json, created with the defaults if missing"""
     if not os.path.exists(CONFIG_FILE):
         save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
+        return dict(DEFAULT_CONFIG)
     
     try:
         with open(CONFIG_FILE, 'r') as f:
             return json.load(f)
     except Exception:
-        return DEFAULT_CONFIG
+        return dict(DEFAULT_CONFIG)
+
+def load_config():
+    """Latest config from the bus (no disk I/O); config.json or defaults before the first publish"""
+    bus = channel("config")
+    if bus:
+        version, config = bus.read()
+        if version:
+            return dict(config)
+    return reload_config()
+
+def reload_config():
+    """Reads config.json and re-publishes it on the bus (engine startup: the file wins over a stale segment)"""
+    config = read_config_file()
+    bus = channel("config")
+    if bus:
+        bus.publish(config)
+    return config
 
 def save_config(config_dict):
-    """Writes config.json"""
+    """Publishes the config to the engine (picked up within ~50ms) and persists config.json"""
+    bus = channel("config")
+    if bus:
+        bus.publish(config_dict)
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config_dict, f, indent=4)
+        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
+        write_json(CONFIG_FILE, config_dict, indent=4)
     except Exception as e:
         print(f"Error saving config: {e}")
 
 from datetime import datetime, timedelta, timezone
 
 def update_status(data):
-    """Writes status.json (Price, Balance, etc.)"""
+    """Publishes the engine status (Price, Balance, etc.) on the bus, or writes status.json without it"""
     # specific fields expected: price, balance, position, last_update
     
     # IST = UTC + 5:30
@@ -44,27 +100,37 @@ def update_status(data):
     data["last_updated"] = datetime.now(ist_offset).strftime("%Y-%m-%d %H:%M:%S")
     
     try:
-        with open(STATUS_FILE, 'w') as f:
-            json.dump(data, f)
+        bus = channel("status")
+        if bus:
+            bus.publish(data)
+        else:
+            write_json(STATUS_FILE, data)
     except Exception as e:
         print(f"Error saving status: {e}")
 
-def get_status():
-    """Reads status.json"""
-    defaults = {
-        "price": 0.0, 
-        "balance": "Loading...", 
-        "position": "FLAT", 
-        "strategy": "Initializing...", 
-        "last_updated": "-",
-        "active_config": {
-            "take_profit_pct": 1.0, 
-            "stop_loss_pct": 0.5
-        }
+DEFAULT_STATUS = {
+    "price": 0.0, 
+    "balance": "Loading...", 
+    "position": "FLAT", 
+    "strategy": "Initializing...", 
+    "last_updated": "-",
+    "active_config": {
+        "take_profit_pct": 1.0, 
+        "stop_loss_pct": 0.5
     }
+}
+
+def get_status():
+    """Latest engine status (from memory when the bus is up)"""
+    defaults = DEFAULT_STATUS
+    
+    bus = channel("status")
+    if bus:
+        version, data = bus.read()
+        return {**defaults, **data} if version else dict(defaults)
     
     if not os.path.exists(STATUS_FILE):
-        return defaults
+        return dict(defaults)
         
     try:
         with open(STATUS_FILE, 'r') as f:
@@ -72,4 +138,4 @@ def get_status():
             # Merge to ensure all keys exist
             return {**defaults, **data}
     except Exception:
-        return defaults
+        return dict(defaults)
@@ -0,0 +1,82 @@
+import json
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+# Versioned state shared between the engine and dashboard processes through shared memory.
+# One segment per channel: [seq u64][length u32][JSON payload]. Writers use a seqlock (seq odd
+# while writing, even when done), so readers retry instead of ever returning a half-written
+# snapshot. version = seq // 2: polling it costs one 8-byte read from memory, no disk I/O,
+# which is how readers get change notifications. Segments outlive both processes (like the
+# old status.json) until reboot or unlink().
+
+HEADER = struct.Struct("<QI")
+
+class StateChannel:
+    def __init__(self, name, size=65536):
+        self.name = name
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self.shm = shared_memory.SharedMemory(name=name) # the other process created it
+        # Both processes attach, neither owns it: keep the resource tracker from unlinking it at exit
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.buf = self.shm.buf
+        self.lock = threading.Lock() # writers within this process
+        self.cached = (0, None) # last decoded snapshot (re-used while the version is unchanged)
+
+    def seq(self):
+        return HEADER.unpack_from(self.buf, 0)[0]
+
+    def version(self):
+        """Number of completed publishes (0 = nothing published yet)"""
+        return self.seq() // 2
+
+    def publish(self, data):
+        """Writes a new snapshot. Returns its version."""
+        payload = json.dumps(data, default=str).encode()
+        if HEADER.size + len(payload) > len(self.buf):
+            raise ValueError(f"{self.name}: snapshot of {len(payload)} bytes exceeds the segment")
+        with self.lock:
+            seq = self.seq()
+            seq += seq % 2 # a writer died mid-write: start over from the next even value
+            HEADER.pack_into(self.buf, 0, seq + 1, 0) # odd = write in progress
+            self.buf[HEADER.size:HEADER.size + len(payload)] = payload
+            HEADER.pack_into(self.buf, 0, seq + 2, len(payload))
+        return (seq + 2) // 2
+
+    def read(self, retries=1000):
+        """(version, data). Only ever returns a complete snapshot (or the last one seen)."""
+        for _ in range(retries):
+            seq, length = HEADER.unpack_from(self.buf, 0)
+            if seq // 2 == self.cached[0] and seq % 2 == 0:
+                return self.cached
+            if seq % 2:
+                time.sleep(0) # writer mid-update
+                continue
+            payload = bytes(self.buf[HEADER.size:HEADER.size + length])
+            if HEADER.unpack_from(self.buf, 0)[0] != seq:
+                continue # overwritten while copying
+            self.cached = (seq // 2, json.loads(payload) if length else None)
+            return self.cached
+        return self.cached
+
+    def wait(self, version, timeout=None, poll=0.02):
+        """Blocks until the version moves past `version`. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.version() == version:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self):
+        """Removes the segment (tests / reset)"""
+        shm = shared_memory.SharedMemory(name=self.name)
+        shm.close()
+        shm.unlink()
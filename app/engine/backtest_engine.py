@@ -1,14 +1,74 @@
 import pandas as pd
 import numpy as np
 
+from app.engine.ledger import Position, TradeLedger
+from app.engine.performance import bar_metrics, drawdown, equity_curve
+from app.storage.candle_store import candle_hash, to_ms
+
+def first_exit_index(close, start, take_profit=None, stop_loss=None, exit_mask=None, high=None, low=None):
+    """First bar >= start whose close hits a barrier or exit signal (-1 if none).
+    With high/low given, take-profit is checked against the high and stop-loss against the low.
+    Scans in growing chunks so short holds stay cheap and long holds stay vectorized."""
+    n = len(close)
+    tp_source = close if high is None else high
+    sl_source = close if low is None else low
+    chunk = 64
+    while start < n:
+        stop = min(start + chunk, n)
+        hit = np.zeros(stop - start, dtype=bool)
+        if take_profit is not None:
+            hit |= tp_source[start:stop] >= take_profit
+        if stop_loss is not None:
+            hit |= sl_source[start:stop] <= stop_loss
+        if exit_mask is not None:
+            hit |= exit_mask[start:stop]
+            
+        if hit.any():
+            return start + int(hit.argmax())
+        start = stop
+        chunk = min(chunk * 2, 65536)
+    return -1
+
+def trade_stats(pnls, final_equity, start_equity=10000.0):
+    """Headline stats from per-trade PnL (same equity-curve drawdown as BacktestEngine.report)"""
+    pnl = np.asarray(pnls, dtype=np.float64)
+    equity_curve = start_equity + np.r_[0.0, np.cumsum(pnl)]
+    running_max = np.maximum.accumulate(equity_curve)
+    return {
+        'trades': len(pnl),
+        'win_rate': float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+        'return_pct': (final_equity - start_equity) / start_equity * 100,
+        'max_drawdown_pct': float(((equity_curve - running_max) / running_max).min() * 100),
+        'final_equity': final_equity,
+    }
+
 class BacktestEngine:
-    def __init__(self, strategy, historical_data, compounding=False):
+    # We need enough data for lookback
+    min_lookback = 200 # increased for EMA 200 checks
+
+    def __init__(self, strategy, historical_data, compounding=False, mode="auto", trade_start=None,
+                 exits="close", sub_bars=None, costs=None):
         self.strategy = strategy
         self.data = historical_data
         self.position = None
-        self.trades = []
+        self.trades = TradeLedger()
         self.equity = 10000.0  # Starting capital
         self.compounding = compounding
+        # "loop" = per-candle should_enter/should_exit, "vectorized" = whole-column signals,
+        # "auto" = vectorized when the strategy supports it
+        self.mode = mode
+        # Optional first candle that may open a trade (earlier rows only warm up indicators)
+        self.trade_start = trade_start
+        # "close" = TP/SL checked on candle closes, "high_low" = barriers touched intra-candle.
+        # sub_bars (finer CandleStore or DataFrame) decide bars where both barriers were touched.
+        self.exits = exits
+        self.sub_bars = sub_bars
+        self.sub_bar_columns = None
+        self.intrabar = {'ambiguous': 0, 'resolved': 0}
+        # Optional CostModel (fees, spread/slippage, fill latency); None = frictionless fills at close
+        self.costs = costs
+        self.bar_time = np.empty(0, dtype=np.int64)
+        self.bar_close = np.empty(0)
 
     def run(self):
         print(f"Starting backtest with ${self.equity:.2f} (Compounding: {self.compounding})")
@@ -19,16 +79,81 @@ class BacktestEngine:
              self.data["timestamp"] = pd.to_datetime(self.data["timestamp"])
              
         full_df = self.strategy.indicators(self.data)
+        # Bar grid kept for the per-bar equity curve / stored results
+        self.bar_time = to_ms(full_df["timestamp"])
+        self.bar_close = full_df["close"].to_numpy(dtype=np.float64)
+        if self.trade_start is not None:
+            warmup_rows = int((full_df["timestamp"] < pd.Timestamp(self.trade_start)).sum())
+            self.min_lookback = max(self.min_lookback, warmup_rows)
         
-        # We need enough data for lookback
-        min_lookback = 200 # increased for EMA 200 checks
+        entries = None
+        if self.mode != "loop":
+            entries = self.strategy.entry_signals(full_df)
+            if entries is None and self.mode == "vectorized":
+                print(f"Strategy {self.strategy.name} has no vectorized signals. Falling back to loop mode.")
         
-        print("Running simulation...")
+        if entries is None and self.exits == "high_low":
+            print("Intra-candle exits need vectorized signals. Using close-based exits.")
+        if entries is None and self.costs is not None and self.costs.latency_bars:
+            print("Fill latency needs vectorized signals. Loop mode fills at the signal candle.")
         
+        if entries is not None:
+            print(f"Running simulation (vectorized, {self.exits} exits)...")
+            self.run_vectorized(full_df, entries)
+        else:
+            print("Running simulation...")
+            # Pre-score ML candidates in one batch so should_enter is a cache lookup
+            if hasattr(self.strategy, 'score_breakouts'):
+                self.strategy.score_breakouts(full_df)
+            self.run_loop(full_df)
+            
+        self.report()
+
+    def entry_capital(self):
         # Fixed Stake Amount (Non-Compounding)
         fixed_stake = 10000.0
         
-        for i in range(min_lookback, len(full_df)):
+        # Capital Sizing
+        if self.compounding:
+            return self.equity # All in (or manageable portion)
+        return min(fixed_stake, self.equity)
+
+    def close_position(self, exit_price, current_time, liquidity="taker", bar_volume=None):
+        # Simulate Sell
+        fees = self.position.fees
+        slippage = self.position.slippage
+        if self.costs is not None:
+            fill = self.costs.fill_price("sell", exit_price, self.position.size, bar_volume, liquidity)
+            slippage += self.position.size * (exit_price - fill)
+            fees += self.costs.fee(self.position.size * fill, liquidity)
+            exit_price = fill
+        
+        pnl_pct = (exit_price - self.position.entry) / self.position.entry
+        pnl_amount = self.position.size * (exit_price - self.position.entry)
+        if self.costs is not None:
+            pnl_amount -= fees
+        
+        self.equity += pnl_amount
+        
+        self.trades.append(self.position.entry, exit_price, pnl_amount, pnl_pct, self.position.entry_time,
+                           current_time, self.position.size, fees, slippage)
+        self.position = None
+
+    def open_position(self, entry_price, current_time, bar_volume=None):
+        entry_capital = self.entry_capital()
+        fees = slippage = 0.0
+        if self.costs is not None:
+            # Market buy of the stake: spread/slippage raise the fill, the fee is paid on top
+            fill = self.costs.fill_price("buy", entry_price, entry_capital / entry_price, bar_volume)
+            slippage = entry_capital / fill * (fill - entry_price)
+            fees = self.costs.fee(entry_capital)
+            entry_price = fill
+        self.position = Position(entry_price, entry_capital / entry_price, current_time,
+                                 entry_capital, fees, slippage)
+
+    def run_loop(self, full_df):
+        """Per-candle simulation: calls should_enter/should_exit on a growing window"""
+        for i in range(self.min_lookback, len(full_df)):
             if i % 1000 == 0:
                 print(f"Processing candle {i}/{len(full_df)}...", end='\r')
 
@@ -36,48 +161,166 @@ class BacktestEngine:
             window_with_indicators = full_df.iloc[:i+1]
             current_close = window_with_indicators["close"].iloc[-1]
             current_time = window_with_indicators["timestamp"].iloc[-1] 
+            current_volume = window_with_indicators["volume"].iloc[-1]
 
             if not self.position:
                 if self.strategy.should_enter(window_with_indicators):
-                    # Capital Sizing
-                    if self.compounding:
-                        entry_capital = self.equity # All in (or manageable portion)
-                    else:
-                        entry_capital = min(fixed_stake, self.equity)
-                    
-                    self.position = type('Position', (), {
-                        'entry': current_close, 
-                        'size': entry_capital / current_close,
-                        'entry_time': current_time,
-                        'capital': entry_capital
-                    })
+                    self.open_position(current_close, current_time, bar_volume=current_volume)
             else:
                 if self.strategy.should_exit(window_with_indicators, self.position):
-                    # Simulate Sell
-                    exit_price = current_close
-                    pnl_pct = (exit_price - self.position.entry) / self.position.entry
-                    pnl_amount = self.position.size * (exit_price - self.position.entry)
-                    
-                    self.equity += pnl_amount
-                    
-                    duration = current_time - self.position.entry_time
-                    
-                    self.trades.append({
-                        'entry': self.position.entry, 
-                        'exit': exit_price, 
-                        'pnl': pnl_amount, 
-                        'pnl_pct': pnl_pct, 
-                        'entry_time': self.position.entry_time,
-                        'exit_time': current_time,
-                        'duration': duration
-                    })
-                    self.position = None
+                    self.close_position(current_close, current_time, bar_volume=current_volume)
 
+    def run_vectorized(self, full_df, entries):
+        """Event-driven simulation over whole-column signals.
+        Jumps from entry to exit instead of visiting every candle; matches run_loop trade-for-trade."""
+        close = full_df["close"].to_numpy(dtype=np.float64)
+        timestamps = full_df["timestamp"]
+        
+        entries = np.asarray(entries, dtype=bool).copy()
+        entries[:self.min_lookback] = False
+        entry_rows = np.flatnonzero(entries)
+        
+        exit_mask = self.strategy.exit_signals(full_df)
+        if exit_mask is not None:
+            exit_mask = np.asarray(exit_mask, dtype=bool)
+        take_profit, stop_loss = self.strategy.exit_barriers()
+        
+        high = low = None
+        if self.exits == "high_low":
+            high = full_df["high"].to_numpy(dtype=np.float64)
+            low = full_df["low"].to_numpy(dtype=np.float64)
+            open_ = full_df["open"].to_numpy(dtype=np.float64)
+            bar_ms = int(np.median(np.diff(timestamps.to_numpy().astype("datetime64[ms]").astype(np.int64)))) if len(full_df) > 1 else 0
+        
+        volume = full_df["volume"].to_numpy(dtype=np.float64)
+        latency = self.costs.latency_bars if self.costs is not None else 0
+        
+        cursor = self.min_lookback
+        while True:
+            # 1. Next entry at or after the cursor (filled `latency` bars after the signal)
+            k = np.searchsorted(entry_rows, cursor)
+            if k >= len(entry_rows):
+                break
+            i = entry_rows[k] + latency
+            if i >= len(close):
+                break
+            self.open_position(close[i], timestamps.iloc[i], bar_volume=volume[i])
+            
+            # 2. First exit strictly after the entry candle
+            entry = self.position.entry
+            tp_price = entry * take_profit if take_profit is not None else None
+            sl_price = entry * stop_loss if stop_loss is not None else None
+            j = first_exit_index(close, i + 1, tp_price, sl_price, exit_mask, high=high, low=low)
+            if j < 0:
+                break # Still holding at the end of data (same as loop mode)
+            
+            exit_price = close[j]
+            liquidity = "taker"
+            resting = False
+            if high is not None:
+                tp_hit = tp_price is not None and high[j] >= tp_price
+                sl_hit = sl_price is not None and low[j] <= sl_price
+                if tp_hit and sl_hit:
+                    tp_hit = self.tp_first(timestamps.iloc[j], bar_ms, tp_price, sl_price)
+                    sl_hit = not tp_hit
+                # Resting orders fill at the barrier, or at the open when the bar gaps through it
+                if sl_hit:
+                    exit_price = min(open_[j], sl_price)
+                    resting = True
+                elif tp_hit:
+                    exit_price = max(open_[j], tp_price)
+                    liquidity = "maker" # TP limit order already on the book
+                    resting = True
+            
+            if not resting and latency:
+                # Close-based decisions are sent after the candle closes
+                j += latency
+                if j >= len(close):
+                    break
+                exit_price = close[j]
+            
+            self.close_position(exit_price, timestamps.iloc[j], liquidity=liquidity, bar_volume=volume[j])
+            cursor = j + 1
+
+    def tp_first(self, bar_time, bar_ms, tp_price, sl_price):
+        """Whether take-profit came first inside a bar that touched both barriers.
+        Replays the finer sub-bars of that bar; without them (or if still ambiguous) assumes stop-loss first."""
+        self.intrabar['ambiguous'] += 1
+        if self.sub_bars is None or bar_ms <= 0:
+            return False
+        
+        if self.sub_bar_columns is None:
+            source = self.sub_bars
+            if isinstance(source, pd.DataFrame):
+                self.sub_bar_columns = {
+                    "timestamp": to_ms(source["timestamp"]),
+                    **{c: source[c].to_numpy(dtype=np.float64) for c in ["high", "low", "close"]}
+                }
+            else: # CandleStore: memory-mapped columns, only the touched bars are paged in
+                self.sub_bar_columns = {c: source.column(c) for c in ["timestamp", "high", "low", "close"]}
+        cols = self.sub_bar_columns
+        
+        start_ms = int(pd.Timestamp(bar_time).value // 1_000_000)
+        lo, hi = np.searchsorted(cols["timestamp"], [start_ms, start_ms + bar_ms])
+        if hi <= lo:
+            return False
+        
+        high, low = np.asarray(cols["high"][lo:hi]), np.asarray(cols["low"][lo:hi])
+        k = first_exit_index(np.asarray(cols["close"][lo:hi]), 0, tp_price, sl_price, high=high, low=low)
+        if k < 0 or (high[k] >= tp_price and low[k] <= sl_price):
+            return False
+        self.intrabar['resolved'] += 1
+        return bool(high[k] >= tp_price)
+
+    def summary(self):
+        """Headline stats of the finished run as a dict (one row of a results table)"""
+        stats = trade_stats(self.trades.column('pnl'), self.equity)
+        stats['fees'] = float(self.trades.column('fees').sum())
+        stats['slippage'] = float(self.trades.column('slippage').sum())
+        return stats
+
+    def trade_table(self):
+        """Trades as columns (times in epoch ms) -- the stored / vectorized form of self.trades"""
+        records = self.trades.records
+        table = {c: records[c].copy() for c in ['entry', 'exit', 'pnl', 'pnl_pct', 'size', 'fees', 'slippage']}
+        for c in ['entry_time', 'exit_time']:
+            table[c] = records[c].astype(np.int64) // 1_000_000
+        return table
+
+    def equity_curve(self):
+        """(equity, in_position) per bar of the simulated frame, marked to market at each close"""
+        open_position = None
+        if self.position is not None:
+            open_position = (int(pd.Timestamp(self.position.entry_time).value // 1_000_000),
+                             self.position.entry, self.position.size)
+        return equity_curve(self.bar_time, self.bar_close, self.trade_table(), 10000.0, open_position)
+
+    def metrics(self):
+        """summary() plus per-bar metrics (Sharpe, Sortino, exposure, bar drawdown)"""
+        equity, in_position = self.equity_curve()
+        return {**self.summary(), **bar_metrics(self.bar_time, equity, in_position)}
+
+    def result(self, params=None):
+        """Everything a stored run needs: trades, equity curve, metrics, parameters and data hash"""
+        equity, in_position = self.equity_curve()
+        return {
+            'strategy': self.strategy.name,
+            'params': {'compounding': self.compounding, 'mode': self.mode, 'exits': self.exits,
+                       'costs': vars(self.costs) if self.costs is not None else None, **(params or {})},
+            'data_hash': candle_hash(self.data),
+            'metrics': {**self.summary(), **bar_metrics(self.bar_time, equity, in_position)},
+            'trades': self.trade_table(),
+            'bar_time': self.bar_time,
+            'equity': equity,
+            'in_position': in_position,
+        }
+
+    def report(self):
         print(f"Backtest finished.")
         print(f"Final Equity: ${self.equity:.2f}")
         
         if self.trades:
-            trades_df = pd.DataFrame(self.trades)
+            trades_df = self.trades.to_frame()
             
             # Stats Calculation
             if len(trades_df) > 0:
@@ -87,20 +330,27 @@ class BacktestEngine:
                 print(f"Win Rate: {len(trades_df[trades_df['pnl'] > 0]) / len(trades_df) * 100:.2f}%")
                 print(f"Avg Hold Time: {pd.to_timedelta(trades_df['duration']).mean()}")
                 print(f"Max Loss (Single Trade): ${trades_df['pnl'].min():.2f}")
+                if self.costs is not None:
+                    # Fee drag: what the same fills would have made without fees
+                    fees = trades_df['fees'].sum()
+                    gross = trades_df['pnl'].sum() + fees
+                    print(f"Gross PnL (before fees): ${gross:,.2f}")
+                    print(f"Fees Paid (Fee Drag): ${fees:,.2f} ({fees / 10000 * 100:.2f}% of starting capital)")
+                    print(f"Spread/Slippage Cost: ${trades_df['slippage'].sum():,.2f} "
+                          f"(Latency: {self.costs.latency_bars} bars)")
+                if self.intrabar['ambiguous']:
+                    print(f"Bars Touching Both TP/SL: {self.intrabar['ambiguous']} "
+                          f"({self.intrabar['resolved']} decided by sub-bars, rest assumed SL first)")
                 
-                # Reconstruct Equity Curve for Drawdown
-                equity_curve = [10000.0]
-                current_eq = 10000.0
-                for pnl in trades_df['pnl']:
-                    current_eq += pnl
-                    equity_curve.append(current_eq)
-                
-                equity_series = pd.Series(equity_curve)
-                running_max = equity_series.cummax()
-                drawdown = (equity_series - running_max) / running_max
-                max_drawdown_pct = drawdown.min() * 100
+                # Equity Curve for Drawdown (trade-to-trade, and marked to market per bar)
+                closed_equity = 10000.0 + np.r_[0.0, np.cumsum(trades_df['pnl'].to_numpy())]
+                max_drawdown_pct = drawdown(closed_equity).min() * 100
+                bar_stats = self.metrics()
                  
                 print(f"Max Drawdown (Portfolio): {max_drawdown_pct:.2f}%")
+                print(f"Max Drawdown (Per Bar): {bar_stats['max_drawdown_bar_pct']:.2f}%")
+                print(f"Sharpe: {bar_stats['sharpe']:.2f} | Sortino: {bar_stats['sortino']:.2f} | "
+                      f"Exposure: {bar_stats['exposure_pct']:.1f}%")
                 print(f"Final Return: {(self.equity - 10000) / 10000 * 100:.2f}%")
 
                 # --- Monthly Breakdown ---
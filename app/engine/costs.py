@@ -0,0 +1,33 @@
+class CostModel:
+    """Trading costs applied to simulated fills.
+    - Fees: maker (resting limit orders, e.g. a TP already on the book) or taker (market orders)
+    - Spread: half of spread_bps paid on every taker fill
+    - Slippage: proportional to the order's share of the candle's volume, capped at max_slippage
+    - Latency: bars between the decision (candle close) and the fill"""
+
+    def __init__(self, maker_fee=0.0, taker_fee=0.0, spread_bps=0.0, volume_impact=0.0,
+                 max_slippage=0.005, latency_bars=0):
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.spread_bps = spread_bps
+        self.volume_impact = volume_impact
+        self.max_slippage = max_slippage
+        self.latency_bars = latency_bars
+
+    @classmethod
+    def binance_spot(cls, latency_bars=0):
+        """Binance spot VIP0: 0.10% maker/taker, ~1bp BTC spread, light volume impact"""
+        return cls(maker_fee=0.001, taker_fee=0.001, spread_bps=1.0, volume_impact=0.1,
+                   latency_bars=latency_bars)
+
+    def fee(self, notional, liquidity="taker"):
+        return notional * (self.maker_fee if liquidity == "maker" else self.taker_fee)
+
+    def fill_price(self, side, price, qty, bar_volume=None, liquidity="taker"):
+        """Price actually received for a market order of qty (resting maker orders fill at price)"""
+        if liquidity == "maker":
+            return price
+        cost = self.spread_bps / 2 / 10000
+        if self.volume_impact and bar_volume:
+            cost += min(self.max_slippage, self.volume_impact * qty / bar_volume)
+        return price * (1 + cost) if side == "buy" else price * (1 - cost)
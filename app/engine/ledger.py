@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Compact position / trade bookkeeping shared by BacktestEngine and the live executor.
+# Position is a __slots__ object (no per-instance dict, picklable, cheap to snapshot);
+# closed trades go into one growable NumPy structured array instead of a list of dicts.
+
+TRADE_DTYPE = np.dtype([
+    ('entry', 'f8'), ('exit', 'f8'), ('pnl', 'f8'), ('pnl_pct', 'f8'),
+    ('entry_time', 'M8[ns]'), ('exit_time', 'M8[ns]'),
+    ('size', 'f8'), ('fees', 'f8'), ('slippage', 'f8'),
+])
+
+class Position:
+    __slots__ = ('entry', 'size', 'entry_time', 'capital', 'fees', 'slippage')
+
+    def __init__(self, entry, size, entry_time=None, capital=None, fees=0.0, slippage=0.0):
+        self.entry = entry
+        self.size = size
+        self.entry_time = entry_time
+        self.capital = entry * size if capital is None else capital
+        self.fees = fees
+        self.slippage = slippage
+
+    def snapshot(self):
+        """Plain tuple of the position state (for queues, pipes and status files)"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def restore(cls, snapshot):
+        return cls(*snapshot)
+
+    def __repr__(self):
+        return f"Position(entry={self.entry}, size={self.size}, entry_time={self.entry_time})"
+
+class TradeLedger:
+    """Append-only trade table backed by a preallocated structured array (doubles when full)"""
+
+    def __init__(self, capacity=1024):
+        self.data = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self.count = 0
+
+    def append(self, entry, exit, pnl, pnl_pct, entry_time, exit_time, size, fees=0.0, slippage=0.0):
+        if self.count == len(self.data):
+            grown = np.zeros(max(1, 2 * len(self.data)), dtype=TRADE_DTYPE)
+            grown[:self.count] = self.data
+            self.data = grown
+        self.data[self.count] = (entry, exit, pnl, pnl_pct, pd.Timestamp(entry_time).to_datetime64(),
+                                 pd.Timestamp(exit_time).to_datetime64(), size, fees, slippage)
+        self.count += 1
+
+    @property
+    def records(self):
+        """View of the filled rows (no copy)"""
+        return self.data[:self.count]
+
+    def column(self, name):
+        return self.records[name]
+
+    def to_frame(self):
+        df = pd.DataFrame(self.records)
+        df['duration'] = df['exit_time'] - df['entry_time']
+        return df
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """One trade as a dict (same keys as the old list-of-dicts ledger, plus duration)"""
+        row = self.records[i]
+        trade = {name: float(row[name]) for name in TRADE_DTYPE.names if not name.endswith('_time')}
+        trade['entry_time'] = pd.Timestamp(row['entry_time'])
+        trade['exit_time'] = pd.Timestamp(row['exit_time'])
+        trade['duration'] = trade['exit_time'] - trade['entry_time']
+        return trade
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
@@ -1,13 +1,16 @@
+import asyncio
 import time
 import logging
 from datetime import datetime
 import math
-from app.config.dynamic_config import update_status, load_config
+import pandas as pd
+from app.config.dynamic_config import update_status, load_config, reload_config, config_version
+from app.monitoring.metrics import Metrics
 
 # ... (Logging setup remains) ...
 
 class LiveEngine:
-    def __init__(self, strategy, data_feed, executor, risk):
+    def __init__(self, strategy, data_feed, executor, risk, metrics=None):
         self.strategy = strategy
         self.data_feed = data_feed
         self.executor = executor
@@ -16,10 +19,35 @@ class LiveEngine:
         self.timeframe_map = {"1m": 60, "5m": 300}
         self.interval_seconds = self.timeframe_map.get(strategy.timeframe_str, 60)
         
+        # Incremental indicators (None = strategy recomputes over a fresh 300-candle fetch)
+        self.indicator_state = strategy.streaming_indicators()
+        self.warmup_candles = 500 # 200 for SMA 200 + enough ready rows for the strategy lookback
+        
+        # Config and account state are refreshed by background tasks; the candle-close path
+        # only reads these cached values (order placement is the one REST call after a signal)
+        self.config = {}
+        self.config_seen = None # state bus version of self.config
+        self.config_poll_seconds = 0.05 # version check only (8 bytes of shared memory)
+        self.state_refresh_seconds = 15
+        self.cycle_lock = asyncio.Lock() # config changes land between cycles, never inside one
+        self.background = set() # fire-and-forget tasks (status writes), kept referenced until done
+        
+        # Per-stage latency histograms (saved with every status write, served on /api/metrics)
+        self.metrics = metrics or Metrics()
+        if hasattr(executor, 'attach_metrics'):
+            executor.attach_metrics(self.metrics) # order_submit / order_fill inside the "order" span
+        self.woke = None # perf_counter at the current candle close
+        
         logging.info(f"Engine Initialized. Strategy: {strategy.name} | Interval: {self.interval_seconds}s")
 
-    def sync_time(self):
+    async def sync_time(self):
         """Align with candle close"""
+        if hasattr(self.data_feed, 'wait_for_close'):
+            # Push feed: wake up as soon as the exchange reports the candle closed
+            while not await asyncio.to_thread(self.data_feed.wait_for_close, timeout=self.interval_seconds * 2):
+                logging.warning("No candle close received from stream yet. Still waiting...")
+            return
+            
         now = time.time()
         # Remaining time until next interval
         sleep_time = self.interval_seconds - (now % self.interval_seconds)
@@ -28,20 +56,225 @@ class LiveEngine:
         sleep_time += 1 
         
         logging.info(f"Waiting {sleep_time:.1f}s for candle close...")
-        time.sleep(sleep_time)
+        await asyncio.sleep(sleep_time)
 
-    def run(self):
+    def closed_candles(self, df):
+        """Drop the still-forming candle (exchange returns it as the last row)"""
+        if hasattr(self.data_feed, 'wait_for_close'):
+            # Push feed: only closed klines are buffered, and a host clock running slightly
+            # behind the exchange's must not drop the candle that just closed
+            return df
+        cutoff = pd.Timestamp(time.time() - self.interval_seconds, unit='s')
+        return df[df["timestamp"] <= cutoff]
+
+    def update_indicator_state(self):
+        """Feeds newly closed candles into the streaming indicator state.
+        Only the first cycle (or a gap) fetches the full warmup window."""
+        state = self.indicator_state
+        
+        if state.last_timestamp is None:
+            df = self.data_feed.get_latest(limit=self.warmup_candles)
+            if df is None or df.empty:
+                return None
+            with self.metrics.span("indicators"):
+                state.update_frame(self.closed_candles(df))
+            logging.info(f"Indicator state warmed up with {len(df)} candles.")
+        else:
+            df = self.data_feed.get_latest(limit=5)
+            if df is None or df.empty:
+                return None
+            new = self.closed_candles(df)
+            new = new[new["timestamp"] > state.last_timestamp]
+            
+            # Missed candles (e.g. long outage) -> rebuild from a full warmup
+            if len(new) > 0 and new["timestamp"].iloc[0] - state.last_timestamp > pd.Timedelta(seconds=self.interval_seconds):
+                logging.warning("Candle gap detected. Re-warming indicator state...")
+                self.indicator_state = self.strategy.streaming_indicators()
+                return self.update_indicator_state()
+            with self.metrics.span("indicators"):
+                state.update_frame(new)
+            
+        if not state.ready:
+            return None
+        return state.frame()
+
+    def fetch_candles(self):
+        if self.indicator_state is not None:
+            return self.update_indicator_state()
+        return self.data_feed.get_latest()
+
+    def apply_config(self, config):
+        """Strategy hot-swap and dynamic parameters from the dashboard config"""
+        target_strat = config.get("strategy_name")
+        if target_strat and target_strat != self.strategy.name:
+            logging.info(f">>> SWITCHING STRATEGY: {self.strategy.name} -> {target_strat} <<<")
+            try:
+                from strategies.btc_ml_strategy import BTCMLStrategy1m, BTCMLStrategy5m
+                if target_strat == "btc_ml_1m":
+                    self.strategy = BTCMLStrategy1m()
+                elif target_strat == "btc_ml_5m":
+                    self.strategy = BTCMLStrategy5m()
+                
+                # Update Interval
+                self.interval_seconds = self.timeframe_map.get(self.strategy.timeframe_str, 60)
+                self.indicator_state = self.strategy.streaming_indicators()
+                logging.info(f"Strategy Switched Successfully. New Interval: {self.interval_seconds}s")
+                
+            except Exception as e:
+                logging.error(f"Strategy Switch Failed: {e}")
+
+        # Pass config to strategy if supported
+        if hasattr(self.strategy, 'update_parameters'):
+            self.strategy.update_parameters(config)
+
+    def balance_text(self):
+        balances = getattr(self.executor, 'balances', None)
+        if not balances:
+            return "N/A"
+        return f"${balances.get('USDT', 0):.2f} | {balances.get('BTC', 0):.5f} BTC"
+
+    def write_status(self, status_data, snapshot):
+        update_status(status_data)
+        try:
+            self.metrics.save(snapshot)
+        except Exception as e:
+            logging.warning(f"Metrics save failed: {e}")
+
+    def publish_status(self, last_price):
+        """Publishes the status and saves the metrics snapshot in a worker thread without holding up the cycle"""
+        status_data = {
+            "price": last_price,
+            "balance": self.balance_text(),
+            "position": "LONG" if self.executor.has_position() else "FLAT",
+            "strategy": self.strategy.name,
+            # Add current config for dashboard feedback
+            "active_config": {
+                "take_profit_pct": getattr(self.strategy, 'dynamic_tp', 0) * 100,
+                "stop_loss_pct": getattr(self.strategy, 'dynamic_sl', 0) * 100
+            }
+        }
+        task = asyncio.create_task(asyncio.to_thread(self.write_status, status_data, self.metrics.snapshot()))
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    async def refresh_state(self):
+        """Background refresher: executor balances/price, off the candle-close path"""
+        while True:
+            try:
+                if hasattr(self.executor, 'refresh_state'):
+                    await asyncio.to_thread(self.executor.refresh_state)
+            except Exception as e:
+                logging.warning(f"State refresh failed: {e}")
+            await asyncio.sleep(self.state_refresh_seconds)
+
+    async def watch_config(self):
+        """Applies dashboard config changes as soon as they are published (state bus version moves).
+        Without the bus (version None) config.json is re-read every state_refresh_seconds."""
+        while True:
+            version = None
+            try:
+                version = config_version()
+                if version is None or version != self.config_seen:
+                    self.config_seen = version
+                    config = await asyncio.to_thread(load_config) if version is None else load_config()
+                    if config and config != self.config:
+                        async with self.cycle_lock:
+                            self.config = config
+                            self.apply_config(config)
+                        logging.info(f"Config update applied (v{version})")
+            except Exception as e:
+                logging.warning(f"Config update failed: {e}")
+            await asyncio.sleep(self.state_refresh_seconds if version is None else self.config_poll_seconds)
+
+    async def place_order(self, order, price, **kwargs):
+        with self.metrics.span("order"):
+            await asyncio.to_thread(order, price=price, **kwargs)
+        self.metrics.record("close_to_order", time.perf_counter() - self.woke)
+
+    async def decide(self):
+        """Fetch, indicators, signal, risk, order. Returns the last price (for the status)."""
+        # Candles and 1h trend concurrently (streaming indicator updates are also timed as "indicators")
+        with self.metrics.span("fetch"):
+            df, trend = await asyncio.gather(
+                asyncio.to_thread(self.fetch_candles),
+                asyncio.to_thread(self.data_feed.get_1h_trend)
+            )
+        
+        last_price = 0
+        if df is not None and not df.empty:
+            last_price = df.iloc[-1]["close"]
+        
+        if df is None or len(df) < 200:
+            logging.warning(f"Insufficient data ({len(df) if df is not None else 0} rows). Retrying next cycle.")
+            return last_price
+        
+        # Inject 1H trend
+        df["trend_1h"] = trend
+            
+        # Calculate Indicators (already up to date when streaming)
+        if self.indicator_state is None:
+            with self.metrics.span("indicators"):
+                df = self.strategy.indicators(df)
+        
+        if len(df) == 0:
+            logging.warning("DataFrame empty after indicators (Check dropna). Retrying...")
+            return last_price
+             
+        current_price = df.iloc[-1]["close"]
+        
+        if not self.executor.has_position():
+            # Look for Entry
+            with self.metrics.span("inference"):
+                enter = self.strategy.should_enter(df)
+            if enter:
+                with self.metrics.span("risk"):
+                    allowed = self.risk.can_trade()
+                if allowed:
+                    logging.info(f"SIGNAL DETECTED (BUY) @ {current_price}")
+                    # TP/SL multipliers let the executor rest exits on the exchange (OCO)
+                    barriers = {'barriers': self.strategy.exit_barriers()} if hasattr(self.strategy, 'exit_barriers') else {}
+                    await self.place_order(self.executor.buy, current_price, **barriers)
+        else:
+            # Look for Exit
+            with self.metrics.span("inference"):
+                leave = self.strategy.should_exit(df, self.executor.position)
+            if leave:
+                logging.info(f"SIGNAL DETECTED (SELL) @ {current_price}")
+                await self.place_order(self.executor.sell, current_price)
+        return current_price
+
+    async def cycle(self):
+        """One candle close: candles and 1h trend fetched concurrently, then decide and (maybe) order"""
+        self.woke = time.perf_counter()
+        self.metrics.next_cycle()
+        try:
+            async with self.cycle_lock:
+                last_price = await self.decide()
+        finally:
+            self.metrics.record("cycle", time.perf_counter() - self.woke)
+        
+        # 2. Update Dashboard Status (after the order, not before it)
+        self.publish_status(last_price)
+
+    async def run_async(self):
         logging.info("Starting Live Trading Loop...")
-        self.executor.sync_position()
+        await asyncio.to_thread(self.executor.sync_position)
+        
+        # First config + balance fetch, then keep both current in the background
+        # config.json is authoritative at startup (the bus segment may hold an older run's config)
+        self.config = await asyncio.to_thread(reload_config)
+        self.config_seen = config_version()
+        self.apply_config(self.config)
+        refresher = asyncio.create_task(self.refresh_state())
+        watcher = asyncio.create_task(self.watch_config())
         
         # Initial Status Update (So Dashboard isn't empty during first wait)
         try:
             logging.info("Performing initial dashboard update...")
-            df_init = self.data_feed.get_latest()
+            df_init = await asyncio.to_thread(self.data_feed.get_latest)
             if df_init is not None and not df_init.empty:
-                init_price = df_init.iloc[-1]["close"]
                 update_status({
-                    "price": init_price,
+                    "price": df_init.iloc[-1]["close"],
                     "balance": "Syncing...",
                     "position": "LONG" if self.executor.has_position() else "FLAT",
                     "strategy": self.strategy.name, 
@@ -50,102 +283,20 @@ class LiveEngine:
         except Exception as e:
             logging.warning(f"Initial status update failed: {e}")
         
-        while True:
-            try:
-                self.sync_time()
-                
-                # 1. Update Dynamic Config
-                config = load_config()
-                
-                # --- STRATEGY HOT-SWAP CHECK ---
-                target_strat = config.get("strategy_name")
-                if target_strat and target_strat != self.strategy.name:
-                    logging.info(f">>> SWITCHING STRATEGY: {self.strategy.name} -> {target_strat} <<<")
-                    try:
-                        from strategies.btc_ml_strategy import BTCMLStrategy1m, BTCMLStrategy5m
-                        if target_strat == "btc_ml_1m":
-                            self.strategy = BTCMLStrategy1m()
-                        elif target_strat == "btc_ml_5m":
-                            self.strategy = BTCMLStrategy5m()
-                        
-                        # Update Interval
-                        self.interval_seconds = self.timeframe_map.get(self.strategy.timeframe_str, 60)
-                        logging.info(f"Strategy Switched Successfully. New Interval: {self.interval_seconds}s")
-                        
-                    except Exception as e:
-                        logging.error(f"Strategy Switch Failed: {e}")
-
-                # Pass config to strategy if supported
-                if hasattr(self.strategy, 'update_parameters'):
-                    self.strategy.update_parameters(config)
-                
-                # Fetch Data
-                df = self.data_feed.get_latest()
-                trend = self.data_feed.get_1h_trend()
-                
-                # 2. Update Dashboard Status
-                last_price = 0
-                if df is not None and not df.empty:
-                    last_price = df.iloc[-1]["close"]
-                
-                # Get Balance (Estimate)
-                bal = "N/A"
-                if hasattr(self.executor, 'client') and self.executor.client:
-                     try:
-                        info = self.executor.client.fetch_balance()
-                        usdt = info['USDT']['free']
-                        btc = info['BTC']['free']
-                        bal = f"${usdt:.2f} | {btc:.5f} BTC"
-                     except: pass
-                     
-                status_data = {
-                    "price": last_price,
-                    "balance": bal,
-                    "position": "LONG" if self.executor.has_position() else "FLAT",
-                    "strategy": self.strategy.name,
-                    # Add current config for dashboard feedback
-                    "active_config": {
-                        "take_profit_pct": getattr(self.strategy, 'dynamic_tp', 0) * 100,
-                        "stop_loss_pct": getattr(self.strategy, 'dynamic_sl', 0) * 100
-                    }
-                }
-                update_status(status_data)
-                
-                # ... (Rest of loop) ...
-                
-                if df is None or len(df) < 200:
-                    logging.warning(f"Insufficient data ({len(df) if df is not None else 0} rows). Retrying next cycle.")
-                    continue
-                
-                # Inject 1H trend
-                df["trend_1h"] = trend
-                    
-                # Calculate Indicators
-                df = self.strategy.indicators(df)
-                
-                if len(df) == 0:
-                     logging.warning("DataFrame empty after indicators (Check dropna). Retrying...")
-                     continue
-                     
-                current_price = df.iloc[-1]["close"]
-                
-                if not self.executor.has_position():
-                    # Look for Entry
-                    if self.strategy.should_enter(df):
-                        if self.risk.can_trade():
-                            logging.info(f"SIGNAL DETECTED (BUY) @ {current_price}")
-                            self.executor.buy()
-                else:
-                    # Look for Exit
-                    # Pass a mock position object if internal tracking used, 
-                    # but executor.position should handle it. Keep consistency.
-                    if self.strategy.should_exit(df, self.executor.position):
-                        logging.info(f"SIGNAL DETECTED (SELL) @ {current_price}")
-                        self.executor.sell()
-                        
-            except KeyboardInterrupt:
-                logging.info("Stopping Bot...")
-                break
-            except Exception as e:
-                logging.error(f"CRITICAL ERROR in Loop: {e}")
-                time.sleep(10) # Prevent tight crash loop
+        try:
+            while True:
+                try:
+                    await self.sync_time()
+                    await self.cycle()
+                except Exception as e:
+                    logging.error(f"CRITICAL ERROR in Loop: {e}")
+                    await asyncio.sleep(10) # Prevent tight crash loop
+        finally:
+            refresher.cancel()
+            watcher.cancel()
+
+    def run(self):
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            logging.info("Stopping Bot...")
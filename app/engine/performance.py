@@ -0,0 +1,54 @@
+import numpy as np
+
+# Vectorized performance metrics over a per-bar equity curve.
+
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+
+def equity_curve(bar_time, close, trades, start_equity=10000.0, open_position=None):
+    """Mark-to-market equity per bar from non-overlapping trades.
+    trades: dict of arrays (entry_time, exit_time as epoch ms, entry, size, pnl);
+    open_position: optional (entry_time ms, entry, size) still held at the end.
+    Returns (equity, in_position). Realized PnL (net of fees) is booked on the exit bar;
+    while a position is open the bar's equity includes its unrealized PnL at the close."""
+    n = len(close)
+    realized = np.zeros(n)
+    unrealized = np.zeros(n)
+    in_position = np.zeros(n, dtype=bool)
+
+    entry_rows = np.searchsorted(bar_time, trades['entry_time'])
+    exit_rows = np.minimum(np.searchsorted(bar_time, trades['exit_time']), n - 1)
+    np.add.at(realized, exit_rows, trades['pnl'])
+    for e, x, entry, size in zip(entry_rows, exit_rows, trades['entry'], trades['size']):
+        unrealized[e:x] = size * (close[e:x] - entry)
+        in_position[e:x] = True
+
+    if open_position is not None:
+        entry_time, entry, size = open_position
+        e = int(np.searchsorted(bar_time, entry_time))
+        unrealized[e:] = size * (close[e:] - entry)
+        in_position[e:] = True
+
+    return start_equity + np.cumsum(realized) + unrealized, in_position
+
+def drawdown(equity):
+    """Per-bar drawdown from the running peak (0 at new highs, negative fractions below)"""
+    peak = np.maximum.accumulate(equity)
+    return equity / peak - 1
+
+def bar_metrics(bar_time, equity, in_position):
+    """Sharpe / Sortino (annualized from the bar interval), exposure and drawdown of an equity curve"""
+    stats = {'sharpe': 0.0, 'sortino': 0.0, 'exposure_pct': 0.0, 'max_drawdown_bar_pct': 0.0}
+    if len(equity) < 2:
+        return stats
+
+    returns = equity[1:] / equity[:-1] - 1
+    bar_ms = float(np.median(np.diff(bar_time)))
+    scale = np.sqrt(YEAR_MS / bar_ms) if bar_ms > 0 else 0.0
+
+    std = returns.std()
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    stats['sharpe'] = float(returns.mean() / std * scale) if std > 0 else 0.0
+    stats['sortino'] = float(returns.mean() / downside * scale) if downside > 0 else 0.0
+    stats['exposure_pct'] = float(in_position.mean() * 100)
+    stats['max_drawdown_bar_pct'] = float(drawdown(equity).min() * 100)
+    return stats
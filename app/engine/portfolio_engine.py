@@ -0,0 +1,239 @@
+import heapq
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.engine.backtest_engine import BacktestEngine, first_exit_index, trade_stats
+from app.storage.candle_store import to_ms
+
+# Portfolio backtest: N (symbol, strategy) sleeves over one aligned time grid with shared capital.
+# Candles live in a single (field, symbol, time) array -- memory-mapped from disk for large
+# universes (20+ pairs of 1m) -- instead of one DataFrame per symbol. Each sleeve's signals are
+# computed one symbol at a time and reduced to entry rows, so only one frame exists at once.
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+class AlignedCandles:
+    """OHLCV of several symbols on one shared timestamp grid (NaN where a symbol has no candle)"""
+
+    def __init__(self, symbols, timestamps, values):
+        self.symbols = list(symbols)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64) # epoch ms
+        self.values = values # shape (len(FIELDS), len(symbols), len(timestamps))
+
+    @classmethod
+    def from_stores(cls, stores, tf_ms, start=None, end=None, path=None):
+        """Aligns {symbol: CandleStore} onto a regular tf_ms grid.
+        With `path`, the array is a .npy memmap on disk (pages in on demand, not held in RAM)."""
+        ranges = {symbol: store.range_slice(start, end) for symbol, store in stores.items()}
+        bounds = []
+        for symbol, store in stores.items():
+            rows = ranges[symbol]
+            if rows.stop > rows.start:
+                ts = store.column("timestamp")
+                bounds.append((int(ts[rows.start]), int(ts[rows.stop - 1])))
+        if not bounds:
+            raise ValueError("No candles in the requested range")
+
+        firsts, lasts = zip(*bounds)
+        grid_start = (min(firsts) // tf_ms) * tf_ms
+        timestamps = np.arange(grid_start, max(lasts) + 1, tf_ms, dtype=np.int64)
+        shape = (len(FIELDS), len(stores), len(timestamps))
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            values = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+            values[:] = np.nan
+        else:
+            values = np.full(shape, np.nan)
+
+        for s, (symbol, store) in enumerate(stores.items()):
+            rows = ranges[symbol]
+            ts = np.asarray(store.column("timestamp")[rows])
+            pos = (ts - grid_start) // tf_ms
+            on_grid = (ts - grid_start) % tf_ms == 0
+            for f, field in enumerate(FIELDS):
+                values[f, s, pos[on_grid]] = np.asarray(store.column(field)[rows])[on_grid]
+        if path:
+            values.flush()
+        return cls(stores.keys(), timestamps, values)
+
+    @classmethod
+    def from_frames(cls, frames, tf_ms):
+        """Aligns {symbol: OHLCV DataFrame} (small universes / tests)"""
+        stamps = {s: to_ms(df["timestamp"]) for s, df in frames.items()}
+        grid_start = (min(int(ts[0]) for ts in stamps.values()) // tf_ms) * tf_ms
+        timestamps = np.arange(grid_start, max(int(ts[-1]) for ts in stamps.values()) + 1, tf_ms, dtype=np.int64)
+        values = np.full((len(FIELDS), len(frames), len(timestamps)), np.nan)
+        for s, (symbol, df) in enumerate(frames.items()):
+            pos = (stamps[symbol] - grid_start) // tf_ms
+            for f, field in enumerate(FIELDS):
+                values[f, s, pos] = df[field].to_numpy(dtype=np.float64)
+        return cls(frames.keys(), timestamps, values)
+
+    def column(self, field, symbol):
+        """View of one field of one symbol over the whole grid (no copy)"""
+        return self.values[FIELDS.index(field), self.symbols.index(symbol)]
+
+    def frame(self, symbol):
+        """OHLCV DataFrame of one symbol (missing candles dropped, index = grid position)"""
+        s = self.symbols.index(symbol)
+        df = pd.DataFrame({field: self.values[f, s] for f, field in enumerate(FIELDS)})
+        df.insert(0, "timestamp", pd.to_datetime(self.timestamps, unit="ms"))
+        return df[~np.isnan(df["close"].to_numpy())]
+
+class Sleeve:
+    """One (symbol, strategy) slice of the portfolio"""
+
+    def __init__(self, symbol, strategy, allocation):
+        self.symbol = symbol
+        self.strategy = strategy
+        self.allocation = allocation # fraction of portfolio equity per trade
+        self.name = f"{symbol}:{strategy.name}"
+        self.entries = np.empty(0, dtype=np.int64) # candidate entry grid positions
+        self.exit_mask = None
+        self.take_profit, self.stop_loss = None, None
+
+class PortfolioEngine:
+    """Event-driven portfolio simulation over aligned candles.
+    Exits follow each sleeve's own barriers/exit signals (same first-touch scan as BacktestEngine);
+    entries are sized from shared equity and limited by cash and a correlated-exposure cap."""
+
+    def __init__(self, candles, sleeves, initial_capital=10000.0, compounding=False,
+                 max_correlated_exposure=1.0, corr_threshold=0.7, corr_window=1440):
+        self.candles = candles
+        self.sleeves = sleeves
+        self.initial_capital = initial_capital
+        self.equity = initial_capital # realized equity (same convention as BacktestEngine)
+        self.compounding = compounding
+        # Open notional across positions whose trailing return correlation with a new entry is
+        # >= corr_threshold (same symbol counts as 1.0) may not exceed this fraction of equity
+        self.max_correlated_exposure = max_correlated_exposure
+        self.corr_threshold = corr_threshold
+        self.corr_window = corr_window
+        self.trades = []
+        self.skipped = {'cash': 0, 'correlation': 0}
+
+    def prepare(self):
+        """Computes each sleeve's signals one symbol at a time (only one frame in memory)"""
+        n = len(self.candles.timestamps)
+        for sleeve in self.sleeves:
+            df = self.candles.frame(sleeve.symbol)
+            full_df = sleeve.strategy.indicators(df)
+            entries = sleeve.strategy.entry_signals(full_df)
+            if entries is None:
+                raise ValueError(f"Strategy {sleeve.strategy.name} has no vectorized signals (entry_signals)")
+
+            entries = np.asarray(entries, dtype=bool).copy()
+            entries[:BacktestEngine.min_lookback] = False
+            sleeve.entries = full_df.index.to_numpy()[entries].astype(np.int64)
+
+            exit_mask = sleeve.strategy.exit_signals(full_df)
+            if exit_mask is not None:
+                sleeve.exit_mask = np.zeros(n, dtype=bool)
+                sleeve.exit_mask[full_df.index.to_numpy()[np.asarray(exit_mask, dtype=bool)]] = True
+            sleeve.take_profit, sleeve.stop_loss = sleeve.strategy.exit_barriers()
+            print(f"  {sleeve.name}: {len(sleeve.entries)} entry signals")
+
+    def correlation(self, a, b, t):
+        """Trailing correlation of log returns of two symbols over corr_window bars before t"""
+        if a == b:
+            return 1.0
+        lo = max(0, t - self.corr_window)
+        ra = np.diff(np.log(self.candles.column("close", a)[lo:t + 1]))
+        rb = np.diff(np.log(self.candles.column("close", b)[lo:t + 1]))
+        valid = ~(np.isnan(ra) | np.isnan(rb))
+        if valid.sum() < 30:
+            return 0.0
+        c = np.corrcoef(ra[valid], rb[valid])[0, 1]
+        return 0.0 if np.isnan(c) else float(c)
+
+    def run(self):
+        print(f"Starting portfolio backtest: {len(self.sleeves)} sleeves, {len(self.candles.symbols)} symbols, "
+              f"{len(self.candles.timestamps)} bars (Compounding: {self.compounding})")
+        self.prepare()
+
+        # Candidate entries of all sleeves in time order (sleeve order breaks ties)
+        events = sorted((int(t), k) for k, sleeve in enumerate(self.sleeves) for t in sleeve.entries)
+        open_positions = {} # sleeve index -> position dict
+        exits = [] # heap of (exit row, sleeve index)
+        last_exit = {} # sleeve index -> row of its latest exit
+        locked = 0.0 # capital tied up in open positions
+
+        def close_until(t):
+            nonlocal locked
+            while exits and exits[0][0] <= t:
+                j, k = heapq.heappop(exits)
+                pos = open_positions.pop(k)
+                last_exit[k] = j
+                exit_price = self.candles.column("close", self.sleeves[k].symbol)[j]
+                pnl = pos['size'] * (exit_price - pos['entry'])
+                self.equity += pnl
+                locked -= pos['capital']
+                self.trades.append({
+                    'sleeve': self.sleeves[k].name, 'symbol': self.sleeves[k].symbol,
+                    'entry': pos['entry'], 'exit': exit_price, 'pnl': pnl,
+                    'pnl_pct': (exit_price - pos['entry']) / pos['entry'],
+                    'entry_time': pd.to_datetime(self.candles.timestamps[pos['row']], unit="ms"),
+                    'exit_time': pd.to_datetime(self.candles.timestamps[j], unit="ms"),
+                })
+
+        for t, k in events:
+            # Exits up to this bar free capital first; a sleeve never re-enters on its own exit bar
+            close_until(t)
+            if k in open_positions or last_exit.get(k, -1) >= t:
+                continue
+
+            sleeve = self.sleeves[k]
+            close = self.candles.column("close", sleeve.symbol)
+            entry = close[t]
+            base = self.equity if self.compounding else self.initial_capital
+            capital = min(base * sleeve.allocation, self.equity - locked)
+
+            if capital <= 0:
+                self.skipped['cash'] += 1
+                continue
+
+            # Correlated-exposure cap (shrinks the entry to fit, skips it when there is no room)
+            correlated = sum(p['capital'] for kk, p in open_positions.items()
+                             if self.correlation(sleeve.symbol, self.sleeves[kk].symbol, t) >= self.corr_threshold)
+            room = self.max_correlated_exposure * self.equity - correlated
+            if room <= 0:
+                self.skipped['correlation'] += 1
+                continue
+            capital = min(capital, room)
+
+            j = first_exit_index(
+                close, t + 1,
+                take_profit=entry * sleeve.take_profit if sleeve.take_profit is not None else None,
+                stop_loss=entry * sleeve.stop_loss if sleeve.stop_loss is not None else None,
+                exit_mask=sleeve.exit_mask
+            )
+            open_positions[k] = {'entry': entry, 'size': capital / entry, 'capital': capital, 'row': t}
+            locked += capital
+            if j >= 0:
+                heapq.heappush(exits, (j, k))
+            # else: still holding at the end of data (sleeve stays blocked, same as BacktestEngine)
+
+        close_until(len(self.candles.timestamps))
+        self.report()
+
+    def summary(self):
+        """Portfolio stats plus one row per sleeve"""
+        portfolio = trade_stats([t['pnl'] for t in self.trades], self.equity, self.initial_capital)
+        sleeves = []
+        for sleeve in self.sleeves:
+            pnls = [t['pnl'] for t in self.trades if t['sleeve'] == sleeve.name]
+            row = trade_stats(pnls, self.initial_capital + sum(pnls), self.initial_capital)
+            sleeves.append({'sleeve': sleeve.name, 'allocation': sleeve.allocation, **row})
+        return portfolio, pd.DataFrame(sleeves)
+
+    def report(self):
+        portfolio, sleeves = self.summary()
+        print("Portfolio backtest finished.")
+        print(f"Final Equity: ${self.equity:.2f}")
+        print(f"Total Trades: {portfolio['trades']} | Win Rate: {portfolio['win_rate']:.2f}% | "
+              f"Max Drawdown: {portfolio['max_drawdown_pct']:.2f}% | Return: {portfolio['return_pct']:.2f}%")
+        print(f"Skipped Entries: {self.skipped['cash']} (no cash), {self.skipped['correlation']} (correlation cap)")
+        print("\n--- Sleeves ---")
+        print(sleeves.drop(columns=['final_equity']).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
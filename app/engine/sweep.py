@@ -0,0 +1,151 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from app.engine.backtest_engine import BacktestEngine, first_exit_index, trade_stats
+
+# Parameter sweep over TP / SL / ML threshold / compounding.
+# Indicators and ML probabilities are computed once in the parent. The arrays the simulation
+# needs (closes, breakout rows, their probabilities, optional exit mask) go into shared memory,
+# and each worker process takes one (TP, SL) pair: exits depend only on TP/SL, so they are
+# found once per candidate entry and reused for every threshold/compounding combination.
+
+STAKE = 10000.0 # Same fixed stake / starting equity as BacktestEngine
+
+_shared = {} # worker side: name -> ndarray view into shared memory
+_segments = [] # keeps the worker's SharedMemory handles alive
+
+def share_arrays(arrays):
+    """Copies arrays into shared memory. Returns (segments, spec) where spec lets workers attach."""
+    segments, spec = [], {}
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        segments.append(shm)
+        spec[name] = (shm.name, values.shape, values.dtype.str)
+    return segments, spec
+
+def attach_arrays(spec):
+    """Worker initializer: maps the parent's shared arrays (read-only, no copies)"""
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        if multiprocessing.get_start_method() != "fork":
+            # The parent owns (and unlinks) the segment; a spawned worker's own tracker must not claim it
+            resource_tracker.unregister(shm._name, "shared_memory")
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        view.flags.writeable = False
+        _segments.append(shm)
+        _shared[name] = view
+
+def simulate(close, rows, exits, compounding):
+    """Replays BacktestEngine.run_vectorized for one entry set.
+    rows = candidate entry rows (sorted), exits = exit row per candidate (-1 = never exits)."""
+    equity = STAKE
+    pnls = []
+    cursor = 0
+    while True:
+        k = np.searchsorted(rows, cursor)
+        if k >= len(rows):
+            break
+        i, j = rows[k], exits[k]
+        if j < 0:
+            break # Still holding at the end of data
+
+        entry = close[i]
+        capital = equity if compounding else min(STAKE, equity)
+        pnl = (capital / entry) * (close[j] - entry)
+        equity += pnl
+        pnls.append(pnl)
+        cursor = j + 1
+    return pnls, equity
+
+def sweep_pair(job):
+    """All thresholds x compounding settings for one (TP, SL) pair (runs in a worker process)"""
+    tp, sl, thresholds, compounding_modes = job
+    close = _shared["close"]
+    rows = _shared["rows"]
+    probs = _shared["probs"]
+    exit_mask = _shared.get("exit_mask")
+
+    # Exit for every candidate entry under this TP/SL, found once and shared by all thresholds.
+    # Candidates below the lowest threshold can never be entered, so they are skipped.
+    exits = np.full(len(rows), -1, dtype=np.int64)
+    for k in np.flatnonzero(probs >= min(thresholds)):
+        i = rows[k]
+        entry = close[i]
+        exits[k] = first_exit_index(close, i + 1, entry * (1 + tp), entry * (1 - sl), exit_mask)
+
+    results = []
+    for threshold in thresholds:
+        mask = probs >= threshold
+        for compounding in compounding_modes:
+            pnls, equity = simulate(close, rows[mask], exits[mask], compounding)
+            results.append({'tp_pct': round(tp * 100, 4), 'sl_pct': round(sl * 100, 4), 'threshold': threshold,
+                            'compounding': compounding, **trade_stats(pnls, equity, STAKE)})
+    return results
+
+def prepare(strategy, data):
+    """Indicators + one batch of ML scores. Returns the arrays the simulation needs."""
+    data = data.copy()
+    if not pd.api.types.is_datetime64_any_dtype(data["timestamp"]):
+        data["timestamp"] = pd.to_datetime(data["timestamp"])
+    full_df = strategy.indicators(data)
+
+    scores = strategy.score_breakouts(full_df)
+    if scores is None:
+        raise RuntimeError("ML scoring failed; nothing to sweep")
+
+    # Breakout rows as positions in full_df; the engine never enters before min_lookback
+    rows = np.flatnonzero(strategy.breakout_signals(full_df)) if len(scores) else np.empty(0, dtype=np.int64)
+    probs = scores.to_numpy(dtype=np.float64)
+    keep = rows >= BacktestEngine.min_lookback
+
+    arrays = {
+        "close": full_df["close"].to_numpy(dtype=np.float64),
+        "rows": rows[keep].astype(np.int64),
+        "probs": probs[keep],
+    }
+    exit_mask = strategy.exit_signals(full_df)
+    if exit_mask is not None:
+        arrays["exit_mask"] = np.asarray(exit_mask, dtype=bool)
+    return arrays
+
+def run_sweep(strategy, data, tps, sls, thresholds, compounding_modes=(False, True), workers=None, rank_by="return_pct"):
+    """Evaluates the full grid. Returns the results table ranked by `rank_by` (best first)."""
+    print(f"Pre-calculating indicators and ML scores for {len(data)} rows (once)...")
+    arrays = prepare(strategy, data)
+
+    thresholds = sorted(set(thresholds))
+    jobs = [(tp, sl, thresholds, tuple(compounding_modes)) for tp, sl in itertools.product(tps, sls)]
+    points = len(jobs) * len(thresholds) * len(compounding_modes)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    print(f"Sweeping {points} points ({len(tps)} TP x {len(sls)} SL x {len(thresholds)} thresholds x "
+          f"{len(compounding_modes)} sizing) over {len(arrays['rows'])} breakouts on {workers} workers...")
+
+    started = time.time()
+    segments, spec = share_arrays(arrays)
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_arrays, initargs=(spec,)) as pool:
+            for results in pool.map(sweep_pair, jobs):
+                rows.extend(results)
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    print(f"Sweep finished in {time.time() - started:.1f}s.")
+    table = pd.DataFrame(rows)
+    return table.sort_values([rank_by, 'max_drawdown_pct'], ascending=[False, False]).reset_index(drop=True)
+
+def heatmap(table, value="return_pct", compounding=False):
+    """TP x SL grid of the best `value` over thresholds (rows = TP %, columns = SL %)"""
+    subset = table[table['compounding'] == compounding]
+    return subset.pivot_table(index='tp_pct', columns='sl_pct', values=value, aggfunc='max').sort_index()
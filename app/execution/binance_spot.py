@@ -1,21 +1,39 @@
 from .exchange import Exchange
 import os
 import logging
+import threading
+import time
+from datetime import datetime
 from dotenv import load_dotenv
 
-load_dotenv()
+from app.engine.ledger import Position, TradeLedger
+from app.execution.router import OrderRouter
+from app.execution.state import ExecutionState
+from app.storage.models import parse_label
+from app.storage.repository import TradeRepository
 
-class Position:
-    def __init__(self, entry_price, size):
-        self.entry = entry_price
-        self.size = size
+load_dotenv()
 
 class BinanceSpot(Exchange):
-    def __init__(self):
+    def __init__(self, repository=None):
         self.position = None
+        self.trades = TradeLedger(capacity=64) # closed trades of this session (same layout as backtests)
+        # Trade / order history for the dashboard (data/trades.db, written in the background)
+        self.repository = repository or TradeRepository()
+        # Balances, last price and market rules cached for the order path (see ExecutionState)
+        self.state = ExecutionState('BTC/USDT')
+        self.reconciler = None # background balance check started after each live fill
         self.api_key = os.getenv("BINANCE_API_KEY")
         self.secret_key = os.getenv("BINANCE_SECRET_KEY")
         self.live_mode = os.getenv("LIVE_TRADING_ENABLED", "false").lower() == "true"
+        # "smart" = post-only limit at the touch with market fallback (OrderRouter), "market" = market orders
+        self.execution_mode = os.getenv("EXECUTION_MODE", "market").lower()
+        # Place TP/SL on the exchange as an OCO after each entry (smart mode only)
+        self.exchange_exits = os.getenv("EXCHANGE_EXITS", "false").lower() == "true"
+        self.router = None
+        self.bracket = None # (order list id, amount) of the resting OCO exit
+        self.order_lock = threading.RLock() # buy / sell / bracket checks run from different threads
+        self.metrics = None # order_submit / order_fill latency (set by the engine via attach_metrics)
         
         self.client = None
         if self.api_key and self.secret_key and "your_key" not in self.api_key:
@@ -30,110 +48,246 @@ class BinanceSpot(Exchange):
             if not self.live_mode:
                  self.client.set_sandbox_mode(True) # Just in case, though usually manual
                  logging.info("Running in SIMULATION MODE (Live execution disabled in .env)")
+            if self.execution_mode == "smart":
+                self.router = OrderRouter(self.client, self.state)
         else:
              logging.warning("No API Keys found. Running in MOCK Mode.")
 
+    def attach_metrics(self, metrics):
+        """Times order submit (and routed fills) into the engine's latency histograms"""
+        self.metrics = metrics
+        if self.router:
+            self.router.metrics = metrics
+
+    def _market_order(self, side, amount):
+        t0 = time.perf_counter()
+        if side == "buy":
+            order = self.client.create_market_buy_order('BTC/USDT', amount)
+        else:
+            order = self.client.create_market_sell_order('BTC/USDT', amount)
+        if self.metrics is not None:
+            self.metrics.record("order_submit", time.perf_counter() - t0) # fill comes back in the ack
+        return order
+
     def sync_position(self):
         """Query exchange to restore state on startup"""
         if not self.client: return
         
         try:
-            bal = self.client.fetch_balance()
-            btc_free = float(bal['BTC']['free'])
-            usdt_free = float(bal['USDT']['free'])
+            self.state.load_market(self.client)
+            self.state.refresh(self.client)
+            # Total, not free: a resting OCO exit locks the whole position
+            btc_total = self.state.total('BTC')
+            usdt_free = self.state.free('USDT')
             
             # Simple Logic: If we hold > 0.0001 BTC (~$4-5 at $45k), assume we are LONG
-            if btc_free > 0.0001:
+            if btc_total > 0.0001:
                 # We don't know entry price from balance alone, assume current price?
-                # Or fetch last trade. For strict safety, let's fetch ticker.
-                ticker = self.client.fetch_ticker('BTC/USDT')
-                current_price = ticker['last']
+                current_price = self.state.last_price
                 
-                logging.info(f"Restoring Position: {btc_free} BTC found.")
+                logging.info(f"Restoring Position: {btc_total} BTC found.")
                 # We assume entry is roughly current price if unknown, 
                 # effectively resetting stops. Trade carefully.
-                self.position = Position(entry_price=current_price, size=btc_free)
+                self.position = Position(current_price, btc_total, datetime.now())
+                self._restore_bracket()
             else:
-                logging.info(f"No existing BTC position ({btc_free}). Ready to Buy. USDT: {usdt_free:.2f}")
+                logging.info(f"No existing BTC position ({btc_total}). Ready to Buy. USDT: {usdt_free:.2f}")
                 self.position = None
                 
         except Exception as e:
             logging.error(f"Failed to sync position: {e}")
 
+    def _restore_bracket(self):
+        """Re-attaches the OCO exit left working by a previous run (its fill is then booked by check_exits)"""
+        if not self.router:
+            return
+        brackets = self.router.open_brackets()
+        if not brackets:
+            return
+        if len(brackets) > 1:
+            logging.warning(f"{len(brackets)} open OCO lists found, tracking {brackets[0][0]} only")
+        self.bracket = brackets[0]
+        logging.info(f"Restored OCO exit {self.bracket[0]} for {self.bracket[1]:.5f} BTC")
+
+    @property
+    def balances(self):
+        return self.state.balances
+
+    def refresh_state(self):
+        """Fetches free balances and the last price (called off the order path)"""
+        if not self.client: return
+        self.check_exits()
+        self.state.refresh(self.client)
+
+    def check_exits(self):
+        """Books the position as closed if the exchange-side OCO has filled"""
+        with self.order_lock:
+            if self.bracket is None:
+                return
+            list_id, amount = self.bracket
+            order = self.router.bracket_fill(list_id)
+            if order is None:
+                return
+            self.bracket = None
+            self.state.release(self.state.base, amount)
+            if not float(order.get('filled') or 0.0):
+                logging.warning(f"OCO {list_id} ended without a fill (cancelled outside the bot?)")
+                return
+            amount, real_exit = self._book_fill("sell", order, amount, order.get('price'))
+            pnl = (real_exit - self.position.entry) * amount if self.position else None
+            logging.info(f"OCO EXIT FILLED: {amount:.5f} BTC @ {real_exit}")
+            self._log_trade("SELL (OCO)", real_exit, amount, pnl)
+            self._record_close(real_exit, amount, pnl)
+            self.position = None
+            self.reconcile()
+
+    def _place_bracket(self, amount, entry, barriers):
+        take_profit, stop_loss = barriers
+        if take_profit is None or stop_loss is None:
+            return
+        try:
+            list_id = self.router.bracket(amount, entry * take_profit, entry * stop_loss)
+            self.bracket = (list_id, amount)
+            self.state.reserve(self.state.base, amount)
+            logging.info(f"OCO placed: TP {entry * take_profit:.2f} / SL {entry * stop_loss:.2f}")
+        except Exception as e:
+            logging.error(f"OCO placement failed (exits stay candle-based): {e}")
+
+    def _cancel_bracket(self):
+        """Cancels the resting OCO. If it had already finished, books its fill instead."""
+        list_id, amount = self.bracket
+        if not self.router.cancel_bracket(list_id):
+            logging.info(f"OCO {list_id} already finished, booking its fill")
+            self.check_exits()
+            return
+        self.bracket = None
+        self.state.release(self.state.base, amount)
+
+    def _ensure_state(self):
+        """Synchronous refresh only when the background refresher has fallen behind"""
+        if self.state.stale():
+            self.state.refresh(self.client)
+
+    def _book_fill(self, side, order, amount, price):
+        """Books a live fill from the order response (reconcile() checks it against the exchange).
+        Returns (filled base amount net of base-currency fees, average price)."""
+        filled = float(order.get('filled') or 0.0)
+        average = float(order.get('average') or price)
+        cost = float(order.get('cost') or filled * average)
+        fees = order.get('fees') or ([order['fee']] if order.get('fee') else [])
+        fee_quote = sum(float(f.get('cost') or 0.0) for f in fees if f.get('currency') == self.state.quote)
+        fee_base = sum(float(f.get('cost') or 0.0) for f in fees if f.get('currency') == self.state.base)
+        net = filled - fee_base if side == "buy" else filled + fee_base
+        self.state.apply_fill(side, net, cost, fee_quote)
+        self.repository.add_order(side, "routed" if 'maker' in order else "market", amount, filled, average, cost,
+                                  order.get('maker'), order.get('taker'), order.get('status') or "closed")
+        return (filled - fee_base if side == "buy" else filled), average
+
+    def reconcile(self):
+        """Background balance check once a fill (and any OCO it placed) has been booked"""
+        self.reconciler = threading.Thread(target=self._reconcile, name="reconcile", daemon=True)
+        self.reconciler.start()
+
+    def _reconcile(self):
+        try:
+            self.state.reconcile(self.client)
+        except Exception as e:
+            logging.warning(f"Reconcile after fill failed: {e}")
+
     def has_position(self):
         return self.position is not None
 
     def _log_trade(self, side, price, size, pnl=None):
-        """Append trade details to CSV for easy user access"""
-        import csv
-        from datetime import datetime
-        
-        file_path = "data/live_trades.csv"
-        file_exists = os.path.isfile(file_path)
-        
+        """Queue trade details for the trade repository (never blocks on disk)"""
         try:
-            with open(file_path, mode='a', newline='') as f:
-                writer = csv.writer(f)
-                
-                # Write Header if new file
-                if not file_exists:
-                    writer.writerow(["Timestamp", "Side", "Price", "Size (BTC)", "Value (USDT)", "PnL (USDT)", "PnL (%)"])
-                
-                # Write Data
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                value = price * size
-                pnl_str = f"{pnl:.2f}" if pnl is not None else ""
-                pnl_pct = "" # Todo: Calculate if needed, but absolute is fine for now
-                
-                # Calculate % if PnL exists
-                if pnl is not None and self.position and self.position.entry:
-                    entry_val = self.position.entry * size
-                    pnl_pct = f"{(pnl / entry_val * 100):.2f}%"
-
-                writer.writerow([timestamp, side, f"{price:.2f}", f"{size:.6f}", f"{value:.2f}", pnl_str, pnl_pct])
-                print(f"Trade Logged to {file_path}")
-                
+            pnl_pct = None
+            if pnl is not None and self.position and self.position.entry:
+                pnl_pct = pnl / (self.position.entry * size) * 100
+            side, tag = parse_label(side)
+            self.repository.add_trade(side, price, size, pnl, pnl_pct, tag)
+            print(f"Trade Logged to {self.repository.path}")
         except Exception as e:
-            logging.error(f"Failed to log trade to CSV: {e}")
+            logging.error(f"Failed to log trade: {e}")
+
+    def _record_close(self, exit_price, size, pnl):
+        """Appends the closed position to the session ledger"""
+        if self.position is None or pnl is None:
+            return
+        entry = self.position.entry
+        self.trades.append(entry, exit_price, pnl, (exit_price - entry) / entry,
+                           self.position.entry_time or datetime.now(), datetime.now(), size)
 
-    def buy(self, size=None):
+    def buy(self, size=None, price=None, barriers=None):
+        """Buy with 99% of free USDT. `price` (e.g. the signal candle's close) sizes the order;
+        balances come from the cached state. `barriers` = (take_profit, stop_loss) multipliers
+        for the exchange-side OCO exit."""
+        with self.order_lock:
+            self._buy(price, barriers)
+
+    def _buy(self, price, barriers):
         if self.client:
             # Calculate Size (Compounding: 99% of USDT Balance)
             try:
-                bal = self.client.fetch_balance()
-                usdt_free = float(bal['USDT']['free'])
-                ticker = self.client.fetch_ticker('BTC/USDT')
-                price = ticker['last']
+                self._ensure_state()
+                usdt_free = self.state.free('USDT')
+                price = price or self.state.last_price
                 
                 amount_to_spend = usdt_free * 0.99
-                amount_btc = amount_to_spend / price
+                amount_btc = self.state.round_amount(amount_to_spend / price)
                 
-                # Min Notional Check (approx $5 for testing)
-                if amount_to_spend < 5:
-                    logging.warning(f"Insufficient funds to buy: ${usdt_free:.2f} (Min $5)")
+                # Exchange rules (step size, min quantity, min notional) checked locally
+                rejected = self.state.validate(amount_btc, price)
+                if rejected:
+                    logging.warning(f"Buy skipped: {rejected} (USDT free: {usdt_free:.2f})")
                     return
 
                 if self.live_mode:
-                    logging.info(f"EXECUTING MARKET BUY: {amount_btc:.5f} BTC @ ~{price}")
-                    order = self.client.create_market_buy_order('BTC/USDT', amount_btc)
-                    print(f"Order Filled: {order['id']}")
+                    if self.router:
+                        logging.info(f"ROUTING BUY: {amount_btc:.5f} BTC (post-only at the touch) @ ~{price}")
+                        order = self.router.execute("buy", amount_btc)
+                        if order['filled'] <= 0:
+                            logging.warning("Buy routed but nothing filled.")
+                            return
+                        logging.info(f"Execution: {self.router.report()}")
+                    else:
+                        logging.info(f"EXECUTING MARKET BUY: {amount_btc:.5f} BTC @ ~{price}")
+                        order = self._market_order('buy', amount_btc)
+                        print(f"Order Filled: {order['id']}")
                     
-                    real_entry = float(order.get('average', price))
-                    self.position = Position(real_entry, amount_btc)
+                    amount_btc, real_entry = self._book_fill("buy", order, amount_btc, price)
+                    self.position = Position(real_entry, amount_btc, datetime.now())
                     self._log_trade("BUY", real_entry, amount_btc)
+                    if self.router and self.exchange_exits and barriers:
+                        self._place_bracket(self.state.round_amount(amount_btc), real_entry, barriers)
+                    self.reconcile()
                 else:
                     logging.info(f"[SIM] BUY {amount_btc:.5f} BTC @ {price}")
-                    self.position = Position(price, amount_btc)
+                    self.state.apply_fill("buy", amount_btc, amount_btc * price)
+                    self.position = Position(price, amount_btc, datetime.now())
                     self._log_trade("BUY (SIM)", price, amount_btc)
 
             except Exception as e:
                 logging.error(f"Buy Order Failed: {e}")
 
-    def sell(self):
+    def sell(self, price=None):
+        """Sells the free BTC balance (from the cached state), cancelling any resting OCO first"""
+        with self.order_lock:
+            self._sell(price)
+
+    def _sell(self, price):
         if self.client:
             try:
-                bal = self.client.fetch_balance()
-                btc_free = float(bal['BTC']['free'])
+                if self.bracket is not None:
+                    self.check_exits() # the OCO may have filled since the last background refresh
+                    if self.bracket is not None:
+                        self._cancel_bracket()
+                    if self.bracket is not None:
+                        raise RuntimeError(f"OCO {self.bracket[0]} neither cancelled nor finished")
+                    if self.position is None:
+                        logging.info("Position already closed by the OCO exit")
+                        return
+                self._ensure_state()
+                btc_free = self.state.round_amount(self.state.free('BTC'))
                 
                 if btc_free < 0.0001:
                     logging.warning("No BTC to sell?")
@@ -142,8 +296,12 @@ class BinanceSpot(Exchange):
 
                 # Calculate PnL Reference
                 pnl = None
-                ticker = self.client.fetch_ticker('BTC/USDT')
-                current_price = ticker['last']
+                current_price = price or self.state.last_price
+                rejected = self.state.validate(btc_free, current_price)
+                if rejected:
+                    logging.warning(f"Sell skipped (dust): {rejected}")
+                    self.position = None
+                    return
                 
                 if self.position:
                     revenue = current_price * btc_free
@@ -151,20 +309,32 @@ class BinanceSpot(Exchange):
                     pnl = revenue - cost
 
                 if self.live_mode:
-                    logging.info(f"EXECUTING MARKET SELL: {btc_free:.5f} BTC")
-                    order = self.client.create_market_sell_order('BTC/USDT', btc_free)
-                    print(f"Order Filled: {order['id']}")
+                    if self.router:
+                        logging.info(f"ROUTING SELL: {btc_free:.5f} BTC (post-only at the touch)")
+                        order = self.router.execute("sell", btc_free)
+                        logging.info(f"Execution: {self.router.report()}")
+                    else:
+                        logging.info(f"EXECUTING MARKET SELL: {btc_free:.5f} BTC")
+                        order = self._market_order('sell', btc_free)
+                        print(f"Order Filled: {order['id']}")
+                    if float(order.get('filled') or 0.0) <= 0:
+                        logging.warning("Sell sent but nothing filled. Position kept.")
+                        return
                     
-                    real_exit = float(order.get('average', current_price))
+                    btc_free, real_exit = self._book_fill("sell", order, btc_free, current_price)
                     # Recalculate exact PnL with real exit price
                     if self.position:
                         revenue = real_exit * btc_free
                         pnl = revenue - cost
                         
                     self._log_trade("SELL", real_exit, btc_free, pnl)
+                    self._record_close(real_exit, btc_free, pnl)
+                    self.reconcile()
                 else:
                     logging.info(f"[SIM] SELL {btc_free:.5f} BTC")
                     self._log_trade("SELL (SIM)", current_price, btc_free, pnl)
+                    self.state.apply_fill("sell", btc_free, btc_free * current_price)
+                    self._record_close(current_price, btc_free, pnl)
                 
                 self.position = None
 
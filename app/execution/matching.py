@@ -0,0 +1,164 @@
+import itertools
+
+# Local matching-engine stand-in for the exchange order API.
+# Implements the subset of the ccxt Binance client used by BinanceSpot / OrderRouter
+# (order book, market / limit / post-only orders, OCO order lists, balances) against a
+# single top-of-book quote. Each fetch_order call advances the quote along `path`, so tests
+# and paper runs can script how the market moves while an order rests.
+
+class PostOnlyRejected(Exception):
+    """Post-only order would have taken liquidity (Binance LIMIT_MAKER rejection)"""
+
+class OrderNotFound(Exception):
+    """Unknown / no longer open order or order list (Binance -2011, ccxt OrderNotFound)"""
+
+class LocalMatchingEngine:
+    def __init__(self, bid, ask, symbol="BTC/USDT", balances=None, maker_fee=0.001, taker_fee=0.001, path=None):
+        self.symbol = symbol
+        self.base, self.quote = symbol.split("/")
+        self.bid, self.ask = bid, ask
+        self.path = list(path or []) # (bid, ask) quotes applied one per poll
+        self.balances = dict(balances or {self.quote: 10000.0, self.base: 0.0})
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.orders = {}
+        self.order_lists = {}
+        self.ids = itertools.count(1)
+
+    # --- Market data / account ---
+
+    def market_id(self, symbol):
+        return symbol.replace("/", "")
+
+    def amount_to_precision(self, symbol, amount):
+        return f"{amount:.5f}"
+
+    def price_to_precision(self, symbol, price):
+        return f"{price:.2f}"
+
+    def load_markets(self):
+        return {self.symbol: {'precision': {'amount': 1e-5, 'price': 0.01},
+                              'limits': {'amount': {'min': 1e-5}, 'cost': {'min': 5.0}}}}
+
+    def fetch_order_book(self, symbol, limit=5):
+        return {'bids': [[self.bid, 10.0]], 'asks': [[self.ask, 10.0]]}
+
+    def fetch_ticker(self, symbol):
+        return {'last': (self.bid + self.ask) / 2, 'bid': self.bid, 'ask': self.ask}
+
+    def fetch_balance(self):
+        """Free = total minus what open orders lock (sells lock base, buys lock quote)"""
+        locked = dict.fromkeys(self.balances, 0.0)
+        second_legs = {i for legs in self.order_lists.values() for i in legs[1:]} # an OCO locks its quantity once
+        for order in self.orders.values():
+            if order['status'] != 'open' or order['id'] in second_legs:
+                continue
+            if order['side'] == "sell":
+                locked[self.base] += order['remaining']
+            else:
+                locked[self.quote] += order['remaining'] * order['price']
+        return {asset: {'free': value - locked[asset], 'total': value} for asset, value in self.balances.items()}
+
+    def set_quote(self, bid, ask):
+        """Moves the market and fills any resting order it trades through"""
+        self.bid, self.ask = bid, ask
+        self.match()
+
+    # --- Orders ---
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        order = {'id': str(next(self.ids)), 'symbol': symbol, 'type': type, 'side': side,
+                 'amount': float(amount), 'price': price, 'filled': 0.0, 'remaining': float(amount),
+                 'average': None, 'cost': 0.0, 'status': 'open', 'fee': None,
+                 'stopPrice': params.get('stopPrice')}
+        if type == "market":
+            self.fill(order, self.ask if side == "buy" else self.bid, maker=False)
+        elif order['stopPrice'] is None:
+            crosses = price >= self.ask if side == "buy" else price <= self.bid
+            if crosses and params.get('postOnly'):
+                raise PostOnlyRejected(f"{side} {price} would cross the book ({self.bid}/{self.ask})")
+            if crosses:
+                self.fill(order, price, maker=False)
+        self.orders[order['id']] = order
+        return dict(order)
+
+    def create_market_buy_order(self, symbol, amount):
+        return self.create_order(symbol, "market", "buy", amount)
+
+    def create_market_sell_order(self, symbol, amount):
+        return self.create_order(symbol, "market", "sell", amount)
+
+    def fetch_order(self, id, symbol=None):
+        if self.path:
+            self.set_quote(*self.path.pop(0))
+        return dict(self.orders[id])
+
+    def cancel_order(self, id, symbol=None):
+        order = self.orders[id]
+        if order['status'] == 'open':
+            order['status'] = 'canceled'
+        return dict(order)
+
+    def fill(self, order, price, maker):
+        qty = order['remaining']
+        fee_rate = self.maker_fee if maker else self.taker_fee
+        order.update(filled=order['filled'] + qty, remaining=0.0, average=price, cost=qty * price,
+                     status='closed', fee={'cost': qty * price * fee_rate, 'currency': self.quote})
+        sign = 1 if order['side'] == "buy" else -1
+        self.balances[self.base] += sign * qty
+        self.balances[self.quote] -= sign * qty * price + order['fee']['cost']
+
+    def match(self):
+        for order in self.orders.values():
+            if order['status'] != 'open':
+                continue
+            if order['stopPrice'] is not None:
+                # Stop-loss-limit sell: triggers when the bid reaches the stop, fills as taker
+                if self.bid <= order['stopPrice']:
+                    self.fill(order, min(self.bid, order['stopPrice']), maker=False)
+            elif order['side'] == "buy" and self.ask <= order['price']:
+                self.fill(order, order['price'], maker=True)
+            elif order['side'] == "sell" and self.bid >= order['price']:
+                self.fill(order, order['price'], maker=True)
+            else:
+                continue
+            self.cancel_siblings(order['id'])
+
+    # --- OCO order lists (Binance POST/GET/DELETE /api/v3/orderList) ---
+
+    def private_post_orderlist_oco(self, params):
+        qty = float(params['quantity'])
+        above = self.create_order(self.symbol, "limit", "sell", qty, float(params['abovePrice']), {'postOnly': True})
+        below = self.create_order(self.symbol, "limit", "sell", qty, float(params['belowPrice']),
+                                  {'stopPrice': float(params['belowStopPrice'])})
+        list_id = str(next(self.ids))
+        self.order_lists[list_id] = [above['id'], below['id']]
+        return {'orderListId': list_id, 'orders': [{'orderId': above['id']}, {'orderId': below['id']}]}
+
+    def private_get_orderlist(self, params):
+        legs = self.order_lists[str(params['orderListId'])]
+        done = any(self.orders[i]['status'] != 'open' for i in legs)
+        return {'orderListId': params['orderListId'], 'listOrderStatus': 'ALL_DONE' if done else 'EXECUTING',
+                'orders': [{'orderId': i} for i in legs]}
+
+    def private_get_openorderlist(self, params=None):
+        return [{'orderListId': list_id, 'symbol': self.market_id(self.symbol), 'listOrderStatus': 'EXECUTING',
+                 'orders': [{'orderId': i} for i in legs]}
+                for list_id, legs in self.order_lists.items()
+                if all(self.orders[i]['status'] == 'open' for i in legs)]
+
+    def private_delete_orderlist(self, params):
+        legs = self.order_lists.get(str(params['orderListId']))
+        if legs is None or any(self.orders[i]['status'] != 'open' for i in legs):
+            raise OrderNotFound("Unknown order list sent.")
+        for i in legs:
+            self.cancel_order(i)
+        return {'orderListId': params['orderListId'], 'listOrderStatus': 'ALL_DONE'}
+
+    def cancel_siblings(self, order_id):
+        for legs in self.order_lists.values():
+            if order_id in legs:
+                for i in legs:
+                    if i != order_id:
+                        self.cancel_order(i)
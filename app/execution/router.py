@@ -0,0 +1,207 @@
+import logging
+import time
+
+# Smart order routing for BinanceSpot.
+# Entries/exits are first posted as post-only limit orders at the touch (maker fee, no spread);
+# an order that has not filled within `timeout` is cancelled and re-posted at the new touch
+# (up to `max_chases` times), and whatever is left goes out as a market order. Orders above
+# `twap_notional` are split into `twap_slices` slices. TP/SL are placed on the exchange as an
+# OCO order list, so exits do not wait for the next candle close.
+# With `metrics` set, each order is timed in two stages: "order_submit" (request -> exchange
+# ack) and "order_fill" (ack -> filled, resting orders only; a market order fills in its ack).
+
+class OrderRouter:
+    def __init__(self, client, state, symbol="BTC/USDT", timeout=5.0, poll_interval=0.5, max_chases=2,
+                 twap_notional=None, twap_slices=4, twap_interval=5.0, stop_buffer=0.001, sleep=time.sleep,
+                 metrics=None):
+        self.client = client
+        self.state = state # ExecutionState (amount rounding / exchange rules)
+        self.symbol = symbol
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_chases = max_chases
+        self.twap_notional = twap_notional
+        self.twap_slices = twap_slices
+        self.twap_interval = twap_interval
+        self.stop_buffer = stop_buffer # stop-limit price below the stop trigger
+        self.sleep = sleep
+        self.metrics = metrics # app.monitoring.metrics.Metrics (or None)
+        self.stats = {'posted': 0.0, 'maker_filled': 0.0, 'taker_filled': 0.0, 'rejected': 0,
+                      'notional': 0.0, 'saved': 0.0}
+
+    def touch(self):
+        book = self.client.fetch_order_book(self.symbol, limit=5)
+        return book['bids'][0][0], book['asks'][0][0]
+
+    def execute(self, side, amount):
+        """Routes a buy/sell of `amount` base. Returns a ccxt-style order summary
+        (filled, average, cost, fees) covering every child order."""
+        bid, ask = self.touch()
+        if self.twap_notional and amount * (bid + ask) / 2 > self.twap_notional:
+            return self.twap(side, amount)
+        return self.passive(side, amount, bid, ask)
+
+    def twap(self, side, amount):
+        result = self.new_result(side, amount, *self.touch())
+        remaining = amount
+        for i in range(self.twap_slices):
+            if i > 0:
+                self.sleep(self.twap_interval)
+            size = remaining if i == self.twap_slices - 1 else amount / self.twap_slices
+            part = self.passive(side, size)
+            self.merge(result, part)
+            remaining -= part['filled']
+        return result
+
+    def passive(self, side, amount, bid=None, ask=None):
+        """Post-only at the touch, chase on timeout, market for the rest"""
+        if bid is None:
+            bid, ask = self.touch()
+        result = self.new_result(side, amount, bid, ask)
+        remaining = amount
+        for attempt in range(self.max_chases + 1):
+            if attempt > 0:
+                bid, ask = self.touch()
+            price = bid if side == "buy" else ask
+            qty = self.state.round_amount(remaining)
+            if self.state.validate(qty, price):
+                break
+            try:
+                order = self.submit("limit", side, qty, price, {'postOnly': True})
+            except Exception as e:
+                # Book moved through our price between touch() and the post
+                logging.info(f"Post-only {side} @ {price} rejected: {e}")
+                self.stats['rejected'] += 1
+                continue
+            self.stats['posted'] += qty
+            acked = time.perf_counter()
+            order = self.wait(order)
+            if float(order.get('filled') or 0.0) > 0:
+                self.observe("order_fill", time.perf_counter() - acked)
+            self.add_fill(result, order, maker=True)
+            remaining -= order['filled']
+
+        qty = self.state.round_amount(remaining)
+        if not self.state.validate(qty, bid if side == "sell" else ask):
+            order = self.submit("market", side, qty)
+            self.add_fill(result, order, maker=False)
+        return result
+
+    def submit(self, type, side, amount, price=None, params=None):
+        """create_order, timed as the order_submit stage (request -> exchange ack)"""
+        t0 = time.perf_counter()
+        order = self.client.create_order(self.symbol, type, side, amount, price, params or {})
+        self.observe("order_submit", time.perf_counter() - t0)
+        return order
+
+    def observe(self, stage, seconds):
+        if self.metrics is not None:
+            self.metrics.record(stage, seconds)
+
+    def wait(self, order):
+        """Polls a resting order until it closes or times out (then cancels it). Returns its final state."""
+        for _ in range(max(1, int(self.timeout / self.poll_interval))):
+            self.sleep(self.poll_interval)
+            order = self.client.fetch_order(order['id'], self.symbol)
+            if order['status'] != 'open':
+                return order
+        try:
+            self.client.cancel_order(order['id'], self.symbol)
+        except Exception as e:
+            logging.warning(f"Cancel of {order['id']} failed: {e}")
+        return self.client.fetch_order(order['id'], self.symbol)
+
+    def new_result(self, side, amount, bid, ask):
+        return {'side': side, 'amount': amount, 'filled': 0.0, 'cost': 0.0, 'average': None,
+                'fees': [], 'maker': 0.0, 'taker': 0.0, 'arrival': ask if side == "buy" else bid}
+
+    def add_fill(self, result, order, maker):
+        filled = float(order.get('filled') or 0.0)
+        if filled <= 0:
+            return
+        price = float(order.get('average') or order['price'])
+        cost = float(order.get('cost') or filled * price)
+        result['filled'] += filled
+        result['cost'] += cost
+        result['average'] = result['cost'] / result['filled']
+        result['maker' if maker else 'taker'] += filled
+        if order.get('fee'):
+            result['fees'].append(order['fee'])
+
+        # Effective spread saved vs crossing the spread at arrival (negative = paid more)
+        sign = 1 if result['side'] == "buy" else -1
+        self.stats['maker_filled' if maker else 'taker_filled'] += filled
+        self.stats['notional'] += cost
+        self.stats['saved'] += sign * (result['arrival'] * filled - cost)
+
+    def merge(self, result, part):
+        result['filled'] += part['filled']
+        result['cost'] += part['cost']
+        result['maker'] += part['maker']
+        result['taker'] += part['taker']
+        result['fees'] += part['fees']
+        if result['filled'] > 0:
+            result['average'] = result['cost'] / result['filled']
+
+    def report(self):
+        """Fill rate of posted maker orders and spread saved vs market orders at arrival"""
+        s = self.stats
+        filled = s['maker_filled'] + s['taker_filled']
+        return {
+            'fill_rate_pct': s['maker_filled'] / s['posted'] * 100 if s['posted'] else 0.0,
+            'maker_share_pct': s['maker_filled'] / filled * 100 if filled else 0.0,
+            'post_only_rejected': s['rejected'],
+            'spread_saved': s['saved'],
+            'spread_saved_bps': s['saved'] / s['notional'] * 10000 if s['notional'] else 0.0,
+        }
+
+    # --- Exchange-side TP/SL ---
+
+    def bracket(self, amount, take_profit, stop_loss):
+        """Places an OCO sell (limit-maker TP above, stop-loss-limit below). Returns the order list id."""
+        c = self.client
+        params = {
+            'symbol': c.market_id(self.symbol),
+            'side': 'SELL',
+            'quantity': c.amount_to_precision(self.symbol, amount),
+            'aboveType': 'LIMIT_MAKER',
+            'abovePrice': c.price_to_precision(self.symbol, take_profit),
+            'belowType': 'STOP_LOSS_LIMIT',
+            'belowStopPrice': c.price_to_precision(self.symbol, stop_loss),
+            'belowPrice': c.price_to_precision(self.symbol, stop_loss * (1 - self.stop_buffer)),
+            'belowTimeInForce': 'GTC',
+        }
+        return str(c.private_post_orderlist_oco(params)['orderListId'])
+
+    def bracket_fill(self, list_id):
+        """The filled leg of a finished OCO (None while both legs are still working)"""
+        status = self.client.private_get_orderlist({'orderListId': list_id})
+        if status['listOrderStatus'] != 'ALL_DONE':
+            return None
+        for leg in status['orders']:
+            order = self.client.fetch_order(str(leg['orderId']), self.symbol)
+            if float(order.get('filled') or 0.0) > 0:
+                return order
+        return {'filled': 0.0} # cancelled outside the bot
+
+    def cancel_bracket(self, list_id):
+        """Cancels a working OCO. Returns False if the exchange no longer has it open (a leg already filled)."""
+        try:
+            self.client.private_delete_orderlist({'symbol': self.client.market_id(self.symbol), 'orderListId': list_id})
+        except Exception as e:
+            # Binance -2011 "Unknown order list sent." (ccxt OrderNotFound): the list has finished
+            if type(e).__name__ != "OrderNotFound" and "unknown order" not in str(e).lower():
+                raise
+            return False
+        return True
+
+    def open_brackets(self):
+        """(order list id, quantity) of every OCO still working on the exchange (restart recovery)"""
+        market = self.client.market_id(self.symbol)
+        brackets = []
+        for order_list in self.client.private_get_openorderlist():
+            if order_list.get('symbol', market) != market:
+                continue
+            leg = self.client.fetch_order(str(order_list['orders'][0]['orderId']), self.symbol)
+            brackets.append((str(order_list['orderListId']), float(leg['amount'])))
+        return brackets
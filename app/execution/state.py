@@ -0,0 +1,101 @@
+import logging
+import math
+import threading
+import time
+
+# Execution-state cache for the order path.
+# Balances, last price and the market's trading rules (amount step, minimum quantity and
+# notional) are kept in memory so buy()/sell() can size and validate an order without any
+# REST call. Fills are booked locally as they happen; a background refresh (and a
+# reconcile right after each fill) brings the cache back in line with the exchange.
+
+class ExecutionState:
+    def __init__(self, symbol="BTC/USDT", max_age=60, tolerance=1e-6):
+        self.symbol = symbol
+        self.base, self.quote = symbol.split("/")
+        self.balances = {}
+        self.totals = {} # free + locked in open orders (e.g. a resting OCO)
+        self.last_price = None
+        self.updated = 0.0
+        self.max_age = max_age # seconds before the order path refreshes synchronously
+        self.tolerance = tolerance # relative balance drift ignored by reconcile
+        # Trading rules (filled by load_market; the defaults only stop obviously invalid orders)
+        self.amount_step = None
+        self.min_amount = 0.0
+        self.min_notional = 0.0
+        self.lock = threading.Lock()
+
+    def load_market(self, client):
+        """Reads precision / limits once from the exchange's market table"""
+        market = client.load_markets()[self.symbol]
+        step = market.get('precision', {}).get('amount')
+        if step is not None:
+            # ccxt reports either a tick size (0.00001) or a number of decimals (5)
+            self.amount_step = step if step < 1 else 10.0 ** -step
+        limits = market.get('limits', {})
+        self.min_amount = float((limits.get('amount') or {}).get('min') or 0.0)
+        self.min_notional = float((limits.get('cost') or {}).get('min') or 0.0)
+
+    def refresh(self, client):
+        bal = client.fetch_balance()
+        ticker = client.fetch_ticker(self.symbol)
+        with self.lock:
+            self.balances = {self.quote: float(bal[self.quote]['free']), self.base: float(bal[self.base]['free'])}
+            self.totals = {a: float(bal[a].get('total') or bal[a]['free']) for a in (self.quote, self.base)}
+            self.last_price = ticker['last']
+            self.updated = time.time()
+
+    def stale(self):
+        return self.last_price is None or time.time() - self.updated > self.max_age
+
+    def free(self, asset):
+        return self.balances.get(asset, 0.0)
+
+    def total(self, asset):
+        """Balance including amounts locked in open orders (as of the last refresh)"""
+        return self.totals.get(asset, self.free(asset))
+
+    def round_amount(self, amount):
+        """Rounds down to the market's amount step"""
+        if not self.amount_step:
+            return amount
+        return math.floor(amount / self.amount_step + 1e-9) * self.amount_step
+
+    def validate(self, amount, price):
+        """Reason the order would be rejected by the exchange rules (None if it passes)"""
+        if amount <= 0 or amount < self.min_amount:
+            return f"amount {amount:.8f} below minimum {self.min_amount}"
+        if amount * price < self.min_notional:
+            return f"notional {amount * price:.2f} below minimum {self.min_notional}"
+        return None
+
+    def apply_fill(self, side, amount, cost, fee_quote=0.0):
+        """Books a fill locally (amount in base, cost and fee in quote)"""
+        with self.lock:
+            sign = 1 if side == "buy" else -1
+            self.balances[self.base] = max(0.0, self.free(self.base) + sign * amount)
+            self.balances[self.quote] = max(0.0, self.free(self.quote) - sign * cost - fee_quote)
+
+    def reserve(self, asset, amount):
+        """Moves `amount` out of the free balance (locked in a resting order)"""
+        with self.lock:
+            self.balances[asset] = max(0.0, self.free(asset) - amount)
+
+    def release(self, asset, amount):
+        with self.lock:
+            self.balances[asset] = self.free(asset) + amount
+
+    def reconcile(self, client):
+        """Refreshes from the exchange and logs any drift from the locally booked balances.
+        Returns {asset: (expected, actual)} for assets that disagreed."""
+        expected = dict(self.balances)
+        self.refresh(client)
+        drift = {}
+        for asset, value in expected.items():
+            actual = self.free(asset)
+            if abs(actual - value) > self.tolerance * max(1.0, abs(actual)):
+                drift[asset] = (value, actual)
+        if drift:
+            logging.warning("Balance drift after fill: " + ", ".join(
+                f"{a} expected {e:.8f} actual {x:.8f}" for a, (e, x) in drift.items()))
+        return drift
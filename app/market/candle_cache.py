@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from app.storage.candle_store import CandleStore
+
+# Shared OHLCV cache keyed by (symbol, timeframe).
+# The engine's feed publishes every closed candle into a live CandleStore (data/live/), which
+# any process can read cheaply (memory-mapped, append-only). The dashboard's cache fills from
+# that store and the historical stores first and only asks the exchange for the tail they
+# don't have (normally just the forming candle). Concurrent requests for the same key share
+# one upstream call: the first caller fetches, the others wait on the key's lock and then
+# find the entry fresh.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LIVE_DIR = os.path.join(BASE_DIR, 'data', 'live')
+HISTORY_DIR = os.path.join(BASE_DIR, 'data', 'historical')
+
+UNIT_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+def timeframe_ms(timeframe):
+    """'5m' -> 300000"""
+    return int(timeframe[:-1]) * UNIT_MS[timeframe[-1]]
+
+def store_path(base, symbol, timeframe):
+    return os.path.join(base, f"{symbol.replace('/', '_')}_{timeframe}")
+
+class CacheEntry:
+    def __init__(self):
+        self.rows = {} # ts -> [ts, open, high, low, close, volume]
+        self.fetched_at = None
+        self.store_rows = {} # store path -> rows already loaded
+        self.lock = threading.Lock()
+
+class CandleCache:
+    def __init__(self, exchange=None, live_dir=LIVE_DIR, history_dir=HISTORY_DIR, max_candles=1000, ttl=2.0, clock=time.time):
+        self.exchange = exchange # None = publish-only (engine side)
+        self.live_dir = live_dir
+        self.history_dir = history_dir
+        self.max_candles = max_candles
+        self.ttl = ttl # max age of the forming candle before the tail is re-fetched
+        self.clock = clock
+        self.entries = {}
+        self.lock = threading.Lock() # entries dict
+        self.upstream_calls = 0
+
+    def entry(self, symbol, timeframe):
+        with self.lock:
+            return self.entries.setdefault((symbol, timeframe), CacheEntry())
+
+    # --- Engine side ---
+
+    def publish(self, symbol, timeframe, candles):
+        """Stores closed candles ([ts_ms, o, h, l, c, v] rows) for other processes. Returns rows written."""
+        if not candles:
+            return 0
+        df = pd.DataFrame([list(c) for c in candles], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = df['timestamp'].astype('int64')
+        return CandleStore(store_path(self.live_dir, symbol, timeframe)).append(df)
+
+    # --- Reader side ---
+
+    def get(self, symbol, timeframe, limit=300):
+        """Last `limit` candles (the forming one included), oldest first"""
+        limit = max(1, min(int(limit), self.max_candles))
+        entry = self.entry(symbol, timeframe)
+        if not self.fresh(entry, limit):
+            with entry.lock:
+                if not self.fresh(entry, limit): # another request may have refreshed it meanwhile
+                    self.refresh(entry, symbol, timeframe, limit)
+        with entry.lock:
+            return [entry.rows[ts] for ts in sorted(entry.rows)[-limit:]]
+
+    def fresh(self, entry, limit):
+        return (entry.fetched_at is not None and self.clock() - entry.fetched_at < self.ttl
+                and len(entry.rows) >= limit)
+
+    def refresh(self, entry, symbol, timeframe, limit):
+        for base in (self.history_dir, self.live_dir):
+            if base:
+                self.load_store(entry, store_path(base, symbol, timeframe))
+        step = timeframe_ms(timeframe)
+        now = int(self.clock() * 1000)
+        current = now - now % step # open time of the forming candle
+        recent = sorted(entry.rows)[-limit:]
+        last = recent[-1] if recent else None
+        # Usable = enough contiguous candles, and the gap to now fits in one request
+        covered = (len(recent) >= limit and recent[-1] - recent[0] == step * (len(recent) - 1)
+                   and current - last < step * self.max_candles)
+        if self.exchange is None:
+            entry.fetched_at = self.clock()
+            return
+        if covered:
+            # Only the missing tail: last cached candle (may have been forming) through now
+            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=last, limit=(current - last) // step + 1)
+        else:
+            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        self.upstream_calls += 1
+        self.merge(entry, ohlcv)
+        entry.fetched_at = self.clock()
+
+    def load_store(self, entry, path):
+        """Pulls rows appended to a CandleStore since the last look (reads the meta file only when unchanged)"""
+        store = CandleStore(path)
+        rows, seen = len(store), entry.store_rows.get(path, 0)
+        if rows <= seen:
+            return
+        lo = max(seen, rows - self.max_candles)
+        columns = [store.column(name)[lo:rows] for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume')]
+        self.merge(entry, zip(*columns))
+        entry.store_rows[path] = rows
+
+    def merge(self, entry, candles):
+        for c in candles:
+            entry.rows[int(c[0])] = [int(c[0])] + [float(v) for v in c[1:6]]
+        if len(entry.rows) > self.max_candles:
+            for ts in sorted(entry.rows)[:-self.max_candles]:
+                del entry.rows[ts]
@@ -1,23 +1,50 @@
+import queue
+import threading
+
 import ccxt
 import pandas as pd
 from datetime import datetime
 
 class DataFeed:
-    def get_latest(self):
+    def get_latest(self, limit=None):
         raise NotImplementedError
 
 class BinanceDataFeed(DataFeed):
-    def __init__(self, symbol="BTC/USDT", timeframe="5m", limit=300):
+    def __init__(self, symbol="BTC/USDT", timeframe="5m", limit=300, cache=None):
         self.symbol = symbol
         self.timeframe = timeframe
         self.limit = limit
         self.exchange = ccxt.binance()
+        self.cache = cache # CandleCache that closed candles are published to (dashboard charts)
+        self.pending = queue.Queue() # (timeframe, candles) waiting to be written by the publisher thread
+        self.publisher = None
+
+    def publish(self, timeframe, ohlcv):
+        """Queues the closed candles of a response (all but the forming last one) for the publisher thread"""
+        if self.cache is None or len(ohlcv) < 2:
+            return
+        if self.publisher is None:
+            self.publisher = threading.Thread(target=self._publish_loop, name="candle-publisher", daemon=True)
+            self.publisher.start()
+        self.pending.put((timeframe, ohlcv[:-1]))
+
+    def _publish_loop(self):
+        # Disk writes happen here, off the fetch path
+        while True:
+            timeframe, candles = self.pending.get()
+            try:
+                self.cache.publish(self.symbol, timeframe, candles)
+            except Exception as e:
+                print(f"Error publishing candles: {e}")
+            finally:
+                self.pending.task_done()
         
     def get_1h_trend(self):
         """Fetches 1h candles to determine long-term trend (1 or -1)"""
         try:
             # We need 200 candles for SMA 200
             ohlcv = self.exchange.fetch_ohlcv(self.symbol, "1h", limit=210)
+            self.publish("1h", ohlcv)
             if not ohlcv or len(ohlcv) < 200:
                 return 0 # Neutral fallback
             
@@ -33,10 +60,11 @@ class BinanceDataFeed(DataFeed):
             print(f"Error fetching 1h trend: {e}")
             return 0
 
-    def get_latest(self):
+    def get_latest(self, limit=None):
         try:
             # Fetch OHLCV: timestamp, open, high, low, close, volume
-            ohlcv = self.exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=self.limit)
+            ohlcv = self.exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=limit or self.limit)
+            self.publish(self.timeframe, ohlcv)
             
             if not ohlcv:
                 return pd.DataFrame()
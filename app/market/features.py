@@ -0,0 +1,115 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import ta
+
+from app.storage.candle_store import candle_hash, to_ms
+
+# Shared feature pipeline for training (scripts/train_model.py) and trading (BTCMLStrategyBase).
+# Bump FEATURE_SET_VERSION whenever compute_features changes so cached matrices are rebuilt.
+
+FEATURE_SET_VERSION = 1
+
+# Model input order (train and predict must agree)
+FEATURES = [
+    "bb_width", "rsi", "adx", "dist_from_sma200", "volume_rel",
+    "rsi_lag1", "rsi_lag2", "rsi_change",
+    "adx_lag1", "adx_lag2", "adx_change",
+    "bb_width_lag1", "bb_width_lag2", "bb_width_change",
+    "volume_rel_lag1", "volume_rel_lag2", "volume_rel_change"
+]
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(BASE_DIR, 'data', 'cache', 'features')
+
+def compute_features(df):
+    """Indicator + feature columns appended to a copy of an OHLCV frame (no dropna)"""
+    df = df.copy()
+
+    # 1. Volatility: Bollinger Bands (20, 2)
+    bb = ta.volatility.BollingerBands(close=df["close"], window=20, window_dev=2)
+    df["bb_high"] = bb.bollinger_hband()
+    df["bb_mid"] = bb.bollinger_mavg() # SMA 20
+    df["bb_low"] = bb.bollinger_lband()
+
+    # 2. Trend Strength: ADX (14)
+    adx = ta.trend.ADXIndicator(high=df["high"], low=df["low"], close=df["close"], window=14)
+    df["adx"] = adx.adx()
+
+    # 3. Momentum: RSI (14)
+    df["rsi"] = ta.momentum.rsi(df["close"], window=14)
+
+    # 4. Width / Long-term trend
+    df["bb_width"] = (df["bb_high"] - df["bb_low"]) / df["bb_mid"]
+    df["sma_200"] = ta.trend.sma_indicator(df["close"], window=200)
+    df["dist_from_sma200"] = (df["close"] - df["sma_200"]) / df["sma_200"]
+
+    # 5. Volume: spike relative to recent average
+    df["volume_sma"] = df["volume"].rolling(window=20).mean()
+    df["volume_rel"] = df["volume"] / df["volume_sma"]
+
+    # 6. Lagged Features
+    for col in ["rsi", "adx", "bb_width", "volume_rel"]:
+        df[f"{col}_lag1"] = df[col].shift(1)
+        df[f"{col}_lag2"] = df[col].shift(2)
+        df[f"{col}_change"] = df[col] - df[f"{col}_lag1"]
+
+    return df
+
+class FeatureCache:
+    """On-disk cache of compute_features output.
+    Keyed by timeframe, data range, feature-set version and a hash of the candles,
+    so any change to the source data produces a new key (stale entries are never read)."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries=8):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def key(self, df, timeframe):
+        ts = to_ms(df["timestamp"])
+        first = int(ts[0]) if len(ts) else 0
+        last = int(ts[-1]) if len(ts) else 0
+        return f"{timeframe}_{first}_{last}_{len(ts)}_v{FEATURE_SET_VERSION}_{candle_hash(df)}"
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def features(self, df, timeframe):
+        """compute_features(df), served from disk when the same candles were seen before"""
+        key = self.key(df, timeframe)
+        path = self.path(key)
+        if os.path.exists(path):
+            try:
+                with np.load(path) as cached:
+                    columns = json.loads(str(cached["columns"]))
+                    values = cached["values"]
+                out = df.copy()
+                for i, col in enumerate(columns):
+                    out[col] = values[:, i]
+                return out
+            except Exception as e:
+                print(f"Feature cache read failed ({e}). Recomputing...")
+
+        out = compute_features(df)
+        new_columns = [c for c in out.columns if c not in df.columns]
+        self.save(path, new_columns, out[new_columns].to_numpy(dtype=np.float64))
+        return out
+
+    def save(self, path, columns, values):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = path + ".tmp.npz"
+            np.savez(tmp, columns=json.dumps(columns), values=values)
+            os.replace(tmp, path)
+            self.evict()
+        except Exception as e:
+            print(f"Feature cache write failed: {e}")
+
+    def evict(self):
+        """Keeps the newest max_entries matrices"""
+        files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".npz") and ".tmp" not in f]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for f in files[self.max_entries:]:
+            os.remove(f)
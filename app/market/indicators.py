@@ -0,0 +1,264 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Streaming (incremental) versions of the indicators computed by
+# BTCVolatilityBreakout.indicators + BTCMLStrategyBase.indicators.
+# Each update() costs O(1) per closed candle instead of rerunning `ta` over the whole frame.
+# Formulas mirror the `ta` implementations so the live values match the batch path.
+
+class RollingWindow:
+    """Fixed-size window with running mean / population variance.
+    Re-syncs from the buffer once per window length to stop float drift."""
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = np.zeros(window)
+        self.count = 0
+        self.pos = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates_since_sync = 0
+
+    @property
+    def full(self):
+        return self.count >= self.window
+
+    def push(self, value):
+        if not self.full:
+            # Welford add (warmup)
+            self.buffer[self.pos] = value
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Welford replace (oldest out, newest in)
+            old = self.buffer[self.pos]
+            self.buffer[self.pos] = value
+            old_mean = self.mean
+            self.mean += (value - old) / self.window
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+
+        self.pos = (self.pos + 1) % self.window
+        self.updates_since_sync += 1
+        if self.full and self.updates_since_sync >= self.window:
+            self.mean = float(self.buffer.mean())
+            self.m2 = float(((self.buffer - self.mean) ** 2).sum())
+            self.updates_since_sync = 0
+
+    def average(self):
+        return self.mean if self.full else math.nan
+
+    def std(self):
+        """Population std (ddof=0, same as ta's Bollinger Bands)"""
+        return math.sqrt(max(self.m2 / self.window, 0.0)) if self.full else math.nan
+
+
+class WilderRSI:
+    """RSI with the same ewm(alpha=1/window, adjust=False) recursion pandas uses"""
+
+    def __init__(self, window=14):
+        self.window = window
+        self.alpha = 1.0 / window
+        self.prev_close = None
+        self.avg_up = None
+        self.avg_down = None
+        self.count = 0
+
+    def _ewm(self, avg, value):
+        # pandas ewma (adjust=False): ((1-a)*avg + a*x) / ((1-a) + a)
+        if avg is None:
+            return value
+        if avg == value:
+            return avg
+        old_wt = 1.0 - self.alpha
+        return (old_wt * avg + self.alpha * value) / (old_wt + self.alpha)
+
+    def update(self, close):
+        # First candle has no diff; ta treats it as a 0 move
+        up = down = 0.0
+        if self.prev_close is not None:
+            diff = close - self.prev_close
+            up = diff if diff > 0 else 0.0
+            down = -diff if diff < 0 else 0.0
+        self.prev_close = close
+
+        self.avg_up = self._ewm(self.avg_up, up)
+        self.avg_down = self._ewm(self.avg_down, down)
+        self.count += 1
+
+        if self.count < self.window:
+            return math.nan
+        if self.avg_down == 0:
+            return 100.0
+        return 100 - (100 / (1 + self.avg_up / self.avg_down))
+
+
+class WilderADX:
+    """ADX following ta.trend.ADXIndicator (Wilder sums seeded from the first candle)"""
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev = None # (high, low, close)
+        self.position = -1
+        self.trs = self.dip = self.din = 0.0
+        self.dx_seed = []
+        self.adx = 0.0
+
+    def update(self, high, low, close):
+        self.position += 1
+        prev, self.prev = self.prev, (high, low, close)
+        if prev is None:
+            return 0.0
+        prev_high, prev_low, prev_close = prev
+        w = self.window
+
+        # True Range and Directional Movement
+        tr = max(high, prev_close) - min(low, prev_close)
+        diff_up = high - prev_high
+        diff_down = prev_low - low
+        pos = diff_up if (diff_up > diff_down and diff_up > 0) else 0.0
+        neg = diff_down if (diff_down > diff_up and diff_down > 0) else 0.0
+
+        if self.position <= w:
+            # Seed: plain sums over the first `window` moves
+            self.trs += tr
+            self.dip += pos
+            self.din += neg
+            if self.position < w:
+                return 0.0
+        else:
+            self.trs = self.trs - (self.trs / float(w)) + tr
+            self.dip = self.dip - (self.dip / float(w)) + pos
+            self.din = self.din - (self.din / float(w)) + neg
+
+        # Directional Index
+        di_pos = 100 * (self.dip / self.trs) if self.trs != 0 else 0.0
+        di_neg = 100 * (self.din / self.trs) if self.trs != 0 else 0.0
+        dx = 100 * abs((di_pos - di_neg) / (di_pos + di_neg)) if (di_pos + di_neg) != 0 else 0.0
+
+        if self.position < 2 * w - 1:
+            self.dx_seed.append(dx)
+            return 0.0
+        if self.position == 2 * w - 1:
+            self.dx_seed.append(dx)
+            self.adx = float(np.mean(self.dx_seed))
+            self.dx_seed = []
+        else:
+            self.adx = ((self.adx * (w - 1)) + dx) / float(w)
+        return self.adx
+
+
+class StreamingIndicators:
+    """Incremental indicator state for the ML strategies.
+    Feed closed candles with update(); frame() returns the recent rows in the same
+    layout as BTCMLStrategyBase.indicators (NaN warmup rows are never emitted)."""
+
+    base_columns = ["open", "high", "low", "close", "volume"]
+    indicator_columns = [
+        "bb_high", "bb_mid", "bb_low", "adx", "rsi",
+        "bb_width", "sma_200", "dist_from_sma200", "volume_sma", "volume_rel"
+    ]
+    lagged = ["rsi", "adx", "bb_width", "volume_rel"]
+
+    def __init__(self, history=250, bb_window=20, bb_dev=2, rsi_window=14, adx_window=14,
+                 sma_window=200, volume_window=20):
+        self.bb_dev = bb_dev
+        self.bb = RollingWindow(bb_window)
+        self.sma = RollingWindow(sma_window)
+        self.volume = RollingWindow(volume_window)
+        self.rsi = WilderRSI(rsi_window)
+        self.adx = WilderADX(adx_window)
+
+        # Last two values of each lagged feature
+        self.lags = {col: [math.nan, math.nan] for col in self.lagged}
+
+        self.columns = list(self.base_columns) + list(self.indicator_columns)
+        for col in self.lagged:
+            self.columns += [f"{col}_lag1", f"{col}_lag2", f"{col}_change"]
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+
+        # Ring buffer of completed rows
+        self.history = history
+        self.rows = np.zeros((history, len(self.columns)))
+        self.timestamps = np.empty(history, dtype=object)
+        self.row_count = 0
+        self.last_timestamp = None
+        self.last_row = None
+
+    @property
+    def ready(self):
+        return self.last_row is not None
+
+    def update(self, timestamp, open_, high, low, close, volume):
+        """Consume one closed candle. Returns the feature row (dict) or None while warming up."""
+        self.last_timestamp = timestamp
+
+        # 1. Bollinger Bands (20, 2)
+        self.bb.push(close)
+        bb_mid = self.bb.average()
+        bb_std = self.bb.std()
+        bb_high = bb_mid + self.bb_dev * bb_std
+        bb_low = bb_mid - self.bb_dev * bb_std
+
+        # 2. ADX / RSI (Wilder smoothing)
+        adx = self.adx.update(high, low, close)
+        rsi = self.rsi.update(close)
+
+        # 3. SMA 200 and Volume
+        self.sma.push(close)
+        sma_200 = self.sma.average()
+        self.volume.push(volume)
+        volume_sma = self.volume.average()
+
+        values = {
+            "open": open_, "high": high, "low": low, "close": close, "volume": volume,
+            "bb_high": bb_high, "bb_mid": bb_mid, "bb_low": bb_low, "adx": adx, "rsi": rsi,
+            "bb_width": (bb_high - bb_low) / bb_mid,
+            "sma_200": sma_200,
+            "dist_from_sma200": (close - sma_200) / sma_200,
+            "volume_sma": volume_sma,
+            "volume_rel": volume / volume_sma,
+        }
+
+        # 4. Lagged Features
+        for col in self.lagged:
+            lag1, lag2 = self.lags[col]
+            values[f"{col}_lag1"] = lag1
+            values[f"{col}_lag2"] = lag2
+            values[f"{col}_change"] = values[col] - lag1
+            self.lags[col] = [values[col], lag1]
+
+        row = np.array([values[col] for col in self.columns], dtype=np.float64)
+        if np.isnan(row).any():
+            return None
+
+        slot = self.row_count % self.history
+        self.rows[slot] = row
+        self.timestamps[slot] = timestamp
+        self.row_count += 1
+
+        values["timestamp"] = timestamp
+        self.last_row = values
+        return values
+
+    def update_frame(self, df):
+        """Feed every candle of an OHLCV frame (e.g. the warmup fetch)"""
+        cols = [df[c].to_numpy(dtype=np.float64) for c in self.base_columns]
+        for i, ts in enumerate(df["timestamp"]):
+            self.update(ts, *(c[i] for c in cols))
+
+    def features(self, features_list):
+        """Current feature vector in model order (1 x N, ready for predict_proba)"""
+        return np.array([[self.last_row[f] for f in features_list]])
+
+    def frame(self):
+        """Completed rows (oldest first) as a DataFrame, like strategy.indicators(df)"""
+        n = min(self.row_count, self.history)
+        start = self.row_count - n
+        order = [(start + i) % self.history for i in range(n)]
+
+        df = pd.DataFrame(self.rows[order], columns=self.columns)
+        df.insert(0, "timestamp", pd.to_datetime(list(self.timestamps[order])))
+        return df
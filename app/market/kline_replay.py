@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+
+import pandas as pd
+from aiohttp import web
+
+from app.market.kline_stream import TIMEFRAME_MS
+
+class KlineReplayServer:
+    """Local stand-in for the Binance kline websocket.
+    Replays historical OHLCV frames as combined-stream kline messages so
+    KlineStreamFeed (and the live loop) can be tested offline.
+
+    frames: {timeframe: DataFrame with timestamp/open/high/low/close/volume}
+    delay: seconds between candle closes (0 = as fast as possible)"""
+
+    def __init__(self, frames, symbol="BTC/USDT", host="127.0.0.1", port=0, delay=0.0, partial_updates=True):
+        self.frames = frames
+        self.pair = symbol.replace("/", "").lower()
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.partial_updates = partial_updates
+
+        self.loop = None
+        self.runner = None
+        self.thread = None
+        self.started = threading.Event()
+        self.finished = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/stream"
+
+    def events(self, timeframes):
+        """Kline messages for the requested timeframes, ordered by candle close time"""
+        events = []
+        for tf in timeframes:
+            df = self.frames.get(tf)
+            if df is None:
+                continue
+            ts = pd.to_datetime(df["timestamp"]).astype("datetime64[ms]").astype("int64").to_numpy()
+            cols = [df[c].to_numpy() for c in ["open", "high", "low", "close", "volume"]]
+            for i, t in enumerate(ts):
+                close_time = int(t) + TIMEFRAME_MS[tf]
+                o, h, l, c, v = (float(col[i]) for col in cols)
+                kline = {"t": int(t), "T": close_time - 1, "s": self.pair.upper(), "i": tf,
+                         "o": str(o), "h": str(h), "l": str(l), "c": str(c), "v": str(v), "x": True}
+                if self.partial_updates:
+                    # Forming candle update first (feed must ignore it)
+                    events.append((close_time - 1, {**kline, "c": str(o), "x": False}))
+                events.append((close_time, kline))
+        events.sort(key=lambda e: e[0])
+        return [{"stream": f"{self.pair}@kline_{k['i']}", "data": {"e": "kline", "E": t, "s": k["s"], "k": k}}
+                for t, k in events]
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        streams = request.query.get("streams", "").split("/")
+        timeframes = [s.split("@kline_")[1] for s in streams if "@kline_" in s]
+        for msg in self.events(timeframes):
+            await ws.send_str(json.dumps(msg))
+            if self.delay and msg["data"]["k"]["x"]:
+                await asyncio.sleep(self.delay)
+
+        self.finished.set()
+        # Keep the connection open like the real stream
+        async for _ in ws:
+            pass
+        return ws
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/stream", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.started.set()
+
+    def _thread_main(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start())
+        self.loop.run_forever()
+        self.loop.run_until_complete(self.runner.cleanup())
+        self.loop.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._thread_main, name="kline-replay", daemon=True)
+        self.thread.start()
+        self.started.wait(5)
+        return self
+
+    def stop(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(timeout=5)
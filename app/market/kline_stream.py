@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+import aiohttp
+import pandas as pd
+
+from app.market.data_feed import DataFeed
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+TIMEFRAME_MS = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "1h": 3_600_000}
+
+class KlineStreamFeed(DataFeed):
+    """Push-based data feed over the Binance kline websocket.
+    Keeps a ring buffer of closed candles per timeframe (main + 1h trend),
+    and lets the engine block on wait_for_close() instead of sleeping on a timer."""
+
+    def __init__(self, symbol="BTC/USDT", timeframe="5m", limit=500, trend_timeframe="1h",
+                 trend_limit=210, url=BINANCE_STREAM_URL, seed_exchange="binance", cache=None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.limit = limit
+        self.trend_timeframe = trend_timeframe
+        self.url = url
+
+        # Ring buffers of closed candles: (timestamp_ms, open, high, low, close, volume)
+        self.buffers = {
+            timeframe: deque(maxlen=limit),
+            trend_timeframe: deque(maxlen=trend_limit),
+        }
+        self.lock = threading.Lock()
+        self.closed = threading.Condition(self.lock)
+        self.close_count = 0 # closed main-timeframe candles received
+        self.consumed = 0 # closes already handed out by wait_for_close
+
+        self.seed_exchange = seed_exchange
+        self.cache = cache # CandleCache that closed candles are published to (dashboard charts)
+        self.thread = None
+        self.loop = None
+        self.task = None
+        self.running = False
+        self.connected = threading.Event()
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Seeds history over REST (once) and starts the websocket thread"""
+        if self.seed_exchange:
+            self.seed()
+        self.running = True
+        self.thread = threading.Thread(target=self._thread_main, name="kline-stream", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.loop and self.task:
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        if self.thread:
+            self.thread.join(timeout=5)
+        with self.closed:
+            self.closed.notify_all()
+
+    def seed(self):
+        """Fills the ring buffers with recent closed candles over REST"""
+        import ccxt
+        exchange = getattr(ccxt, self.seed_exchange)() if isinstance(self.seed_exchange, str) else self.seed_exchange
+        for tf, buf in self.buffers.items():
+            try:
+                ohlcv = exchange.fetch_ohlcv(self.symbol, tf, limit=buf.maxlen + 1)
+                now_ms = time.time() * 1000
+                closed = [c for c in ohlcv if c[0] + TIMEFRAME_MS.get(tf, 0) <= now_ms] # skip the forming candle
+                with self.lock:
+                    for c in closed:
+                        self._store(tf, c)
+                self.publish(tf, closed)
+            except Exception as e:
+                logging.warning(f"Kline seed failed for {tf}: {e}")
+
+    def publish(self, tf, candles):
+        if self.cache is None:
+            return
+        try:
+            self.cache.publish(self.symbol, tf, candles)
+        except Exception as e:
+            logging.warning(f"Candle cache publish failed for {tf}: {e}")
+
+    # --- DataFeed API ---
+
+    def get_latest(self, limit=None):
+        with self.lock:
+            rows = list(self.buffers[self.timeframe])
+        if limit:
+            rows = rows[-limit:]
+        if not rows:
+            return pd.DataFrame()
+        df = pd.DataFrame(rows, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def get_1h_trend(self):
+        """Same rule as BinanceDataFeed.get_1h_trend, from the 1h ring buffer (no REST call)"""
+        with self.lock:
+            closes = pd.Series([c[4] for c in self.buffers[self.trend_timeframe]])
+        if len(closes) < 200:
+            return 0 # Neutral fallback
+        sma200 = closes.rolling(window=200).mean()
+        return 1 if closes.iloc[-1] > sma200.iloc[-1] else -1
+
+    def wait_for_close(self, timeout=None):
+        """Blocks until a new main-timeframe candle closes. Returns False on timeout."""
+        with self.closed:
+            if self.close_count == self.consumed:
+                self.closed.wait_for(lambda: self.close_count > self.consumed or not self.running, timeout)
+            if self.close_count == self.consumed:
+                return False
+            self.consumed = self.close_count
+            return True
+
+    # --- Stream Handling ---
+
+    def stream_names(self):
+        pair = self.symbol.replace("/", "").lower()
+        return [f"{pair}@kline_{tf}" for tf in self.buffers]
+
+    def _store(self, tf, candle):
+        buf = self.buffers[tf]
+        if buf and candle[0] == buf[-1][0]:
+            buf[-1] = tuple(candle) # exchange re-sent the same candle
+            return False
+        if buf and candle[0] < buf[-1][0]:
+            return False # stale
+        buf.append(tuple(candle))
+        return True
+
+    def handle_message(self, payload):
+        """Parses one combined-stream message; stores the candle if it is closed"""
+        k = payload.get("data", payload).get("k")
+        if not k or not k.get("x"):
+            return # candle still forming
+        tf = k["i"]
+        if tf not in self.buffers:
+            return
+        candle = (int(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]))
+        with self.closed:
+            stored = self._store(tf, candle)
+            if stored and tf == self.timeframe:
+                self.close_count += 1
+                self.closed.notify_all()
+        if stored:
+            self.publish(tf, [candle])
+
+    def _thread_main(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self._run())
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass # stopped by stop()
+        finally:
+            self.loop.close()
+
+    async def _run(self):
+        url = f"{self.url}?streams={'/'.join(self.stream_names())}"
+        backoff = 1
+        while self.running:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(url, heartbeat=30) as ws:
+                        logging.info(f"Kline stream connected: {', '.join(self.stream_names())}")
+                        self.connected.set()
+                        backoff = 1
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self.handle_message(json.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+            except Exception as e:
+                logging.warning(f"Kline stream error: {e}")
+            self.connected.clear()
+            if self.running:
+                logging.info(f"Reconnecting kline stream in {backoff}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                if self.seed_exchange:
+                    # Backfill anything missed while disconnected
+                    await self.loop.run_in_executor(None, self.seed)
@@ -12,7 +12,6 @@ ACCESS_KEY = os.getenv("DASHBOARD_KEY", "btc_alpha_secure_777")
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 LOG_FILE = os.path.join(BASE_DIR, 'trading.log')
-CSV_FILE = os.path.join(BASE_DIR, 'data', 'live_trades.csv')
 
 import sys
 sys.path.append(BASE_DIR)
@@ -122,6 +121,14 @@ HTML_TEMPLATE = """
                     <div id="cfg-msg" style="font-size: 0.8em; text-align: center; height: 20px;"></div>
                 </div>
                 
+                <div class="panel-header">LOOP LATENCY (ms)</div>
+                <div style="overflow: auto; max-height: 200px;">
+                    <table id="latency-table">
+                        <thead><tr><th>Stage</th><th>p50</th><th>p99</th><th>Max</th></tr></thead>
+                        <tbody></tbody>
+                    </table>
+                </div>
+
                 <div class="panel-header">LATEST TRADES</div>
                 <div style="flex: 1; overflow: auto; max-height: 300px;">
                     <table id="trades-table">
@@ -146,6 +153,7 @@ HTML_TEMPLATE = """
                         <option value="ml_5m">Strategy: 5m Swing</option>
                     </select>
                     <button onclick="runBacktest()" style="background: #a371f7;">RUN BACKTEST</button>
+                    <button onclick="loadRuns()" style="background: #30363d;">PAST RUNS</button>
                 </div>
 
                 <div style="display: flex; flex-direction: column; gap: 10px;">
@@ -221,14 +229,12 @@ HTML_TEMPLATE = """
                 // Chart Disabled in Debug Mode
                 // ...
                 
-                // 2. Start Polling
-                fetchStatus();
-                fetchLogs();
-                fetchTrades();
-                
-                setInterval(fetchStatus, 2000);
-                setInterval(fetchLogs, 2000);
-                setInterval(fetchTrades, 5000);
+                // 2. Server push (one shared stream per tab); poll only if the browser lacks SSE
+                if (window.EventSource) {
+                    startStream();
+                } else {
+                    startPolling();
+                }
                 
             } catch (e) {
                 alert("FATAL INIT ERROR: " + e.message);
@@ -236,6 +242,39 @@ HTML_TEMPLATE = """
             }
         }
 
+        let pollTimers = [];
+        function startPolling() {
+            if (pollTimers.length) return;
+            fetchStatus();
+            fetchLogs();
+            fetchTrades();
+            fetchLatency();
+            pollTimers = [
+                setInterval(fetchStatus, 2000),
+                setInterval(fetchLogs, 2000),
+                setInterval(fetchTrades, 5000),
+                setInterval(fetchLatency, 10000),
+            ];
+        }
+
+        let tradeRows = [];
+        function startStream() {
+            const source = new EventSource(`/api/stream?key=${API_KEY}`);
+            source.addEventListener('status', e => renderStatus(JSON.parse(e.data)));
+            source.addEventListener('metrics', e => renderLatency(JSON.parse(e.data)));
+            source.addEventListener('logs', e => appendLogs(JSON.parse(e.data)));
+            source.addEventListener('trades', e => {
+                tradeRows = tradeRows.concat(JSON.parse(e.data)).slice(-50);
+                renderTrades(tradeRows);
+            });
+            source.onopen = () => {
+                // The server replays the latest state on (re)connect
+                tradeRows = [];
+                document.getElementById('logs-content').innerHTML = "";
+            };
+            source.onerror = () => uiLog("Live stream interrupted, reconnecting...", "warn");
+        }
+
         // --- LAB FUNCTIONS ---
         function switchTab(tab) {
             if (tab === 'live') {
@@ -283,6 +322,37 @@ HTML_TEMPLATE = """
             await streamCmd(`/api/backtest?key=${API_KEY}`, { strategy: strat, days: parseInt(days) });
         }
 
+        async function loadRuns() {
+            const out = document.getElementById('lab-output');
+            try {
+                const res = await fetch(`/api/backtests?key=${API_KEY}`);
+                const runs = await res.json();
+                if (!runs.length) { out.innerText = "No stored runs yet."; return; }
+                out.innerHTML = runs.map(r =>
+                    `<div style="cursor:pointer" onclick="loadRun('${r.run_id}')">${r.run_id} | Trades: ${r.trades} | ` +
+                    `Return: ${r.return_pct.toFixed(2)}% | Sharpe: ${r.sharpe.toFixed(2)} | DD: ${r.max_drawdown_bar_pct.toFixed(2)}%</div>`
+                ).join("");
+            } catch (e) {
+                out.innerText = "Error: " + e.message;
+            }
+        }
+
+        async function loadRun(runId) {
+            const out = document.getElementById('lab-output');
+            try {
+                const res = await fetch(`/api/backtests/${runId}?key=${API_KEY}&trades=20`);
+                const data = await res.json();
+                const m = data.meta.metrics;
+                out.innerText = `${runId}\n` +
+                    `Params: ${JSON.stringify(data.meta.params)}\n` +
+                    Object.entries(m).map(([k, v]) => `${k}: ${v.toFixed(2)}`).join("\n") +
+                    `\n\nLast trades:\n` +
+                    data.trades.map(t => `${new Date(t.exit_time).toISOString()} ${t.entry.toFixed(2)} -> ${t.exit.toFixed(2)} PnL $${t.pnl.toFixed(2)}`).join("\n");
+            } catch (e) {
+                out.innerText = "Error: " + e.message;
+            }
+        }
+
         async function runTrain() {
             const type = document.getElementById('train-type').value;
             const days = document.getElementById('lab-days').value;
@@ -290,14 +360,20 @@ HTML_TEMPLATE = """
         }
 
         // --- DATA FETCHING ---
-        let lastLogLine = "";
+        let logCursor = null;
         
         async function fetchStatus() {
             try {
                 const res = await fetch(`/api/status?key=${API_KEY}`);
                 if (!res.ok) throw new Error(`HTTP ${res.status}`);
-                const data = await res.json();
-                
+                renderStatus(await res.json());
+            } catch(e) { 
+                uiLog("Status Fetch Error: " + e.message, "error");
+            }
+        }
+
+        function renderStatus(data) {
+            try {
                 // Defensive rendering
                 const price = typeof data.price === 'number' ? data.price : 0.0;
                 document.getElementById('m-price').innerText = "$" + price.toFixed(2);
@@ -319,7 +395,7 @@ HTML_TEMPLATE = """
                      }
                 }
             } catch(e) { 
-                uiLog("Status Fetch Error: " + e.message, "error");
+                uiLog("Status Render Error: " + e.message, "error");
             }
         }
         
@@ -356,61 +432,75 @@ HTML_TEMPLATE = """
         
         async function fetchLogs() {
             try {
-                const res = await fetch(`/api/logs?key=${API_KEY}`);
+                // Only the lines written since our cursor (the first call gets the last 100)
+                const query = logCursor ? `&cursor=${encodeURIComponent(logCursor)}` : "";
+                const res = await fetch(`/api/logs?key=${API_KEY}${query}`);
                 const data = await res.json();
-                const container = document.getElementById('logs-content');
-                
-                // Only update if changed (simple check)
-                const text = data.logs.join("");
-                if (text !== lastLogLine) {
-                    // diagnostics lines are appended, don't overwrite them?
-                    // Actually, recreating the innerHTML wipes diagnostics.
-                    // Better: Append new logs only?
-                    // For simplicity, let's just prepend diagnostics or re-render.
-                    // Since diagnostics are rare, we can just render the logs.
-                    // If we want to keep diagnostics, we should manage them separately.
-                    // But for now, let's just make it work.
-                    container.innerHTML = data.logs.map(line => {
-                        let cls = "log-line";
-                        if (line.includes("ERROR")) cls += " log-error";
-                        else if (line.includes("WARNING")) cls += " log-warn";
-                        else if (line.includes("SIGNAL")) cls += " log-info";
-                        return `<div class="${cls}">${line}</div>`;
-                    }).join("");
-                    container.scrollTop = container.scrollHeight;
-                    lastLogLine = text;
-                }
+                appendLogs(data.logs);
+                logCursor = data.cursor;
             } catch(e) { console.error(e); }
         }
+
+        function appendLogs(lines) {
+            const container = document.getElementById('logs-content');
+            for (const line of lines) {
+                const div = document.createElement('div');
+                div.className = "log-line";
+                if (line.includes("ERROR")) div.className += " log-error";
+                else if (line.includes("WARNING")) div.className += " log-warn";
+                else if (line.includes("SIGNAL")) div.className += " log-info";
+                div.innerText = line;
+                container.appendChild(div);
+            }
+            while (container.childElementCount > 500) container.removeChild(container.firstChild);
+            container.scrollTop = container.scrollHeight;
+        }
         
+        async function fetchLatency() {
+            try {
+                const res = await fetch(`/api/metrics?format=json&key=${API_KEY}`);
+                renderLatency(await res.json());
+            } catch (e) { console.error("Latency fetch failed", e); }
+        }
+
+        function renderLatency(data) {
+            document.querySelector('#latency-table tbody').innerHTML = Object.entries(data).map(([stage, m]) => `
+                    <tr><td>${stage}</td><td>${m.p50_ms.toFixed(1)}</td><td>${m.p99_ms.toFixed(1)}</td><td>${m.max_ms.toFixed(1)}</td></tr>
+                `).join("");
+        }
+
         async function fetchTrades() {
             try {
                 const res = await fetch(`/api/trades?key=${API_KEY}`);
-                const data = await res.json();
-                
+                tradeRows = (await res.json()).trades.reverse();
+                renderTrades(tradeRows);
+            } catch(e) {}
+        }
+
+        function renderTrades(data) {
+            try {
                 // 1. Update Table
                 const tbody = document.querySelector('#trades-table tbody');
                 tbody.innerHTML = data.map(t => `
                     <tr>
-                        <td>${t.Timestamp.split(' ')[1]}</td>
-                        <td class="${t.Side.includes('BUY') ? 'text-green':'text-red'}">${t.Side}</td>
-                        <td>${t.Price}</td>
-                        <td class="${(t['PnL (USDT)']||"").includes('-') ? 'text-red' : 'text-green'}">${t['PnL (USDT)'] || '-'}</td>
+                        <td>${new Date(t.ts).toLocaleTimeString([], {hour12: false})}</td>
+                        <td class="${t.side === 'BUY' ? 'text-green':'text-red'}">${t.label}</td>
+                        <td>${t.price.toFixed(2)}</td>
+                        <td class="${t.pnl < 0 ? 'text-red' : 'text-green'}">${t.pnl != null ? t.pnl.toFixed(2) : '-'}</td>
                     </tr>
                 `).join("");
 
                 // 2. Update Chart Markers
                 if (window.candleSeries) {
                     const markers = data.map(t => {
-                        // Parse time. Timestamp is "YYYY-MM-DD HH:MM:SS" -> UNIX
-                        const time = new Date(t.Timestamp).getTime() / 1000;
-                        const isBuy = t.Side.includes('BUY');
+                        const time = t.ts / 1000; // epoch ms -> UNIX
+                        const isBuy = t.side === 'BUY';
                         return {
                             time: time,
                             position: isBuy ? 'belowBar' : 'aboveBar',
                             color: isBuy ? '#2ea043' : '#da3633',
                             shape: isBuy ? 'arrowUp' : 'arrowDown',
-                            text: `${t.Side} @ ${t.Price}`
+                            text: `${t.label} @ ${t.price.toFixed(2)}`
                         };
                     });
                     // Sort by time (required by library)
@@ -465,40 +555,97 @@ def api_config():
             
     return jsonify(load_config())
 
+from app.monitoring.logtail import LogTail
+
+log_tail = LogTail(LOG_FILE)
+
 @app.route('/api/logs')
 def api_logs():
     if not check_auth(): return jsonify({"error": "Auth failed"}), 403
     
-    if os.path.exists(LOG_FILE):
-        try:
-            with open(LOG_FILE, 'r') as f:
-                lines = f.readlines()
-                return jsonify({"logs": lines[-100:]}) # Last 100 lines
-        except: return jsonify({"logs": []})
-    return jsonify({"logs": []})
+    # ?cursor= from the previous response -> only the lines written since (no cursor: last 100)
+    try:
+        lines, cursor = log_tail.read(request.args.get('cursor'), last=100)
+    except OSError:
+        lines, cursor = [], request.args.get('cursor')
+    return jsonify({"logs": lines, "cursor": cursor})
+
+from app.monitoring.metrics import load_snapshot, prometheus_text, summarize
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Live loop stage latencies: Prometheus text (default) or ?format=json for the dashboard"""
+    if not check_auth(): return jsonify({"error": "Auth failed"}), 403
+    snapshot = load_snapshot()
+    if request.args.get('format') == 'json':
+        return jsonify(summarize(snapshot))
+    return Response(prometheus_text(snapshot), mimetype="text/plain; version=0.0.4")
+
+from app.config.dynamic_config import STATUS_FILE, channel
+from app.monitoring.events import EventHub
+from app.monitoring.metrics import METRICS_FILE
+from app.storage.repository import TradeRepository
+
+trade_repository = TradeRepository() # imports a legacy live_trades.csv on first start
+
+# One watcher for all connected tabs (started on the first /api/stream client, stops with the last)
+event_hub = EventHub({
+    'status': STATUS_FILE,
+    'logs': LOG_FILE,
+    'metrics': METRICS_FILE,
+}, repository=trade_repository, status_bus=channel("status"))
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-sent events: status, logs, trades and metrics as they change (latest state first)"""
+    if not check_auth(): return jsonify({"error": "Auth failed"}), 403
+    return Response(event_hub.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/trades')
 def api_trades():
+    """Trades newest first. ?limit=&side=&start=&end= (epoch ms); next page: ?before=<next from the previous page>"""
     if not check_auth(): return jsonify({"error": "Auth failed"}), 403
-    
-    trades = []
-    if os.path.exists(CSV_FILE):
-        try:
-            df = pd.read_csv(CSV_FILE)
-            trades = df.tail(50).to_dict(orient='records')
-        except: pass
-    return jsonify(trades)
+    try:
+        trades = trade_repository.trades(start=request.args.get('start'), end=request.args.get('end'),
+                                         side=request.args.get('side'), before=request.args.get('before'),
+                                         limit=max(1, min(int(request.args.get('limit', 50)), 1000)))
+    except ValueError as e:
+        return jsonify({"error": f"Bad query: {e}"}), 400
+    return jsonify({"trades": trades, "next": trade_repository.page_key(trades[-1]) if trades else None})
+
+@app.route('/api/trades/pnl')
+def api_trades_pnl():
+    """Realized PnL over ?start=&end= (epoch ms); ?bucket=<ms> adds one row per bucket (e.g. 86400000 = daily)"""
+    if not check_auth(): return jsonify({"error": "Auth failed"}), 403
+    try:
+        start, end = request.args.get('start'), request.args.get('end')
+        summary = trade_repository.pnl_summary(start, end)
+        bucket = int(request.args.get('bucket', 0))
+        if bucket:
+            summary['buckets'] = trade_repository.pnl_summary(start, end, bucket_ms=bucket)
+    except ValueError as e:
+        return jsonify({"error": f"Bad query: {e}"}), 400
+    return jsonify(summary)
+
+from app.market.candle_cache import CandleCache
+
+# Served from memory: filled by the engine's closed candles (data/live) and the historical
+# stores; the exchange is only asked for the missing tail, at most once per key every ttl seconds.
+candle_cache = CandleCache(public_exchange)
 
 @app.route('/api/candles')
 def api_candles():
     if not check_auth(): return jsonify({"error": "Auth failed"}), 403
     
     timeframe = request.args.get('timeframe', '1m')
-    limit = int(request.args.get('limit', 300))
+    try:
+        limit = max(1, min(int(request.args.get('limit', 300)), candle_cache.max_candles))
+    except ValueError as e:
+        return jsonify({"error": f"Bad query: {e}"}), 400
     
     try:
-        # Fetch directly from Binance for visualization
-        ohlcv = public_exchange.fetch_ohlcv("BTC/USDT", timeframe, limit=limit)
+        ohlcv = candle_cache.get("BTC/USDT", timeframe, limit=limit)
         # Format for Lightweight Charts: { time: '2019-04-11', open: 80.01, high: 96.63, low: 76.6, close: 81.69 }
         formatted = []
         for c in ohlcv:
@@ -554,6 +701,55 @@ def api_backtest():
 
     return Response(generate(), mimetype='text/plain')
 
+# --- STORED BACKTEST RESULTS (no rerun needed) ---
+from app.storage.backtest_store import BacktestStore
+import re
+
+backtest_store = BacktestStore()
+
+def valid_run_id(run_id):
+    return re.fullmatch(r"[\w\-]+", run_id or "") is not None and os.path.exists(backtest_store.path(run_id))
+
+@app.route('/api/backtests')
+def api_backtests():
+    if not check_auth(): return jsonify({"error": "Auth failed"}), 403
+    runs = backtest_store.list()
+    if runs.empty:
+        return jsonify([])
+    return Response(runs.to_json(orient='records', date_format='iso'), mimetype='application/json')
+
+@app.route('/api/backtests/compare')
+def api_backtests_compare():
+    if not check_auth(): return jsonify({"error": "Auth failed"}), 403
+    run_ids = [r for r in request.args.get('ids', '').split(',') if r]
+    if not run_ids or not all(valid_run_id(r) for r in run_ids):
+        return jsonify({"error": "Unknown run id"}), 404
+    return jsonify(backtest_store.compare(run_ids).to_dict())
+
+@app.route('/api/backtests/<run_id>')
+def api_backtest_result(run_id):
+    if not check_auth(): return jsonify({"error": "Auth failed"}), 403
+    if not valid_run_id(run_id):
+        return jsonify({"error": "Unknown run id"}), 404
+    
+    try:
+        points = max(1, int(request.args.get('points', 500)))
+        trades = max(1, int(request.args.get('trades', 200)))
+    except ValueError as e:
+        return jsonify({"error": f"Bad query: {e}"}), 400
+    
+    result = backtest_store.load(run_id)
+    # Downsample the per-bar curve for charting (keeps the last bar)
+    curve = result['equity']
+    step = max(1, len(curve) // points)
+    curve = pd.concat([curve.iloc[::step], curve.iloc[-1:]]).drop_duplicates('timestamp')
+    return jsonify({
+        "meta": result['meta'],
+        "equity": [{"time": t.timestamp(), "equity": e, "drawdown": d}
+                   for t, e, d in zip(curve['timestamp'], curve['equity'], curve['drawdown'])],
+        "trades": result['trades'].tail(trades).to_dict(orient='records'),
+    })
+
 @app.route('/api/train', methods=['POST'])
 def api_train():
     global TASK_LOCK
@@ -0,0 +1,190 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from app.config.dynamic_config import DEFAULT_STATUS, get_status
+from app.monitoring.logtail import LogTail
+from app.monitoring.metrics import summarize
+
+# Server push for the dashboard.
+# One watcher thread per dashboard process checks the engine's outputs and only reads what
+# changed -- the status once its state bus version moves (or status.json's mtime without the
+# bus), new log lines past a LogTail cursor, metrics when their mtime moves, new trades once
+# the repository's data_version moves. Each change is published once and fanned out to
+# every connected SSE client's queue. The watcher runs only while a client is connected,
+# so idle dashboards cost nothing.
+
+class EventHub:
+    def __init__(self, sources, repository=None, status_bus=None, interval=1.0, log_backlog=100, trade_backlog=50, queue_size=1000):
+        self.sources = sources # {'status': path, 'logs': path, 'metrics': path}
+        self.repository = repository # TradeRepository the trades come from
+        self.status_bus = status_bus # StateChannel with the engine status (replaces the status file)
+        self.interval = interval
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.lock = threading.Lock() # subscribers
+        self.poll_lock = threading.Lock() # file marks / latest state (taken before self.lock)
+        self.thread = None
+
+        # Latest state, replayed to a client when it connects
+        self.status = None
+        self.metrics = None
+        self.logs = deque(maxlen=log_backlog)
+        self.trades = deque(maxlen=trade_backlog)
+        self.trade_mark = None # repository data_version at the last trade read
+        self.status_mark = None # status bus version last published
+        self.last_trade_id = 0
+        self.marks = {} # json source -> (mtime, size)
+        self.tails = {'logs': LogTail(sources['logs'])} if sources.get('logs') else {}
+        self.cursors = {} # tail source -> LogTail cursor
+
+    # --- Clients ---
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self.poll_lock, self.lock:
+            if not self.subscribers:
+                self.load_backlog() # files may have changed while nobody watched
+            self.subscribers.add(q)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.watch, name="dashboard-events", daemon=True)
+                self.thread.start()
+            q.put_nowait(('status', self.status))
+            q.put_nowait(('logs', list(self.logs)))
+            q.put_nowait(('trades', list(self.trades)))
+            if self.metrics is not None:
+                q.put_nowait(('metrics', self.metrics))
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def publish(self, event, data):
+        with self.lock:
+            for q in list(self.subscribers):
+                try:
+                    q.put_nowait((event, data))
+                except queue.Full:
+                    self.subscribers.discard(q) # stalled client; its stream ends on the next get timeout
+
+    def stream(self, keepalive=15.0):
+        """SSE generator for one client"""
+        q = self.subscribe()
+        try:
+            while True:
+                try:
+                    event, data = q.get(timeout=keepalive)
+                except queue.Empty:
+                    if q not in self.subscribers:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            self.unsubscribe(q)
+
+    # --- Watching ---
+
+    def watch(self):
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    return
+            try:
+                with self.poll_lock:
+                    self.poll()
+            except Exception as e:
+                print(f"Dashboard event watcher error: {e}")
+            time.sleep(self.interval)
+
+    def poll(self):
+        status = self.changed_status()
+        if status is not None:
+            self.status = status
+            self.publish('status', status)
+        metrics = self.changed_json('metrics')
+        if metrics is not None:
+            self.metrics = summarize(metrics)
+            self.publish('metrics', self.metrics)
+        lines = self.new_lines('logs')
+        if lines:
+            self.logs.extend(lines)
+            self.publish('logs', lines)
+        rows = self.new_trades()
+        if rows:
+            self.trades.extend(rows)
+            self.publish('trades', rows)
+
+    def changed_status(self):
+        if self.status_bus is None:
+            return self.changed_json('status')
+        version, status = self.status_bus.read()
+        if not version or version == self.status_mark:
+            return None
+        self.status_mark = version
+        return {**DEFAULT_STATUS, **status}
+
+    def changed_json(self, source):
+        path = self.sources.get(source)
+        if not path or not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        mark = (st.st_mtime_ns, st.st_size)
+        if self.marks.get(source) == mark:
+            return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None # mid-write; picked up on the next poll
+        self.marks[source] = mark
+        return data
+
+    def new_lines(self, source):
+        """Complete lines appended since the last call (handles rotation / truncation)"""
+        if source not in self.tails:
+            return []
+        # No cursor yet = the file appeared after the backlog was read: take its tail
+        lines, self.cursors[source] = self.tails[source].read(self.cursors.get(source), last=self.logs.maxlen)
+        return lines
+
+    def new_trades(self):
+        """Trades committed since the last call (one PRAGMA when nothing changed)"""
+        if self.repository is None:
+            return []
+        version = self.repository.data_version()
+        if version == self.trade_mark:
+            return []
+        self.trade_mark = version
+        rows = self.repository.since(self.last_trade_id)
+        if rows:
+            self.last_trade_id = rows[-1]['id']
+        return rows
+
+    def tail(self, source, n):
+        if source not in self.tails:
+            return []
+        lines, self.cursors[source] = self.tails[source].read(None, last=n)
+        return lines
+
+    def load_backlog(self):
+        self.marks, self.cursors, self.status_mark = {}, {}, None
+        # Defaults before the engine's first publish
+        self.status = self.changed_status() or (dict(DEFAULT_STATUS) if self.status_bus else get_status())
+        metrics = self.changed_json('metrics')
+        if metrics is not None:
+            self.metrics = summarize(metrics)
+        self.logs.clear()
+        self.logs.extend(self.tail('logs', self.logs.maxlen))
+        self.trades.clear()
+        if self.repository is not None:
+            # data_version is per connection: a mark taken on this thread just costs the watcher one extra read
+            self.trade_mark = self.repository.data_version()
+            rows = self.repository.trades(limit=self.trades.maxlen)[::-1]
+            self.trades.extend(rows)
+            self.last_trade_id = max((r['id'] for r in rows), default=0)
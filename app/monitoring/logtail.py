@@ -0,0 +1,84 @@
+import os
+import re
+
+# Incremental tail of an append-only text file (trading.log).
+# Readers keep an opaque cursor "<inode>:<byte offset>" and only ever read the bytes written
+# after it, so a request costs O(new bytes) however large the file is. A changed inode means
+# RotatingFileHandler renamed the file to <path>.1: the rest of the old file is read from there
+# (the cursor stays on the old inode until it is drained), then the new file from the start.
+# Only complete lines are returned; a partial last line stays behind the cursor until it is
+# finished.
+
+RECORD_START = re.compile(rb"^\d{4}-\d{2}-\d{2} ") # '%(asctime)s [...]' log records
+
+class LogTail:
+    def __init__(self, path, max_bytes=1 << 20):
+        self.path = path
+        self.max_bytes = max_bytes # per read; a reader far behind catches up over several calls
+
+    def read(self, cursor=None, last=100):
+        """(lines, next cursor). Without a cursor: the last `last` lines (starting at a record boundary)."""
+        if not os.path.exists(self.path):
+            return [], cursor
+        st = os.stat(self.path)
+        position = self.parse(cursor)
+        if position is None:
+            lines, offset = self.tail(last, st.st_size)
+            return lines, f"{st.st_ino}:{offset}"
+
+        inode, offset = position
+        lines = []
+        if inode != st.st_ino:
+            rotated = self.path + ".1"
+            if os.path.exists(rotated) and os.stat(rotated).st_ino == inode:
+                size = os.path.getsize(rotated)
+                lines, end = self.read_from(rotated, offset, size)
+                if offset < end < size:
+                    return lines, f"{inode}:{end}" # more than max_bytes left: drain it first
+            offset = 0
+        elif offset > st.st_size:
+            offset = 0 # truncated in place
+        new, offset = self.read_from(self.path, offset, st.st_size)
+        return lines + new, f"{st.st_ino}:{offset}"
+
+    @staticmethod
+    def parse(cursor):
+        try:
+            inode, offset = str(cursor).split(":")
+            return int(inode), int(offset)
+        except (TypeError, ValueError):
+            return None
+
+    def read_from(self, path, offset, size):
+        """Complete lines between offset and size (at most max_bytes). Returns (lines, new offset)."""
+        if size <= offset:
+            return [], offset
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            chunk = f.read(min(size - offset, self.max_bytes))
+        end = chunk.rfind(b"\n") + 1
+        if end == 0 and len(chunk) == self.max_bytes:
+            end = len(chunk) # one huge line: hand it out rather than stall
+        return self.decode(chunk[:end]), offset + end
+
+    def tail(self, n, size, block=65536):
+        """Last n complete lines, reading backwards in blocks. Returns (lines, offset after them)."""
+        with open(self.path, 'rb') as f:
+            start = size
+            data = b""
+            while start > 0 and data.count(b"\n") <= n:
+                start = max(0, start - block)
+                f.seek(start)
+                data = f.read(size - start)
+        end = data.rfind(b"\n") + 1
+        lines = data[:end].splitlines(keepends=True)
+        if start > 0:
+            lines = lines[1:] # first line is probably cut
+        lines = lines[-n:] if n else []
+        # Don't start in the middle of a multi-line record (e.g. an ML decision dump)
+        first = next((i for i, line in enumerate(lines) if RECORD_START.match(line)), 0)
+        return self.decode(b"".join(lines[first:])), start + end
+
+    @staticmethod
+    def decode(data):
+        return data.decode('utf-8', errors='replace').splitlines(keepends=True)
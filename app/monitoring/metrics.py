@@ -0,0 +1,181 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Latency instrumentation for the live loop.
+# Each stage (fetch, indicators, inference, risk, order, ...) gets an HDR-style histogram:
+# fixed log-linear buckets, so recording is O(1), memory is constant and percentiles stay
+# within ~3% no matter how many cycles have run. The engine saves a snapshot next to
+# status.json; the dashboard serves it as Prometheus text on /api/metrics.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+METRICS_FILE = os.path.join(BASE_DIR, 'data', 'metrics.json')
+
+# Cumulative `le` buckets exported to Prometheus (seconds)
+PROM_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class LatencyHistogram:
+    """Log-linear histogram: `sub_buckets` linear slots per power of two between lowest and highest"""
+
+    def __init__(self, lowest=1e-6, highest=3600.0, sub_buckets=32):
+        self.lowest = lowest
+        self.sub_buckets = sub_buckets
+        self.octaves = int(math.ceil(math.log2(highest / lowest))) + 1
+        self.counts = np.zeros(self.octaves * sub_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def index(self, seconds):
+        ratio = max(seconds / self.lowest, 1.0)
+        mantissa, exponent = math.frexp(ratio) # ratio = mantissa * 2**exponent, mantissa in [0.5, 1)
+        octave = exponent - 1
+        if octave >= self.octaves:
+            return len(self.counts) - 1
+        return octave * self.sub_buckets + min(int((2 * mantissa - 1) * self.sub_buckets), self.sub_buckets - 1)
+
+    def edges(self, offset):
+        octave = np.repeat(np.arange(self.octaves), self.sub_buckets)
+        sub = np.tile(np.arange(self.sub_buckets), self.octaves)
+        return self.lowest * 2.0 ** octave * (1 + (sub + offset) / self.sub_buckets)
+
+    def lower_edges(self):
+        return self.edges(0)
+
+    def upper_edges(self):
+        return self.edges(1)
+
+    def record(self, seconds):
+        self.counts[self.index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        i = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return float(min(self.upper_edges()[i], self.max))
+
+    def cumulative(self, bounds):
+        """Number of samples <= each bound. A bucket counts once its lower edge is <= the bound, so no
+        sample at or below a bound is ever left out (at most one sub-bucket, ~3%, above it gets in)."""
+        cum = np.cumsum(self.counts)
+        pos = np.searchsorted(self.lower_edges(), bounds, side="right")
+        return [int(cum[p - 1]) if p > 0 else 0 for p in pos]
+
+    def to_dict(self):
+        nonzero = np.flatnonzero(self.counts)
+        return {'count': self.count, 'sum': self.total, 'max': self.max,
+                'buckets': {int(i): int(self.counts[i]) for i in nonzero}}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls()
+        for i, n in data['buckets'].items():
+            hist.counts[int(i)] = n
+        hist.count, hist.total, hist.max = data['count'], data['sum'], data['max']
+        return hist
+
+class Metrics:
+    """Per-stage latency histograms, with optional raw span dump (JSON lines) for offline analysis"""
+
+    def __init__(self, span_path=None):
+        self.histograms = {}
+        self.lock = threading.Lock() # stages are recorded from the loop and from worker threads
+        self.span_path = span_path
+        self.spans = []
+        self.cycle = 0
+
+    def record(self, stage, seconds, started=None):
+        with self.lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = LatencyHistogram()
+            hist.record(seconds)
+            if self.span_path:
+                self.spans.append({'cycle': self.cycle, 'stage': stage,
+                                   'start': started if started is not None else time.time() - seconds,
+                                   'seconds': seconds})
+
+    @contextmanager
+    def span(self, stage):
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t0, started)
+
+    def next_cycle(self):
+        self.cycle += 1
+
+    def snapshot(self):
+        """JSON-ready state of all histograms (cheap; taken on the loop thread)"""
+        with self.lock:
+            return {'updated': time.time(), 'cycles': self.cycle,
+                    'stages': {stage: hist.to_dict() for stage, hist in self.histograms.items()}}
+
+    def flush_spans(self):
+        with self.lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        with open(self.span_path, 'a') as f:
+            f.writelines(json.dumps(s) + "\n" for s in spans)
+
+    def save(self, snapshot, path=METRICS_FILE):
+        """Writes a snapshot atomically (and appends pending spans)"""
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+        if self.span_path:
+            self.flush_spans()
+
+def load_snapshot(path=METRICS_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def summarize(snapshot):
+    """stage -> count / mean / p50 / p90 / p99 / max in milliseconds (dashboard table)"""
+    rows = {}
+    for stage, data in (snapshot or {}).get('stages', {}).items():
+        hist = LatencyHistogram.from_dict(data)
+        rows[stage] = {
+            'count': hist.count,
+            'mean_ms': hist.total / hist.count * 1000 if hist.count else 0.0,
+            'p50_ms': hist.percentile(50) * 1000,
+            'p90_ms': hist.percentile(90) * 1000,
+            'p99_ms': hist.percentile(99) * 1000,
+            'max_ms': hist.max * 1000,
+        }
+    return rows
+
+def prometheus_text(snapshot, name="live_stage_seconds"):
+    """Prometheus text exposition (one histogram family labelled by stage)"""
+    lines = [f"# HELP {name} Live trading loop stage latency in seconds",
+             f"# TYPE {name} histogram"]
+    for stage, data in sorted((snapshot or {}).get('stages', {}).items()):
+        hist = LatencyHistogram.from_dict(data)
+        for bound, n in zip(PROM_BUCKETS, hist.cumulative(PROM_BUCKETS)):
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {n}')
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {hist.total}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+    if snapshot:
+        lines.append("# HELP live_cycles_total Candle-close cycles run by the live engine")
+        lines.append("# TYPE live_cycles_total counter")
+        lines.append(f"live_cycles_total {snapshot.get('cycles', 0)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Stored backtest runs.
+# One compressed .npz per run: trade columns, the per-bar equity curve and a JSON meta record
+# (strategy, parameters, data hash, metrics). Listing only decompresses each file's meta member,
+# so the dashboard can show past runs without touching trades or curves.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RESULTS_DIR = os.path.join(BASE_DIR, 'data', 'backtests')
+
+class BacktestStore:
+    def __init__(self, root=RESULTS_DIR):
+        self.root = root
+
+    def path(self, run_id):
+        return os.path.join(self.root, f"{run_id}.npz")
+
+    def save(self, result):
+        """Writes a BacktestEngine.result() dict. Returns the run id."""
+        os.makedirs(self.root, exist_ok=True)
+        created = pd.Timestamp.now()
+        base_id = f"{result['strategy']}_{created:%Y%m%d_%H%M%S}_{result['data_hash'][:6]}"
+        run_id, suffix = base_id, 1
+        while os.path.exists(self.path(run_id)):
+            run_id = f"{base_id}-{suffix}"
+            suffix += 1
+
+        bar_time = np.asarray(result['bar_time'], dtype=np.int64)
+        meta = {
+            'run_id': run_id,
+            'created': created.isoformat(timespec="seconds"),
+            'strategy': result['strategy'],
+            'params': result['params'],
+            'data_hash': result['data_hash'],
+            'start': int(bar_time[0]) if len(bar_time) else None,
+            'end': int(bar_time[-1]) if len(bar_time) else None,
+            'metrics': {k: float(v) for k, v in result['metrics'].items()},
+        }
+        arrays = {f"trade_{c}": np.asarray(v) for c, v in result['trades'].items()}
+        tmp = self.path(run_id) + ".tmp.npz"
+        np.savez_compressed(
+            tmp, meta=json.dumps(meta), bar_time=bar_time,
+            equity=np.asarray(result['equity'], dtype=np.float64),
+            in_position=np.asarray(result['in_position'], dtype=bool), **arrays
+        )
+        os.replace(tmp, self.path(run_id))
+        return run_id
+
+    def meta(self, run_id):
+        with np.load(self.path(run_id)) as f:
+            return json.loads(str(f["meta"]))
+
+    def list(self):
+        """One row per stored run (newest first): id, strategy, data range, parameters and metrics"""
+        if not os.path.isdir(self.root):
+            return pd.DataFrame()
+        rows = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".npz") or ".tmp" in name:
+                continue
+            try:
+                meta = self.meta(name[:-4])
+            except Exception as e:
+                print(f"Skipping unreadable result {name}: {e}")
+                continue
+            rows.append({
+                'run_id': meta['run_id'], 'created': meta['created'], 'strategy': meta['strategy'],
+                'start': pd.to_datetime(meta['start'], unit="ms") if meta['start'] is not None else None,
+                'end': pd.to_datetime(meta['end'], unit="ms") if meta['end'] is not None else None,
+                'data_hash': meta['data_hash'], **meta['metrics'],
+            })
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows).sort_values('created', ascending=False).reset_index(drop=True)
+
+    def load(self, run_id):
+        """Meta, trades (DataFrame) and equity curve (DataFrame with per-bar drawdown) of one run"""
+        with np.load(self.path(run_id)) as f:
+            meta = json.loads(str(f["meta"]))
+            trades = pd.DataFrame({k[len("trade_"):]: f[k] for k in f.files if k.startswith("trade_")})
+            curve = pd.DataFrame({
+                'timestamp': pd.to_datetime(f["bar_time"], unit="ms"),
+                'equity': f["equity"],
+                'in_position': f["in_position"],
+            })
+        for c in ['entry_time', 'exit_time']:
+            if c in trades:
+                trades[c] = pd.to_datetime(trades[c], unit="ms")
+        peak = curve['equity'].cummax()
+        curve['drawdown'] = curve['equity'] / peak - 1
+        return {'meta': meta, 'trades': trades, 'equity': curve}
+
+    def compare(self, run_ids):
+        """Metrics of several runs side by side (one column per run)"""
+        return pd.DataFrame({run_id: self.meta(run_id)['metrics'] for run_id in run_ids})
+
+    def delete(self, run_id):
+        os.remove(self.path(run_id))
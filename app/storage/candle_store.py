@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columnar on-disk candle store.
+# One raw little-endian file per column (timestamp = int64 ms, OHLCV = float64) plus meta.json.
+# Reads memory-map the columns and binary-search the timestamp column, so a range read
+# never parses the whole history. Appends only write the new bytes at the end of each file.
+
+COLUMNS = {
+    "timestamp": np.dtype("<i8"),
+    "open": np.dtype("<f8"),
+    "high": np.dtype("<f8"),
+    "low": np.dtype("<f8"),
+    "close": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+def to_ms(timestamps):
+    """datetime-like (or already int ms) column -> int64 epoch milliseconds"""
+    if pd.api.types.is_integer_dtype(timestamps):
+        return np.asarray(timestamps, dtype=np.int64)
+    ts = pd.to_datetime(timestamps)
+    return ts.astype("datetime64[ms]").astype("int64").to_numpy()
+
+def candle_hash(df):
+    """Content hash of an OHLCV frame (identifies the exact candles a result was computed from)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(to_ms(df["timestamp"])).tobytes())
+    for col in ["open", "high", "low", "close", "volume"]:
+        h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+class CandleStore:
+    """Append-only columnar store for one symbol/timeframe"""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta_path = os.path.join(path, "meta.json")
+        self.meta = {"rows": 0, "columns": list(COLUMNS)}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r") as f:
+                self.meta = json.load(f)
+
+    @classmethod
+    def for_csv(cls, csv_path):
+        """Store next to a historical CSV (data/historical/BTC_USDT_5m.csv -> data/historical/BTC_USDT_5m/).
+        Converts the CSV on first use, and again whenever the CSV is newer than the store."""
+        store = cls(os.path.splitext(csv_path)[0])
+        if os.path.exists(csv_path):
+            csv_mtime = os.path.getmtime(csv_path)
+            if len(store) == 0 or store.meta.get("source_mtime", 0) < csv_mtime:
+                print(f"Converting {csv_path} to columnar store (one-time)...")
+                store.import_csv(csv_path)
+        return store
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def _column_file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _save_meta(self):
+        # Meta is written last and atomically: readers never see rows that are not fully on disk
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def column(self, name):
+        """Memory-mapped view of a whole column (read-only)"""
+        rows = len(self)
+        if rows == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.memmap(self._column_file(name), dtype=COLUMNS[name], mode="r", shape=(rows,))
+
+    def first_timestamp(self):
+        return pd.to_datetime(int(self.column("timestamp")[0]), unit="ms") if len(self) else None
+
+    def last_timestamp(self):
+        return pd.to_datetime(int(self.column("timestamp")[-1]), unit="ms") if len(self) else None
+
+    # --- Writes ---
+
+    def append(self, df):
+        """Appends candles newer than the last stored one. Returns the number of rows written."""
+        ts = to_ms(df["timestamp"])
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        keep = np.ones(len(ts), dtype=bool)
+        keep[1:] = ts[1:] != ts[:-1] # dedupe within the batch
+        if len(self):
+            keep &= ts > int(self.column("timestamp")[-1])
+        if not keep.any():
+            return 0
+
+        os.makedirs(self.path, exist_ok=True)
+        rows = len(self)
+        for name, dtype in COLUMNS.items():
+            values = ts if name == "timestamp" else df[name].to_numpy(dtype=np.float64)[order]
+            with open(self._column_file(name), "ab") as f:
+                # Drop bytes from an interrupted append before writing
+                f.truncate(rows * dtype.itemsize)
+                f.write(np.ascontiguousarray(values[keep], dtype=dtype).tobytes())
+
+        self.meta["rows"] = rows + int(keep.sum())
+        self._save_meta()
+        return int(keep.sum())
+
+    def merge(self, df):
+        """Adds candles anywhere in the history (append fast-path, full rewrite for backfills)"""
+        ts = to_ms(df["timestamp"])
+        if len(self) == 0 or ts.min() > int(self.column("timestamp")[-1]):
+            return self.append(df)
+
+        before = len(self)
+        combined = pd.concat([self.read(raw=True), pd.DataFrame({
+            "timestamp": ts, **{c: df[c].to_numpy(dtype=np.float64) for c in COLUMNS if c != "timestamp"}
+        })])
+        combined = combined.drop_duplicates("timestamp", keep="last").sort_values("timestamp")
+        self.rewrite(combined)
+        return len(self) - before
+
+    def rewrite(self, df):
+        """Replaces the whole store with df"""
+        os.makedirs(self.path, exist_ok=True)
+        self.meta["rows"] = 0
+        self._save_meta()
+        for name in COLUMNS:
+            if os.path.exists(self._column_file(name)):
+                os.remove(self._column_file(name))
+        self.append(df)
+
+    def import_csv(self, csv_path):
+        df = pd.read_csv(csv_path)
+        self.rewrite(df)
+        self.meta["source_mtime"] = os.path.getmtime(csv_path)
+        self._save_meta()
+
+    def add_gaps(self, ranges):
+        """Records [from, to) ranges the exchange has no candles for (skipped by later syncs)"""
+        os.makedirs(self.path, exist_ok=True)
+        known = {tuple(g) for g in self.meta.get("gaps", [])}
+        self.meta["gaps"] = sorted(known | {(int(s), int(e)) for s, e in ranges})
+        self._save_meta()
+
+    def clear_gaps(self):
+        self.meta.pop("gaps", None)
+        self._save_meta()
+
+    # --- Reads ---
+
+    def gaps(self):
+        return [tuple(g) for g in self.meta.get("gaps", [])]
+
+    def range_slice(self, start=None, end=None):
+        """Row slice covering [start, end] (timestamps, inclusive)"""
+        ts = self.column("timestamp")
+        lo = 0 if start is None else int(np.searchsorted(ts, to_ms(pd.Series([pd.Timestamp(start)]))[0], side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, to_ms(pd.Series([pd.Timestamp(end)]))[0], side="right"))
+        return slice(lo, hi)
+
+    def read(self, start=None, end=None, raw=False):
+        """Candles in [start, end] as a DataFrame (timestamp as datetime unless raw=True)"""
+        rows = self.range_slice(start, end)
+        data = {name: np.array(self.column(name)[rows]) for name in COLUMNS}
+        df = pd.DataFrame(data)
+        if not raw:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+    def read_days(self, days):
+        """Last `days` of history, measured back from the newest candle"""
+        if len(self) == 0:
+            return self.read()
+        end = self.last_timestamp()
+        return self.read(start=end - pd.Timedelta(days=days))
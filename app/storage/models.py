@@ -0,0 +1,50 @@
+# Tables of the embedded trade / order store (SQLite, see repository.py).
+# Times are epoch milliseconds (same convention as the candle and backtest stores).
+
+TRADE_COLUMNS = ["ts", "side", "tag", "price", "size", "value", "pnl", "pnl_pct"]
+ORDER_COLUMNS = ["ts", "side", "type", "amount", "filled", "average", "cost", "maker", "taker", "status"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    side TEXT NOT NULL,      -- BUY / SELL
+    tag TEXT,                -- SIM, OCO, ... (shown as "SELL (OCO)")
+    price REAL NOT NULL,
+    size REAL NOT NULL,
+    value REAL NOT NULL,     -- price * size in USDT
+    pnl REAL,                -- sells only
+    pnl_pct REAL
+);
+CREATE INDEX IF NOT EXISTS trades_ts ON trades (ts);
+CREATE INDEX IF NOT EXISTS trades_side_ts ON trades (side, ts);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    side TEXT NOT NULL,
+    type TEXT NOT NULL,      -- market / routed
+    amount REAL,
+    filled REAL,
+    average REAL,
+    cost REAL,
+    maker REAL,              -- base filled as maker / taker (routed orders)
+    taker REAL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_ts ON orders (ts);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def trade_label(row):
+    """Display side of a trade row ("BUY", "SELL (SIM)", ...)"""
+    return f"{row['side']} ({row['tag']})" if row.get('tag') else row['side']
+
+def parse_label(label):
+    """Inverse of trade_label: "SELL (OCO)" -> ("SELL", "OCO")"""
+    side, _, tag = label.partition(" (")
+    return side.strip().upper(), tag.rstrip(")") or None
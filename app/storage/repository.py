@@ -0,0 +1,193 @@
+import atexit
+import csv
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from app.storage.models import ORDER_COLUMNS, SCHEMA, TRADE_COLUMNS, parse_label, trade_label
+
+# Embedded trade / order repository (SQLite in WAL mode).
+# The engine never waits on disk: add_trade / add_order queue rows for one writer thread that
+# commits them in batches. Readers (dashboard) get their own connections and, thanks to WAL,
+# never block the writer. Range reads use the ts indexes and keyset pagination, so they stay
+# fast however many trades accumulate.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_FILE = os.path.join(BASE_DIR, 'data', 'trades.db')
+CSV_FILE = os.path.join(BASE_DIR, 'data', 'live_trades.csv') # legacy log, imported once
+
+def now_ms():
+    return int(time.time() * 1000)
+
+class TradeRepository:
+    def __init__(self, path=DB_FILE, migrate_csv=CSV_FILE, flush_interval=0.25, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.local = threading.local() # one connection per thread
+        self.pending = queue.Queue()
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connect().executescript(SCHEMA)
+        if migrate_csv:
+            self.migrate_csv(migrate_csv)
+
+    def connect(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+        return db
+
+    # --- Writes (batched, background) ---
+
+    def add_trade(self, side, price, size, pnl=None, pnl_pct=None, tag=None, ts=None):
+        """Queues a trade (returns immediately; visible to readers after the next batch commit)"""
+        self.enqueue('trades', (now_ms() if ts is None else ts, side, tag, price, size, price * size, pnl, pnl_pct))
+
+    def add_order(self, side, type, amount, filled, average, cost, maker=None, taker=None, status="closed", ts=None):
+        self.enqueue('orders', (now_ms() if ts is None else ts, side, type, amount, filled, average, cost, maker, taker, status))
+
+    def enqueue(self, table, row):
+        self.pending.put((table, row))
+        with self.writer_lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self.run_writer, name="trade-writer", daemon=True)
+                self.writer.start()
+                atexit.register(self.flush)
+
+    def run_writer(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception as e:
+                print(f"Trade repository write failed ({len(batch)} rows): {e}")
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+
+    def write(self, batch):
+        db = self.connect()
+        with db:
+            for table, columns in (('trades', TRADE_COLUMNS), ('orders', ORDER_COLUMNS)):
+                rows = [row for t, row in batch if t == table]
+                if rows:
+                    db.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+
+    def flush(self):
+        """Blocks until every queued row is committed"""
+        self.pending.join()
+
+    # --- Reads ---
+
+    def trades(self, start=None, end=None, side=None, limit=50, before=None):
+        """Trades newest first, optionally in [start, end) (epoch ms) and of one side.
+        Next page: pass the last row's page_key() as `before`."""
+        clauses, args = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            args.append(int(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            args.append(int(end))
+        if side:
+            clauses.append("side = ?")
+            args.append(side.upper())
+        if before:
+            ts, row_id = (int(v) for v in str(before).split(":"))
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            args += [ts, ts, row_id]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connect().execute(
+            f"SELECT * FROM trades {where} ORDER BY ts DESC, id DESC LIMIT ?", args + [int(limit)]
+        ).fetchall()
+        return [self.trade_row(r) for r in rows]
+
+    def since(self, after_id=0, limit=500):
+        """Trades with id > after_id, oldest first (incremental feeds)"""
+        rows = self.connect().execute(
+            "SELECT * FROM trades WHERE id > ? ORDER BY id LIMIT ?", (int(after_id), int(limit))
+        ).fetchall()
+        return [self.trade_row(r) for r in rows]
+
+    @staticmethod
+    def trade_row(row):
+        trade = dict(row)
+        trade['label'] = trade_label(trade)
+        return trade
+
+    @staticmethod
+    def page_key(trade):
+        return f"{trade['ts']}:{trade['id']}"
+
+    def pnl_summary(self, start=None, end=None, bucket_ms=None):
+        """Realized PnL of closed trades (sells). With bucket_ms: one row per time bucket."""
+        clauses, args = ["side = 'SELL'", "pnl IS NOT NULL"], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            args.append(int(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            args.append(int(end))
+        aggregates = ("COUNT(*) AS trades, COALESCE(SUM(pnl), 0) AS pnl, COALESCE(SUM(pnl > 0), 0) AS wins, "
+                      "MIN(pnl) AS worst, MAX(pnl) AS best")
+        where = " AND ".join(clauses)
+        db = self.connect()
+        if bucket_ms:
+            rows = db.execute(
+                f"SELECT (ts / ?) * ? AS bucket, {aggregates} FROM trades WHERE {where} GROUP BY ts / ? ORDER BY bucket",
+                [int(bucket_ms), int(bucket_ms)] + args + [int(bucket_ms)]
+            ).fetchall()
+            return [dict(r) for r in rows]
+        summary = dict(db.execute(f"SELECT {aggregates} FROM trades WHERE {where}", args).fetchone())
+        summary['win_rate'] = summary['wins'] / summary['trades'] * 100 if summary['trades'] else 0.0
+        return summary
+
+    def data_version(self):
+        """Changes whenever another connection commits (cheap change check for pollers)"""
+        return self.connect().execute("PRAGMA data_version").fetchone()[0]
+
+    # --- Migration ---
+
+    def migrate_csv(self, csv_path):
+        """Imports the legacy live_trades.csv once (recorded in meta). Returns the number of rows imported."""
+        if not os.path.exists(csv_path):
+            return 0
+        db = self.connect()
+        with db:
+            db.execute("BEGIN IMMEDIATE") # engine and dashboard may both start up at once
+            done = db.execute("SELECT value FROM meta WHERE key = 'csv_migrated'").fetchone()
+            if done:
+                return 0
+            rows = []
+            with open(csv_path, newline='') as f:
+                for r in csv.DictReader(f):
+                    try:
+                        side, tag = parse_label(r['Side'])
+                        # Written with datetime.now() -> local time
+                        ts = int(datetime.strptime(r['Timestamp'], "%Y-%m-%d %H:%M:%S").timestamp() * 1000)
+                        price, size = float(r['Price']), float(r['Size (BTC)'])
+                        pnl = float(r['PnL (USDT)']) if r.get('PnL (USDT)') else None
+                        pnl_pct = float(r['PnL (%)'].rstrip('%')) if r.get('PnL (%)') else None
+                    except (KeyError, ValueError) as e:
+                        print(f"Skipping unreadable trade row {r}: {e}")
+                        continue
+                    rows.append((ts, side, tag, price, size, price * size, pnl, pnl_pct))
+            db.executemany(f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})", rows)
+            db.execute("INSERT INTO meta (key, value) VALUES ('csv_migrated', ?)", (f"{csv_path} ({len(rows)} rows)",))
+        print(f"Migrated {len(rows)} trades from {csv_path} to {self.path}")
+        return len(rows)
@@ -10,3 +10,23 @@ class StrategyBase:
 
     def should_exit(self, df, position):
         return False
+
+    def streaming_indicators(self):
+        """Incremental indicator state for the live loop (None = recompute indicators every cycle)"""
+        return None
+
+    # --- Vectorized Backtest Hooks ---
+    # Strategies that can express their rules as whole columns implement these.
+    # Returning None from entry_signals makes the backtest fall back to the per-candle loop.
+
+    def entry_signals(self, df):
+        """Boolean array (one per row of the indicator frame): enter at this close"""
+        return None
+
+    def exit_signals(self, df):
+        """Boolean array of exits that do not depend on the entry price (or None)"""
+        return None
+
+    def exit_barriers(self):
+        """(take_profit, stop_loss) multipliers applied to the entry price (None = unused)"""
+        return None, None
@@ -1,4 +1,5 @@
 from app.engine.backtest_engine import BacktestEngine
+from app.engine.costs import CostModel
 from strategies.btc_ml_strategy import BTCMLStrategy5m, BTCMLStrategy1m
 # from strategies.btc_volatility_breakout import BTCVolatilityBreakout
 import pandas as pd
@@ -7,27 +8,31 @@ import os
 import sys
 sys.path.append(os.getcwd()) # Ensure root is in path
 from scripts.download_data import download_data
+from app.storage.candle_store import CandleStore, COLUMNS
+from app.market.features import FeatureCache
+from app.storage.backtest_store import BacktestStore
 
 def load_data(filepath, timeframe="5m", days=180):
     need_download = False
-    if not os.path.exists(filepath):
+    try:
+        # Columnar store next to the CSV (converted from the CSV on first use)
+        store = CandleStore.for_csv(filepath)
+    except KeyError:
+        print(f"Error: Data file missing columns. Expected {list(COLUMNS)}")
+        return None
+    except Exception:
+        store = None
+        
+    if store is None or len(store) == 0:
         print(f"Data file {filepath} not found. Downloading...")
         need_download = True
     else:
         # Validate existing data duration
-        try:
-            df = pd.read_csv(filepath)
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                min_date = df['timestamp'].min()
-                required_date = pd.Timestamp.now() - pd.Timedelta(days=days)
-                # Allow 1 day buffer
-                if min_date > (required_date + pd.Timedelta(days=1)):
-                    print(f"Existing data insufficient (Starts {min_date}, need {required_date}). Re-downloading...")
-                    need_download = True
-            else:
-                 need_download = True
-        except:
+        min_date = store.first_timestamp()
+        required_date = pd.Timestamp.now() - pd.Timedelta(days=days)
+        # Allow 1 day buffer
+        if min_date > (required_date + pd.Timedelta(days=1)):
+            print(f"Existing data insufficient (Starts {min_date}, need {required_date}). Re-downloading...")
             need_download = True
 
     if need_download:
@@ -35,20 +40,16 @@ def load_data(filepath, timeframe="5m", days=180):
             # Infer args or use defaults
             # Assuming filepath structure data/historical/BTC_USDT_5m.csv
             download_data("BTC/USDT", timeframe, days, os.path.dirname(filepath))
-            if not os.path.exists(filepath):
+            store = CandleStore.for_csv(filepath)
+            if len(store) == 0:
                 print("Error: Download failed or file naming mismatch.")
                 return None
-            df = pd.read_csv(filepath)
         except Exception as e:
             print(f"Auto-download failed: {e}")
             return None
             
-    # Ensure necessary columns
-    expected_cols = ["timestamp", "open", "high", "low", "close", "volume"]
-    if not all(col in df.columns for col in expected_cols):
-        print(f"Error: Data file missing columns. Expected {expected_cols}")
-        return None
-    return df
+    # Range read: only the requested window is loaded from disk
+    return store.read_days(days)
 
 import argparse
 
@@ -58,6 +59,13 @@ def main():
     parser.add_argument("--strategy", type=str, default="ml_5m", choices=["ml_5m", "ml_1m"], help="Strategy to run")
     parser.add_argument("--days", type=int, default=180, help="Days of history to use")
     parser.add_argument("--compounding", action="store_true", help="Enable compounding (reinvest profits)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute features instead of using the feature cache")
+    parser.add_argument("--mode", type=str, default="auto", choices=["auto", "vectorized", "loop"], help="Simulation mode (auto = vectorized when supported)")
+    parser.add_argument("--exits", type=str, default="close", choices=["close", "high_low"], help="TP/SL on candle close, or intra-candle on high/low")
+    parser.add_argument("--costs", type=str, default="none", choices=["none", "binance"], help="Cost model: frictionless, or Binance spot fees + spread + volume slippage")
+    parser.add_argument("--latency", type=int, default=0, help="Bars between signal and fill (with --costs)")
+    parser.add_argument("--no-save", action="store_true", help="Don't store the run under data/backtests")
+    parser.add_argument("--sub-bars", type=str, default=None, help="Finer candle CSV/store (e.g. 1m for a 5m run) to decide bars touching both TP and SL")
     args = parser.parse_args()
 
     timeframe = "1m" if args.strategy == "ml_1m" else "5m"
@@ -89,10 +97,28 @@ def main():
         print("Initializing Strategy: BTCMLStrategy5m (High Yield)")
         strategy = BTCMLStrategy5m()
 
-    print(f"Initializing Backtest Engine... (Compounding: {args.compounding})")
-    engine = BacktestEngine(strategy, historical_data, compounding=args.compounding)
+    # Repeated runs over the same candles load features from disk
+    if not args.no_cache:
+        strategy.feature_cache = FeatureCache()
+
+    # Sub-bars stay memory-mapped; only bars touching both barriers are read
+    sub_bars = CandleStore.for_csv(args.sub_bars) if args.sub_bars else None
+    if sub_bars is not None and len(sub_bars) == 0:
+        print(f"Warning: no sub-bars found at {args.sub_bars}. Ambiguous bars will assume SL first.")
+        sub_bars = None
+
+    costs = CostModel.binance_spot(latency_bars=args.latency) if args.costs == "binance" else None
+
+    print(f"Initializing Backtest Engine... (Compounding: {args.compounding}, Mode: {args.mode}, Exits: {args.exits}, Costs: {args.costs})")
+    engine = BacktestEngine(strategy, historical_data, compounding=args.compounding, mode=args.mode,
+                            exits=args.exits, sub_bars=sub_bars, costs=costs)
     
     engine.run()
 
+    # Structured artifact (trades, per-bar equity, params, data hash) for the dashboard / comparisons
+    if not args.no_save:
+        run_id = BacktestStore().save(engine.result(params={'days': args.days, 'data_path': args.data_path}))
+        print(f"\nSaved run {run_id}")
+
 if __name__ == "__main__":
     main()
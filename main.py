@@ -1,8 +1,11 @@
 from app.engine.live_engine import LiveEngine
 from strategies.btc_ml_strategy import BTCMLStrategy5m, BTCMLStrategy1m
 from app.market.data_feed import BinanceDataFeed
+from app.market.kline_stream import KlineStreamFeed
+from app.market.candle_cache import CandleCache
 from app.execution.binance_spot import BinanceSpot
 from app.risk.governor import RiskGovernor
+from app.monitoring.metrics import Metrics
 import argparse
 
 def main():
@@ -10,6 +13,8 @@ def main():
     parser.add_argument("--choice", type=str, default="ml_5m", choices=["ml_5m", "ml_1m"], help="Strategy Choice")
     # Note: Compounding is handled in strategy logic or position sizing (not explicitly in live engine yet, but placeholder arg)
     parser.add_argument("--compounding", action="store_true", help="Enable compounding")
+    parser.add_argument("--dump-spans", type=str, default=None, help="Append raw per-stage timing spans (JSON lines) to this file")
+    parser.add_argument("--feed", type=str, default="stream", choices=["stream", "rest"], help="Market data: kline websocket (stream) or REST polling (rest)")
     args = parser.parse_args()
 
     print(f"Welcome to BTC Trading Platform (Live Mode) - {args.choice}")
@@ -17,6 +22,7 @@ def main():
     # Configure Logging (File + Console)
     import logging
     import os
+    from logging.handlers import RotatingFileHandler
     from datetime import datetime, timedelta, timezone
     import time
     
@@ -34,7 +40,8 @@ def main():
         format='%(asctime)s [%(levelname)s] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S',
         handlers=[
-            logging.FileHandler(log_file),
+            # Rotate at 10MB (trading.log.1 ... .5); the dashboard's log tail follows the rotation
+            RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5),
             logging.StreamHandler()
         ]
     )
@@ -50,13 +57,18 @@ def main():
         timeframe = "5m"
     
     # Live Data Feed
-    print(f"Connecting to Binance ({timeframe})...")
-    data_feed = BinanceDataFeed(symbol="BTC/USDT", timeframe=timeframe)
+    print(f"Connecting to Binance ({timeframe}, {args.feed})...")
+    # Closed candles are shared with the dashboard through data/live (see CandleCache)
+    candle_cache = CandleCache()
+    if args.feed == "stream":
+        data_feed = KlineStreamFeed(symbol="BTC/USDT", timeframe=timeframe, cache=candle_cache).start()
+    else:
+        data_feed = BinanceDataFeed(symbol="BTC/USDT", timeframe=timeframe, cache=candle_cache)
     
     executor = BinanceSpot()
     risk = RiskGovernor()
 
-    engine = LiveEngine(strategy, data_feed, executor, risk)
+    engine = LiveEngine(strategy, data_feed, executor, risk, metrics=Metrics(span_path=args.dump_spans))
     
     # Pass compounding flag to risk or engine if supported (future proofing)
     if hasattr(engine, 'compounding'):
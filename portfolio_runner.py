@@ -0,0 +1,68 @@
+from app.engine.portfolio_engine import AlignedCandles, PortfolioEngine, Sleeve
+from strategies.btc_ml_strategy import BTCMLStrategy5m, BTCMLStrategy1m
+import pandas as pd
+import argparse
+import os
+
+import sys
+sys.path.append(os.getcwd()) # Ensure root is in path
+from app.storage.candle_store import CandleStore
+from app.market.features import FeatureCache
+
+STRATEGIES = {"ml_5m": BTCMLStrategy5m, "ml_1m": BTCMLStrategy1m}
+TIMEFRAME_MS = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "1h": 3_600_000}
+
+def parse_sleeve(spec):
+    """'ETH/USDT:ml_5m:0.25' -> (symbol, strategy name, allocation)"""
+    symbol, strategy, allocation = spec.split(":")
+    if strategy not in STRATEGIES:
+        raise argparse.ArgumentTypeError(f"Unknown strategy {strategy} (choices: {', '.join(STRATEGIES)})")
+    return symbol, strategy, float(allocation)
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio backtest over several (symbol, strategy) sleeves")
+    parser.add_argument("--sleeve", type=parse_sleeve, action="append", required=True,
+                        help="SYMBOL:STRATEGY:ALLOCATION, repeatable (e.g. BTC/USDT:ml_5m:0.5)")
+    parser.add_argument("--timeframe", type=str, default="5m", choices=list(TIMEFRAME_MS), help="Candle timeframe of all sleeves")
+    parser.add_argument("--days", type=int, default=180, help="Days of history to use")
+    parser.add_argument("--data-dir", type=str, default="data/historical", help="Directory of historical candle stores")
+    parser.add_argument("--compounding", action="store_true", help="Size entries from current equity")
+    parser.add_argument("--max-correlated", type=float, default=1.0, help="Max open notional (fraction of equity) across correlated positions")
+    parser.add_argument("--corr-threshold", type=float, default=0.7, help="Return correlation at which positions count as correlated")
+    parser.add_argument("--corr-window", type=int, default=1440, help="Bars of trailing returns used for correlation")
+    parser.add_argument("--memmap", type=str, default="data/cache/portfolio_candles.npy", help="Aligned array file ('' = keep in RAM)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute features instead of using the feature cache")
+    args = parser.parse_args()
+
+    # 1. Candle stores (download missing pairs with scripts/download_data.py --symbol ...)
+    stores = {}
+    for symbol, _, _ in args.sleeve:
+        if symbol in stores:
+            continue
+        store = CandleStore.for_csv(os.path.join(args.data_dir, f"{symbol.replace('/', '_')}_{args.timeframe}.csv"))
+        if len(store) == 0:
+            print(f"No data for {symbol} {args.timeframe}. Run: python scripts/download_data.py --symbol {symbol} --timeframe {args.timeframe}")
+            return
+        stores[symbol] = store
+
+    # 2. One aligned array for all symbols
+    end = max(store.last_timestamp() for store in stores.values())
+    start = end - pd.Timedelta(days=args.days)
+    print(f"Aligning {len(stores)} symbols from {start} to {end}...")
+    candles = AlignedCandles.from_stores(stores, TIMEFRAME_MS[args.timeframe], start, end, path=args.memmap or None)
+
+    # 3. Sleeves (one strategy instance each)
+    sleeves = []
+    for symbol, name, allocation in args.sleeve:
+        strategy = STRATEGIES[name]()
+        if not args.no_cache:
+            strategy.feature_cache = FeatureCache()
+        sleeves.append(Sleeve(symbol, strategy, allocation))
+
+    engine = PortfolioEngine(candles, sleeves, compounding=args.compounding,
+                             max_correlated_exposure=args.max_correlated,
+                             corr_threshold=args.corr_threshold, corr_window=args.corr_window)
+    engine.run()
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,159 @@
 import ccxt
 import pandas as pd
+import numpy as np
 import argparse
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-def download_data(symbol, timeframe, days, output_dir):
-    print(f"Initializing Binance connection for {symbol} ({timeframe})...")
-    exchange = ccxt.binance()
-    
-    # Calculate start time
-    since = exchange.milliseconds() - (days * 24 * 60 * 60 * 1000)
-    
-    all_ohlcv = []
-    limit = 1000  # Binance limit
-    
-    print(f"Fetching data since {datetime.fromtimestamp(since/1000)}...")
-    
-    while True:
-        try:
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since, limit)
-            if not ohlcv:
-                break
-            
-            all_ohlcv.extend(ohlcv)
-            print(f"Fetched {len(ohlcv)} candles. Last: {datetime.fromtimestamp(ohlcv[-1][0]/1000)}")
-            
-            since = ohlcv[-1][0] + 1
-            
-            # If we fetched fewer than limit, we reached the end
-            if len(ohlcv) < limit:
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.storage.candle_store import CandleStore
+
+class RateLimiter:
+    """Spaces request starts across threads (min interval in seconds)"""
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def find_missing_ranges(timestamps, start_ms, end_ms, tf_ms, gaps=()):
+    """Missing [from, to) ranges between start_ms and end_ms given sorted stored timestamps
+    (minus `gaps`: ranges already confirmed empty on the exchange)"""
+    ts = np.asarray(timestamps, dtype=np.int64)
+    ts = ts[(ts >= start_ms) & (ts < end_ms)]
+    if len(ts) == 0:
+        return subtract_gaps([(start_ms, end_ms)] if start_ms < end_ms else [], gaps)
+
+    ranges = []
+    if ts[0] > start_ms:
+        ranges.append((start_ms, int(ts[0]))) # Backfill before the stored history
+
+    # Interior gaps
+    gaps_idx = np.flatnonzero(np.diff(ts) > tf_ms)
+    for g in gaps_idx:
+        ranges.append((int(ts[g]) + tf_ms, int(ts[g + 1])))
+
+    if ts[-1] + tf_ms < end_ms:
+        ranges.append((int(ts[-1]) + tf_ms, end_ms)) # New candles since last sync
+    return subtract_gaps(ranges, gaps)
+
+def subtract_gaps(ranges, gaps):
+    """Cuts the known gaps out of [from, to) ranges"""
+    for gs, ge in sorted(gaps):
+        ranges = [piece for s, e in ranges
+                  for piece in ((s, min(e, gs)), (max(s, ge), e)) if piece[0] < piece[1]]
+    return ranges
+
+def split_range(start_ms, end_ms, tf_ms, limit):
+    """Cuts a range into chunks of at most `limit` candles (one request each)"""
+    step = tf_ms * limit
+    return [(s, min(s + step, end_ms)) for s in range(start_ms, end_ms, step)]
+
+def fetch_range(exchange, symbol, timeframe, start_ms, end_ms, limit, limiter):
+    """All candles with start_ms <= timestamp < end_ms"""
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    candles = []
+    since = start_ms
+    while since < end_ms:
+        limiter.wait()
+        for attempt in range(3):
+            try:
+                raw = exchange.fetch_ohlcv(symbol, timeframe, since, limit)
                 break
-                
-        except Exception as e:
-            print(f"Error fetching data: {e}")
+            except Exception as e:
+                if attempt == 2:
+                    raise
+                print(f"Error fetching {datetime.fromtimestamp(since/1000)}: {e}. Retrying...")
+                time.sleep(1 + attempt)
+        ohlcv = [c for c in raw if since <= c[0] < end_ms]
+        candles.extend(ohlcv)
+        
+        # Past the end of the range, or fewer than limit = no more data on the exchange
+        if not ohlcv or len(ohlcv) < len(raw) or len(raw) < limit:
             break
-            
-    if not all_ohlcv:
-        print("No data fetched.")
-        return
+        since = ohlcv[-1][0] + tf_ms
+    return candles
 
-    # Convert to DataFrame
-    df = pd.DataFrame(all_ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    
-    # Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Sanitize filename
+def download_data(symbol, timeframe, days, output_dir, exchange=None, workers=4, recheck_gaps=False):
+    """Incremental sync into the columnar candle store.
+    Only missing ranges (backfill, gaps, new tail) are fetched, in parallel within the rate limit.
+    Ranges the exchange returned nothing for are recorded in the store and not requested again
+    (recheck_gaps=True forgets them)."""
+    if exchange is None:
+        print(f"Initializing Binance connection for {symbol} ({timeframe})...")
+        exchange = ccxt.binance()
+
+    limit = 1000  # Binance limit
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+    # Sanitize filename (a CSV from older downloads is converted on first use)
     safe_symbol = symbol.replace('/', '_')
-    filename = f"{safe_symbol}_{timeframe}.csv"
-    filepath = os.path.join(output_dir, filename)
-    
-    df.to_csv(filepath, index=False)
-    print(f"Saved {len(df)} rows to {filepath}")
+    csv_path = os.path.join(output_dir, f"{safe_symbol}_{timeframe}.csv")
+    os.makedirs(output_dir, exist_ok=True)
+    store = CandleStore.for_csv(csv_path)
+    if recheck_gaps:
+        store.clear_gaps()
+
+    # Window: `days` back from now, up to the last closed candle (the forming one is never stored)
+    now = exchange.milliseconds()
+    end_ms = (now // tf_ms) * tf_ms
+    start_ms = ((now - days * 24 * 60 * 60 * 1000) // tf_ms) * tf_ms
+
+    missing = find_missing_ranges(store.column("timestamp"), start_ms, end_ms, tf_ms, store.gaps())
+    chunks = [c for s, e in missing for c in split_range(s, e, tf_ms, limit)]
+    if not chunks:
+        print(f"{symbol} {timeframe} already up to date ({len(store)} candles, last {store.last_timestamp()}).")
+        return store
+
+    total = sum((e - s) // tf_ms for s, e in missing)
+    print(f"Fetching {total} missing candles in {len(missing)} range(s), {len(chunks)} requests ({workers} workers)...")
+
+    limiter = RateLimiter(getattr(exchange, "rateLimit", 50) / 1000.0)
+    fetched = []
+    failed = [] # chunks that errored: their holes are not confirmed
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fetch_range, exchange, symbol, timeframe, s, e, limit, limiter) for s, e in chunks]
+        for i, f in enumerate(futures):
+            try:
+                fetched.extend(f.result())
+            except Exception as ex:
+                print(f"Error fetching data: {ex}")
+                failed.append(chunks[i])
+            if (i + 1) % 50 == 0:
+                print(f"Fetched {i + 1}/{len(chunks)} chunks...")
+
+    added = 0
+    if fetched:
+        # Convert, dedupe and merge
+        df = pd.DataFrame(fetched, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df = df.drop_duplicates('timestamp').sort_values('timestamp')
+        added = store.merge(df)
+    else:
+        print("No data fetched.")
+
+    # Continuity check: what is still missing after a successful fetch is an exchange hole (outage,
+    # pre-listing). Record it so later syncs skip it; the open tail may just not be published yet.
+    remaining = find_missing_ranges(store.column("timestamp"), start_ms, end_ms, tf_ms, store.gaps())
+    confirmed = [(s, e) for s, e in remaining
+                 if e < end_ms and not any(s < fe and fs < e for fs, fe in failed)]
+    if confirmed:
+        store.add_gaps(confirmed)
+        gap_candles = sum((e - s) // tf_ms for s, e in confirmed)
+        print(f"Warning: {gap_candles} candles missing on the exchange in {len(confirmed)} range(s); recorded as gaps")
+
+    print(f"Saved {added} new rows to {store.path} ({len(store)} total)")
+    return store
 
 def main():
     parser = argparse.ArgumentParser(description="Download historical data from Binance")
@@ -60,10 +161,13 @@ def main():
     parser.add_argument("--timeframe", type=str, default="15m", help="Timeframe (e.g. 1m, 5m, 15m, 1h, 1d)")
     parser.add_argument("--days", type=int, default=30, help="Number of days of history to fetch")
     parser.add_argument("--output", type=str, default="data/historical", help="Output directory")
-    
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent range fetches")
+    parser.add_argument("--recheck-gaps", action="store_true", help="Request recorded exchange gaps again")
+
     args = parser.parse_args()
-    
-    download_data(args.symbol, args.timeframe, args.days, args.output)
+
+    download_data(args.symbol, args.timeframe, args.days, args.output, workers=args.workers,
+                  recheck_gaps=args.recheck_gaps)
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,12 @@
 import pandas as pd
 import numpy as np
-import ta
 import joblib
 from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, StratifiedKFold, ParameterSampler
+from joblib import Parallel, delayed
 from sklearn.metrics import precision_score, recall_score, accuracy_score
 import os
+import time
 import argparse
 
 if not os.path.exists("models"):
@@ -15,192 +16,144 @@ import sys
 # Fix path to find scripts.download_data from inside scripts/
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from scripts.download_data import download_data
+from app.storage.candle_store import CandleStore
+from app.market.labels import triple_barrier_labels
+from app.market.features import FEATURES, FeatureCache, compute_features
+
+# Label Barriers (TP, SL) per strategy type
+LABEL_BARRIERS = {
+    # Final Profit Squeeze (0.40% / 0.35%)
+    # Just a tiny bit of extra greed.
+    # TP 0.40% (+0.05% boost) / SL 0.35% (Standard)
+    # If WR holds >60%, this prints money.
+    "1m": (0.0040, 0.0035),
+    # 5m High-Yield: 0.75% / 0.50%
+    "5m": (0.0075, 0.0050),
+}
 
 def load_data(filepath, timeframe="5m", days=180):
     need_download = False
-    if not os.path.exists(filepath):
+    try:
+        # Columnar store next to the CSV (converted from the CSV on first use)
+        store = CandleStore.for_csv(filepath)
+    except Exception:
+        store = None
+        
+    if store is None or len(store) == 0:
         print(f"Data file {filepath} not found. Attempting auto-download ({days} days)...")
         need_download = True
     else:
         # Validate existing data duration
-        try:
-            df = pd.read_csv(filepath)
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                min_date = df['timestamp'].min()
-                required_date = pd.Timestamp.now() - pd.Timedelta(days=days)
-                # Allow 1 day buffer
-                if min_date > (required_date + pd.Timedelta(days=1)):
-                    print(f"Existing data insufficient (Starts {min_date}, need {required_date}). Re-downloading...")
-                    need_download = True
-            else:
-                 need_download = True
-        except:
+        min_date = store.first_timestamp()
+        required_date = pd.Timestamp.now() - pd.Timedelta(days=days)
+        # Allow 1 day buffer
+        if min_date > (required_date + pd.Timedelta(days=1)):
+            print(f"Existing data insufficient (Starts {min_date}, need {required_date}). Re-downloading...")
             need_download = True
 
     if need_download:
         try:
             download_data("BTC/USDT", timeframe, days, os.path.dirname(filepath))
+            store = CandleStore.for_csv(filepath)
         except Exception as e:
             print(f"Download failed: {e}")
             return None
             
-    if not os.path.exists(filepath):
+    if len(store) == 0:
          return None
          
-    df = pd.read_csv(filepath)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    return df
+    return store.read()
 
-def feature_engineering(df, strategy_type="5m"):
-    df = df.copy()
-    
+def feature_engineering(df, strategy_type="5m", horizon=60, cache=None):
     # --- SIMPLIFIED "CORE 4" FEATURES ---
     # We strip away the complex "Trend Alignment" and "Volume Force" that caused issues.
     # We focus on the Robust Indicators that worked before: BB, RSI, ADX, SMA.
     
-    # 1. Base Indicators
-    bb = ta.volatility.BollingerBands(close=df["close"], window=20, window_dev=2)
-    df["bb_high"] = bb.bollinger_hband()
-    df["bb_width"] = (bb.bollinger_hband() - bb.bollinger_lband()) / bb.bollinger_mavg()
-    
-    df["rsi"] = ta.momentum.rsi(df["close"], window=14)
-    df["adx"] = ta.trend.adx(df["high"], df["low"], df["close"], window=14)
-    
-    df["sma_200"] = ta.trend.sma_indicator(df["close"], window=200)
-    df["dist_from_sma200"] = (df["close"] - df["sma_200"]) / df["sma_200"]
-    
-    # 2. Volume (CRITICAL: Restoring this feature which drove the 250% return)
-    # Measures if volume is spiking relative to recent average
-    df["volume_sma"] = df["volume"].rolling(window=20).mean()
-    df["volume_rel"] = df["volume"] / df["volume_sma"]
-    
-    # 3. Lagged Features
-    for col in ["rsi", "adx", "bb_width", "volume_rel"]:
-        df[f"{col}_lag1"] = df[col].shift(1)
-        df[f"{col}_lag2"] = df[col].shift(2)
-        df[f"{col}_change"] = df[col] - df[f"{col}_lag1"]
+    # 1-3. Shared Feature Pipeline (same code as the live strategy, cached on disk if enabled)
+    df = cache.features(df, strategy_type) if cache is not None else compute_features(df)
 
     # 4. Simple Breakout
     df["breakout"] = (df["close"] > df["bb_high"]) & (df["close"].shift(1) <= df["bb_high"].shift(1))
     
     # 5. Target Labeling (PROVEN WINNER)
-    df["target"] = 0
-    t_horizon = 60
+    # First touch of TP vs SL within the horizon (vectorized, see app/market/labels.py)
+    tp, sl = LABEL_BARRIERS.get(strategy_type, LABEL_BARRIERS["5m"])
+    df["target"] = triple_barrier_labels(df["close"].values, df["high"].values, df["low"].values, tp, sl, horizon)
     
-    if strategy_type == "1m":
-        # Final Profit Squeeze (0.40% / 0.35%)
-        # Just a tiny bit of extra greed.
-        # TP 0.40% (+0.05% boost) / SL 0.35% (Standard)
-        # If WR holds >60%, this prints money.
-        tp = 0.0040
-        sl = 0.0035
-    else:
-        # 5m High-Yield: 0.75% / 0.50%
-        tp = 0.0075
-        sl = 0.0050
+    return df
 
-    
-    closes = df["close"].values
-    highs = df["high"].values
-    lows = df["low"].values
-    
-    targets = []
-    for i in range(len(df) - t_horizon):
-        curr_close = closes[i]
-        window_highs = highs[i+1 : i+1+t_horizon]
-        window_lows = lows[i+1 : i+1+t_horizon]
-        
-        high_chg = window_highs / curr_close - 1
-        low_chg = window_lows / curr_close - 1
+PARAM_DIST = {
+    # n_estimators is an upper bound: early stopping picks the actual tree count
+    'n_estimators': [100, 200, 300, 500],
+    'learning_rate': [0.01, 0.05, 0.1, 0.2],
+    'max_depth': [3, 5, 7, 9],
+    'subsample': [0.6, 0.8, 1.0],
+    'colsample_bytree': [0.6, 0.8, 1.0]
+}
+
+def resolve_jobs(n_jobs):
+    cores = os.cpu_count() or 1
+    return cores if n_jobs is None or n_jobs < 1 else min(n_jobs, cores)
+
+def evaluate_candidate(params, X, y, folds, ratio, threads, early_stopping_rounds=30):
+    """CV precision for one parameter set (runs inside a worker process)"""
+    start = time.time()
+    scores = []
+    best_rounds = []
+    for train_idx, val_idx in folds:
+        # Early stopping on the tail of the training fold (validation fold stays unseen)
+        n_stop = max(1, len(train_idx) // 10)
+        fit_idx, stop_idx = train_idx[:-n_stop], train_idx[-n_stop:]
         
-        tp_hit = np.where(high_chg >= tp)[0]
-        sl_hit = np.where(low_chg <= -sl)[0]
+        clf = XGBClassifier(**params, scale_pos_weight=ratio, random_state=42, eval_metric='logloss',
+                            tree_method='hist', n_jobs=threads, early_stopping_rounds=early_stopping_rounds)
+        clf.fit(X[fit_idx], y[fit_idx], eval_set=[(X[stop_idx], y[stop_idx])], verbose=False)
         
-        first_tp = tp_hit[0] if len(tp_hit) > 0 else t_horizon + 1
-        first_sl = sl_hit[0] if len(sl_hit) > 0 else t_horizon + 1
+        scores.append(precision_score(y[val_idx], clf.predict(X[val_idx]), zero_division=0))
+        best_rounds.append(clf.best_iteration + 1)
         
-        if first_tp < first_sl:
-            targets.append(1)
-        else:
-            targets.append(0)
-            
-    targets.extend([0] * t_horizon)
-    df["target"] = targets
-    
-    return df
+    return {
+        "params": params,
+        "score": float(np.mean(scores)),
+        "n_estimators": int(np.median(best_rounds)),
+        "seconds": time.time() - start
+    }
 
-def train_model():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--type", type=str, default="5m", choices=["1m", "5m"], help="Strategy Type")
-    parser.add_argument("--days", type=int, default=180, help="Days of history to use")
-    args = parser.parse_args()
-    
-    strategy_type = args.type
-    days = args.days
-    print(f"Training Model for Strategy: {strategy_type} (Days: {days})")
-    
-    # Select Data File
-    data_file = "data/historical/BTC_USDT_1m.csv" if strategy_type == "1m" else "data/historical/BTC_USDT_5m.csv"
-    
-    print(f"Loading data from {data_file}...")
-    df = load_data(data_file, timeframe=strategy_type, days=days)
-    if df is None: return
+def parallel_search(X, y, ratio, n_iter=60, cv=3, n_jobs=-1, budget_seconds=None, early_stopping_rounds=30, random_state=42):
+    """Randomized search over PARAM_DIST.
+    Candidates are evaluated in parallel worker processes (each XGBoost model gets its share
+    of the cores for hist tree building). New batches stop once the wall-clock budget is spent.
+    Returns results sorted by CV precision (best first)."""
+    cores = resolve_jobs(n_jobs)
+    workers = max(1, min(cores, n_iter))
+    threads = max(1, cores // workers)
+    
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(X, y))
+    candidates = list(ParameterSampler(PARAM_DIST, n_iter=n_iter, random_state=random_state))
+    print(f"Searching {len(candidates)} candidates x {cv} folds on {cores} cores "
+          f"({workers} parallel, {threads} threads each, budget: {f'{budget_seconds:.0f}s' if budget_seconds else 'none'})...")
+    
+    results = []
+    started = time.time()
+    with Parallel(n_jobs=workers) as pool:
+        for batch_start in range(0, len(candidates), workers):
+            if results and budget_seconds and time.time() - started > budget_seconds:
+                print(f"Search budget reached after {len(results)} candidates.")
+                break
+            batch = candidates[batch_start:batch_start + workers]
+            batch_results = pool(delayed(evaluate_candidate)(p, X, y, folds, ratio, threads, early_stopping_rounds) for p in batch)
+            for r in batch_results:
+                results.append(r)
+                print(f"  [{len(results)}/{len(candidates)}] precision={r['score']:.4f} trees={r['n_estimators']} "
+                      f"time={r['seconds']:.1f}s {r['params']}")
+    
+    elapsed = time.time() - started
+    print(f"Search finished: {len(results)} candidates in {elapsed:.1f}s "
+          f"(avg {np.mean([r['seconds'] for r in results]):.1f}s per candidate).")
+    return sorted(results, key=lambda r: r["score"], reverse=True)
 
-    print("Generating enhanced features (XGBoost)...")
-    df = feature_engineering(df, strategy_type)
-    
-    breakout_df = df[df["breakout"] == True]
-    print(f"Found {len(breakout_df)} breakout events.")
-    
-    # Select Features
-    base_features = [c for c in df.columns if "lag" in c or "change" in c or c in 
-                ["bb_width", "rsi", "adx", "dist_from_sma200", "volume_rel"]]
-    
-    # Restored 'volume_rel' is essential for breakout validation.
-    
-    features = base_features
-    print(f"Training on {len(features)} features: {features}")
-    
-    X = breakout_df[features]
-    y = breakout_df["target"]
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    print("Training XGBoost Classifier...")
-    ratio = float(np.sum(y_train == 0)) / np.sum(y_train == 1)
-    
-    # Hyperparameter Tuning
-    from sklearn.model_selection import RandomizedSearchCV
-    
-    param_dist = {
-        'n_estimators': [100, 200, 300, 500],
-        'learning_rate': [0.01, 0.05, 0.1, 0.2],
-        'max_depth': [3, 5, 7, 9],
-        'subsample': [0.6, 0.8, 1.0],
-        'colsample_bytree': [0.6, 0.8, 1.0]
-    }
-    
-    xgb = XGBClassifier(scale_pos_weight=ratio, random_state=42, eval_metric='logloss', n_jobs=1)
-    
-    search = RandomizedSearchCV(
-        xgb, 
-        param_distributions=param_dist, 
-        n_iter=10, 
-        scoring='precision', 
-        cv=3, 
-        verbose=1, 
-        random_state=42,
-        n_jobs=1
-    )
-    
-    search.fit(X_train, y_train)
-    
-    print(f"Best Params: {search.best_params_}")
-    clf = search.best_estimator_
-    
-    y_probs = clf.predict_proba(X_test)[:, 1]
-    
+def select_threshold(y_test, y_probs, min_trades=2500):
+    """Probability cut-off with the best test precision among those giving at least min_trades signals"""
     best_thresh = 0.5
     best_prec = 0.0
     best_trades = 0
@@ -216,7 +169,6 @@ def train_model():
     # (because backtest holds positions while training counts every valid minute).
     # To hit 1000 Real Trades, we need ~2500 Raw Signals.
     
-    min_trades = 2500
     print(f"Searching for optimal threshold (Target: Max Precision, Min Trades: {min_trades})...")
     
     for thresh in np.arange(0.5, 0.98, 0.01):
@@ -253,6 +205,71 @@ def train_model():
                 break
 
     print(f"\nCHOSEN OPTIMAL THRESHOLD: {best_thresh:.2f} (Trades approx in test: {best_trades})")
+
+    return best_thresh, best_prec, best_trades
+
+def train_model():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--type", type=str, default="5m", choices=["1m", "5m"], help="Strategy Type")
+    parser.add_argument("--days", type=int, default=180, help="Days of history to use")
+    parser.add_argument("--horizon", type=int, default=60, help="Label look-ahead in candles (TP/SL first touch)")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute features instead of using the feature cache")
+    parser.add_argument("--jobs", type=int, default=-1, help="CPU cores for training (-1 = all)")
+    parser.add_argument("--n-iter", type=int, default=60, help="Hyperparameter candidates to try")
+    parser.add_argument("--early-stopping", type=int, default=30, help="Rounds without logloss improvement before a candidate stops adding trees")
+    parser.add_argument("--budget-minutes", type=float, default=15, help="Wall-clock limit for the search (0 = no limit)")
+    args = parser.parse_args()
+    
+    strategy_type = args.type
+    days = args.days
+    print(f"Training Model for Strategy: {strategy_type} (Days: {days})")
+    
+    # Select Data File
+    data_file = "data/historical/BTC_USDT_1m.csv" if strategy_type == "1m" else "data/historical/BTC_USDT_5m.csv"
+    
+    print(f"Loading data from {data_file}...")
+    df = load_data(data_file, timeframe=strategy_type, days=days)
+    if df is None: return
+
+    print("Generating enhanced features (XGBoost)...")
+    cache = None if args.no_cache else FeatureCache()
+    df = feature_engineering(df, strategy_type, horizon=args.horizon, cache=cache)
+    
+    breakout_df = df[df["breakout"] == True]
+    print(f"Found {len(breakout_df)} breakout events.")
+    
+    # Select Features (canonical order shared with BTCMLStrategyBase)
+    # Restored 'volume_rel' is essential for breakout validation.
+    features = FEATURES
+    print(f"Training on {len(features)} features: {features}")
+    
+    X = breakout_df[features]
+    y = breakout_df["target"]
+    
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    
+    print("Training XGBoost Classifier...")
+    ratio = float(np.sum(y_train == 0)) / np.sum(y_train == 1)
+    
+    # Hyperparameter Tuning (parallel candidates, hist trees, early stopping, wall-clock budget)
+    search = parallel_search(
+        X_train.to_numpy(dtype=np.float64), y_train.to_numpy(), ratio,
+        n_iter=args.n_iter, cv=3, n_jobs=args.jobs,
+        budget_seconds=args.budget_minutes * 60 if args.budget_minutes > 0 else None,
+        early_stopping_rounds=args.early_stopping
+    )
+    best = search[0]
+    print(f"Best Params: {best['params']} (CV Precision: {best['score']:.2%}, Trees: {best['n_estimators']})")
+    
+    # Refit on the full training split with all cores
+    params = {**best['params'], 'n_estimators': best['n_estimators']}
+    clf = XGBClassifier(**params, scale_pos_weight=ratio, random_state=42, eval_metric='logloss',
+                        tree_method='hist', n_jobs=resolve_jobs(args.jobs))
+    clf.fit(X_train, y_train)
+    
+    y_probs = clf.predict_proba(X_test)[:, 1]
+    
+    best_thresh, best_prec, best_trades = select_threshold(y_test, y_probs, min_trades=2500)
     
     # Save model and threshold
     model_name = f"models/btc_xgb_{strategy_type}.joblib"
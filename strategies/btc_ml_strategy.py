@@ -1,15 +1,21 @@
 from strategies.btc_volatility_breakout import BTCVolatilityBreakout
+from app.market.indicators import StreamingIndicators
+from app.market.features import FEATURES, compute_features
 import joblib
 import pandas as pd
-import ta
 import os
 import numpy as np
+import logging
 # XGBoost must be imported for joblib to deserialize the model
 from xgboost import XGBClassifier 
 
 class BTCMLStrategyBase(BTCVolatilityBreakout):
     """Base class for ML Strategies"""
     
+    # Model Features (Synced with train_model.py via the shared pipeline)
+    # We restored 'volume_rel' and its lags
+    features_list = FEATURES
+    
     def __init__(self, timeframe="5m", model_path="models/btc_xgb_5m.joblib", thresh_path="models/btc_xgb_threshold_5m.joblib"):
         super().__init__()
         self.timeframe_str = timeframe
@@ -20,6 +26,12 @@ class BTCMLStrategyBase(BTCVolatilityBreakout):
         self.dynamic_sl = 0.0035 # 0.35%
         self.dynamic_tp = 0.0040 # 0.40%
         
+        # Batch Scores: row index -> (timestamp, probability), filled by score_breakouts
+        self.prob_cache = {}
+        
+        # Optional on-disk FeatureCache (backtests / replays over the same candles)
+        self.feature_cache = None
+        
         self.load_model(model_path, thresh_path)
         
     def update_parameters(self, config):
@@ -44,27 +56,18 @@ class BTCMLStrategyBase(BTCVolatilityBreakout):
              print(f"Loaded Optimal Threshold: {self.threshold}")
              
     def indicators(self, df):
-        # 1. Call Base Indicators (Vol Breakout)
-        df = super().indicators(df)
-        
-        # --- RESTORED WINNING FEATURES (Synced with train_model.py) ---
-        
-        df["bb_width"] = (df["bb_high"] - df["bb_low"]) / df["bb_mid"]
-        
-        df["sma_200"] = ta.trend.sma_indicator(df["close"], window=200)
-        df["dist_from_sma200"] = (df["close"] - df["sma_200"]) / df["sma_200"]
-        
-        # 2. Volume (Restored)
-        df["volume_sma"] = df["volume"].rolling(window=20).mean()
-        df["volume_rel"] = df["volume"] / df["volume_sma"]
-        
-        # 3. Lagged Features
-        for col in ["rsi", "adx", "bb_width", "volume_rel"]:
-            df[f"{col}_lag1"] = df[col].shift(1)
-            df[f"{col}_lag2"] = df[col].shift(2)
-            df[f"{col}_change"] = df[col] - df[f"{col}_lag1"]
+        # Shared Feature Pipeline (app/market/features.py, same code as train_model.py)
+        # Includes the Vol Breakout base indicators (BB, ADX, RSI)
+        if self.feature_cache is not None:
+            df = self.feature_cache.features(df, self.timeframe_str)
+        else:
+            df = compute_features(df)
 
         return df.dropna()
+
+    def streaming_indicators(self):
+        # O(1)-per-candle equivalent of indicators() for the live loop
+        return StreamingIndicators()
         
     def should_enter(self, df):
         if self.model is None or len(df) < 200:
@@ -81,56 +84,118 @@ class BTCMLStrategyBase(BTCVolatilityBreakout):
             
         return True 
 
-class BTCMLStrategy5m(BTCMLStrategyBase):
-    name = "btc_ml_5m"
-    
-    def __init__(self):
-        super().__init__("5m", "models/btc_xgb_5m.joblib", "models/btc_xgb_threshold_5m.joblib")
-        
-    def should_enter(self, df):
-        import logging
-        if not super().should_enter(df):
-            return False
-            
+    def should_exit(self, df, position):
         current = df.iloc[-1]
+        take_profit, stop_loss = self.exit_barriers()
         
-        # 5m Features 
-        features_list = [
-            "bb_width", "rsi", "adx", "dist_from_sma200", "volume_rel",
-            "rsi_lag1", "rsi_lag2", "rsi_change",
-            "adx_lag1", "adx_lag2", "adx_change",
-            "bb_width_lag1", "bb_width_lag2", "bb_width_change",
-            "volume_rel_lag1", "volume_rel_lag2", "volume_rel_change"
-        ]
+        # 1. Take Profit
+        if current["close"] >= position.entry * take_profit:
+            return True
         
+        # 2. Stop Loss
+        if current["close"] <= position.entry * stop_loss:
+            return True
+            
+        return False
+
+    # --- Batch Scoring ---
+
+    def breakout_signals(self, df):
+        """Same breakout check as should_enter, for every row at once"""
+        close = df["close"].to_numpy()
+        bb_high = df["bb_high"].to_numpy()
+        
+        prev_below = np.zeros(len(df), dtype=bool)
+        prev_below[1:] = close[:-1] <= bb_high[:-1]
+        return (close > bb_high) & prev_below
+
+    def score_breakouts(self, df):
+        """Scores every breakout row of an indicator frame with one predict_proba call.
+        Probabilities are cached by row index so should_enter becomes a lookup.
+        Returns a Series (index = breakout rows) or None if scoring failed."""
+        self.prob_cache = {}
+        rows = np.flatnonzero(self.breakout_signals(df))
+        if self.model is None or len(rows) == 0:
+            return pd.Series(dtype=np.float64)
+            
         try:
-            X = current[features_list].values.reshape(1, -1)
-            prob = self.model.predict_proba(X)[0][1]
+            X = df[self.features_list].to_numpy()[rows]
+            probs = self.model.predict_proba(X)[:, 1]
+        except Exception as e:
+            logging.error(f"ML Batch Prediction Failed: {e}")
+            return None
+        
+        index = df.index[rows]
+        # Timestamps guard against a different frame reusing the same row labels (e.g. live refetch)
+        timestamps = df["timestamp"].iloc[rows].tolist()
+        self.prob_cache = dict(zip(index, zip(timestamps, probs)))
+        return pd.Series(probs, index=index)
+
+    def predict_probability(self, current):
+        """ML probability for one candle row (cache hit if pre-scored, otherwise single inference)"""
+        cached = self.prob_cache.get(current.name)
+        if cached is not None and cached[0] == current["timestamp"]:
+            return cached[1]
             
-            # DETAILED DECISION LOG
-            log_msg = (
-                f"Breakout Detected! Analying w/ ML...\n"
-                f"  > Price: {current['close']:.2f}\n"
-                f"  > RSI: {current['rsi']:.1f} | ADX: {current['adx']:.1f}\n"
-                f"  > ML Probability: {prob:.4f} (Threshold: {self.threshold:.4f})"
-            )
+        X = current[self.features_list].values.reshape(1, -1)
+        return self.model.predict_proba(X)[0][1]
+
+    def ml_confirm(self, current):
+        """ML filter applied to a breakout candle"""
+        try:
+            prob = self.predict_probability(current)
+            passed = bool(prob >= self.threshold)
+            
+            # DETAILED DECISION LOG (only formatted when someone is listening)
+            if logging.getLogger().isEnabledFor(logging.INFO):
+                log_msg = (
+                    f"Breakout Detected! Analying w/ ML...\n"
+                    f"  > Price: {current['close']:.2f}\n"
+                    f"  > RSI: {current['rsi']:.1f} | ADX: {current['adx']:.1f}\n"
+                    f"  > ML Probability: {prob:.4f} (Threshold: {self.threshold:.4f})"
+                )
+                if passed:
+                    logging.info(log_msg + "\n  >>> RESULT: PASS (GO LONG) <<<")
+                else:
+                    logging.info(log_msg + "\n  >>> RESULT: REJECT (Low Confidence) <<<")
             
-            if prob >= self.threshold:
-                logging.info(log_msg + "\n  >>> RESULT: PASS (GO LONG) <<<")
-                return True
-            else:
-                logging.info(log_msg + "\n  >>> RESULT: REJECT (Low Confidence) <<<")
-                return False
+            return passed
                 
         except Exception as e:
             logging.error(f"ML Prediction Failed: {e}")
             return False
 
-    def should_exit(self, df, position):
-        current = df.iloc[-1]
-        if current["close"] >= position.entry * 1.0075: return True
-        if current["close"] <= position.entry * 0.9950: return True
-        return False
+    # --- Vectorized Backtest Hooks ---
+
+    def entry_signals(self, df):
+        signals = self.breakout_signals(df)
+        if self.model is None:
+            return np.zeros(len(df), dtype=bool)
+        
+        scores = self.score_breakouts(df)
+        if scores is None:
+            # Same outcome as should_enter: a failed prediction never enters
+            return np.zeros(len(df), dtype=bool)
+            
+        # scores follow the breakout rows in order
+        signals[np.flatnonzero(signals)] = scores.to_numpy() >= self.threshold
+        return signals
+
+class BTCMLStrategy5m(BTCMLStrategyBase):
+    name = "btc_ml_5m"
+    
+    def __init__(self):
+        super().__init__("5m", "models/btc_xgb_5m.joblib", "models/btc_xgb_threshold_5m.joblib")
+        
+    def should_enter(self, df):
+        if not super().should_enter(df):
+            return False
+            
+        return self.ml_confirm(df.iloc[-1])
+
+    def exit_barriers(self):
+        # 5m High-Yield: TP 0.75% / SL 0.50%
+        return 1.0075, 0.9950
 
 class BTCMLStrategy1m(BTCMLStrategyBase):
     name = "btc_ml_1m"
@@ -139,58 +204,11 @@ class BTCMLStrategy1m(BTCMLStrategyBase):
         super().__init__("1m", "models/btc_xgb_1m.joblib", "models/btc_xgb_threshold_1m.joblib")
         
     def should_enter(self, df):
-        import logging
         if not super().should_enter(df):
             return False
             
-        current = df.iloc[-1]
-        
-        # 1m Features (Synced with train_model.py)
-        # We restored 'volume_rel' and its lags
-        features_list = [
-            "bb_width", "rsi", "adx", "dist_from_sma200", "volume_rel",
-            "rsi_lag1", "rsi_lag2", "rsi_change",
-            "adx_lag1", "adx_lag2", "adx_change",
-            "bb_width_lag1", "bb_width_lag2", "bb_width_change",
-            "volume_rel_lag1", "volume_rel_lag2", "volume_rel_change"
-        ]
-        
-        try:
-            X = current[features_list].values.reshape(1, -1)
-            prob = self.model.predict_proba(X)[0][1]
-            
-            # DETAILED DECISION LOG
-            log_msg = (
-                f"Breakout Detected! Analying w/ ML...\n"
-                f"  > Price: {current['close']:.2f}\n"
-                f"  > RSI: {current['rsi']:.1f} | ADX: {current['adx']:.1f}\n"
-                f"  > ML Probability: {prob:.4f} (Threshold: {self.threshold:.4f})"
-            )
-            
-            if prob >= self.threshold:
-                logging.info(log_msg + "\n  >>> RESULT: PASS (GO LONG) <<<")
-                return True
-            else:
-                logging.info(log_msg + "\n  >>> RESULT: REJECT (Low Confidence) <<<")
-                return False
-                
-        except Exception as e:
-            logging.error(f"ML Prediction Failed: {e}")
-            return False
+        return self.ml_confirm(df.iloc[-1])
 
-    def should_exit(self, df, position):
-        current = df.iloc[-1]
-        
-        # 1. Take Profit (Dynamic)
-        if current["close"] >= position.entry * (1 + self.dynamic_tp): 
-            return True
-            
-        
-        # 2. Stop Loss (Dynamic)
-        # Note: Breakeven logic above is commented out/complex, using simple SL for now
-        stop_price = position.entry * (1 - self.dynamic_sl)
-        
-        if current["close"] <= stop_price: 
-            return True
-            
-        return False
+    def exit_barriers(self):
+        # Dynamic TP/SL (updated from config by LiveEngine)
+        return 1 + self.dynamic_tp, 1 - self.dynamic_sl
@@ -0,0 +1,72 @@
+from app.engine.sweep import run_sweep, heatmap
+from strategies.btc_ml_strategy import BTCMLStrategy5m, BTCMLStrategy1m
+import pandas as pd
+import numpy as np
+import argparse
+import os
+
+import sys
+sys.path.append(os.getcwd()) # Ensure root is in path
+from backtest_runner import load_data
+from app.market.features import FeatureCache
+
+def parse_grid(spec, scale=1.0):
+    """'0.3:1.2:0.1' (inclusive range) or '0.4,0.75,1.0' -> list of floats (times scale)"""
+    if ":" in spec:
+        start, stop, step = (float(v) for v in spec.split(":"))
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        values = [float(v) for v in spec.split(",")]
+    return [round(v * scale, 10) for v in values]
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel TP/SL/threshold sweep over one set of indicators and ML scores")
+    parser.add_argument("data_path", nargs="?", default="data/historical/BTC_USDT_5m.csv", help="Path to historical data CSV")
+    parser.add_argument("--strategy", type=str, default="ml_5m", choices=["ml_5m", "ml_1m"], help="Strategy to sweep")
+    parser.add_argument("--days", type=int, default=180, help="Days of history to use")
+    parser.add_argument("--tp", type=str, default="0.3:1.2:0.1", help="Take-profit grid in %% (start:stop:step or list)")
+    parser.add_argument("--sl", type=str, default="0.2:0.8:0.1", help="Stop-loss grid in %% (start:stop:step or list)")
+    parser.add_argument("--thresholds", type=str, default="0.5:0.9:0.05", help="ML probability threshold grid")
+    parser.add_argument("--sizing", type=str, default="both", choices=["fixed", "compounding", "both"], help="Position sizing modes")
+    parser.add_argument("--rank-by", type=str, default="return_pct", choices=["return_pct", "win_rate", "max_drawdown_pct", "trades"], help="Ranking metric")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--top", type=int, default=20, help="Rows of the ranked table to print")
+    parser.add_argument("--output", type=str, default="data/sweeps", help="Directory for the result CSVs")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute features instead of using the feature cache")
+    args = parser.parse_args()
+
+    timeframe = "1m" if args.strategy == "ml_1m" else "5m"
+    if args.data_path == "data/historical/BTC_USDT_5m.csv" and timeframe == "1m":
+        args.data_path = "data/historical/BTC_USDT_1m.csv"
+
+    print(f"Loading data from {args.data_path} (Last {args.days} Days)...")
+    data = load_data(args.data_path, timeframe=timeframe, days=args.days)
+    if data is None:
+        return
+
+    strategy = BTCMLStrategy1m() if args.strategy == "ml_1m" else BTCMLStrategy5m()
+    if not args.no_cache:
+        strategy.feature_cache = FeatureCache()
+
+    sizing = {"fixed": (False,), "compounding": (True,), "both": (False, True)}[args.sizing]
+    table = run_sweep(
+        strategy, data,
+        tps=parse_grid(args.tp, 0.01), sls=parse_grid(args.sl, 0.01), thresholds=parse_grid(args.thresholds),
+        compounding_modes=sizing, workers=args.workers, rank_by=args.rank_by
+    )
+
+    print(f"\n--- Top {args.top} by {args.rank_by} ---")
+    print(table.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    os.makedirs(args.output, exist_ok=True)
+    stamp = f"{args.strategy}_{pd.Timestamp.now():%Y%m%d_%H%M%S}"
+    ranked_path = os.path.join(args.output, f"{stamp}_ranked.csv")
+    table.to_csv(ranked_path, index=False)
+
+    # Heatmap-ready grid: TP rows x SL columns, best return over thresholds
+    heatmap_path = os.path.join(args.output, f"{stamp}_heatmap.csv")
+    heatmap(table, "return_pct", compounding=sizing[0]).to_csv(heatmap_path)
+    print(f"Results saved to {ranked_path} and {heatmap_path}")
+
+if __name__ == "__main__":
+    main()
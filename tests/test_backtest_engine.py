@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from app.engine.backtest_engine import BacktestEngine
+from strategies.btc_ml_strategy import BTCMLStrategy1m, BTCMLStrategy5m
+
+
+class RSIModel:
+    """Stand-in for the XGBoost model: probability rises with RSI"""
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        p = np.clip(X[:, 1] / 100.0, 0, 1)
+        return np.column_stack([1 - p, p])
+
+
+def make_candles(n=6000, seed=7, freq="5min"):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.002, n)) * close
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq=freq),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.uniform(10, 100, n),
+    })
+
+
+def run_engine(strategy, df, mode, compounding=False):
+    engine = BacktestEngine(strategy, df.copy(), compounding=compounding, mode=mode)
+    engine.run()
+    return engine
+
+
+def assert_same_trades(a, b):
+    assert len(a.trades) == len(b.trades)
+    assert len(a.trades) > 0
+    for ta, tb in zip(a.trades, b.trades):
+        assert ta == tb
+    assert a.equity == b.equity
+
+
+def test_vectorized_matches_loop_5m():
+    strategy = BTCMLStrategy5m()
+    strategy.model = RSIModel()
+    strategy.threshold = 0.6
+    df = make_candles()
+    assert_same_trades(run_engine(strategy, df, "loop"), run_engine(strategy, df, "vectorized"))
+
+
+def test_vectorized_matches_loop_1m_compounding():
+    strategy = BTCMLStrategy1m()
+    strategy.model = RSIModel()
+    strategy.threshold = 0.55
+    strategy.dynamic_tp = 0.004
+    strategy.dynamic_sl = 0.0035
+    df = make_candles(seed=11, freq="1min")
+    assert_same_trades(
+        run_engine(strategy, df, "loop", compounding=True),
+        run_engine(strategy, df, "vectorized", compounding=True),
+    )
+
+
+def test_score_breakouts_caches_probabilities():
+    strategy = BTCMLStrategy5m()
+    strategy.model = RSIModel()
+    full_df = strategy.indicators(make_candles(seed=5))
+
+    scores = strategy.score_breakouts(full_df)
+    assert len(scores) > 0
+    assert len(strategy.prob_cache) == len(scores)
+
+    calls = []
+    real_predict = strategy.model.predict_proba
+    strategy.model.predict_proba = lambda X: calls.append(1) or real_predict(X)
+
+    # Cache hits return the batch probability without running inference
+    for label in scores.index[:20]:
+        row = full_df.loc[label]
+        expected = real_predict(row[strategy.features_list].values.reshape(1, -1))[0][1]
+        assert strategy.predict_probability(row) == expected
+    assert calls == []
+
+    # A different frame reusing the same row labels falls back to single-row inference
+    row = full_df.loc[scores.index[0]].copy()
+    row["timestamp"] = row["timestamp"] + pd.Timedelta(minutes=5)
+    strategy.predict_probability(row)
+    assert calls == [1]
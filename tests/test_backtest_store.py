@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.engine.performance import bar_metrics
+from app.storage.backtest_store import BacktestStore
+from test_backtest_engine import RSIModel, make_candles, run_engine
+from strategies.btc_ml_strategy import BTCMLStrategy5m
+
+
+def finished_engine(seed=7):
+    strategy = BTCMLStrategy5m()
+    strategy.model = RSIModel()
+    strategy.threshold = 0.6
+    return run_engine(strategy, make_candles(seed=seed), "vectorized")
+
+
+def test_equity_curve_ends_at_realized_equity():
+    engine = finished_engine()
+    equity, in_position = engine.equity_curve()
+    assert len(equity) == len(engine.bar_close)
+    if engine.position is None:
+        assert equity[-1] == pytest.approx(engine.equity)
+    assert 0 < in_position.mean() < 1
+
+    metrics = engine.metrics()
+    assert metrics['exposure_pct'] == pytest.approx(in_position.mean() * 100)
+    # Marking open positions to market can only deepen the trade-to-trade drawdown
+    assert metrics['max_drawdown_bar_pct'] <= metrics['max_drawdown_pct'] + 1e-9
+
+
+def test_bar_metrics_sign():
+    t = np.arange(1000, dtype=np.int64) * 60_000
+    rising = 10000 * np.cumprod(1 + np.where(np.arange(1000) % 3, 0.001, -0.0005))
+    stats = bar_metrics(t, rising, np.ones(1000, dtype=bool))
+    assert stats['sharpe'] > 0 and stats['sortino'] > stats['sharpe']
+    assert stats['exposure_pct'] == 100.0
+
+
+def test_store_round_trip_and_compare(tmp_path):
+    store = BacktestStore(str(tmp_path))
+    a, b = finished_engine(7), finished_engine(8)
+    id_a = store.save(a.result(params={'days': 30}))
+    id_b = store.save(b.result())
+
+    runs = store.list()
+    assert set(runs['run_id']) == {id_a, id_b}
+
+    loaded = store.load(id_a)
+    assert loaded['meta']['params']['days'] == 30
+    assert loaded['meta']['metrics']['trades'] == len(a.trades)
+    assert np.allclose(loaded['trades']['pnl'], [t['pnl'] for t in a.trades])
+    assert list(loaded['trades']['exit_time']) == [t['exit_time'] for t in a.trades]
+    assert len(loaded['equity']) == len(a.bar_time)
+
+    table = store.compare([id_a, id_b])
+    assert list(table.columns) == [id_a, id_b]
+    assert table.loc['final_equity', id_b] == pytest.approx(b.equity)
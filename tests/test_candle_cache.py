@@ -0,0 +1,90 @@
+import threading
+import time
+
+from app.market.candle_cache import CandleCache, store_path
+
+STEP = 60_000
+
+
+class FakeExchange:
+    """fetch_ohlcv over a synthetic 1m series ending with the forming candle at `now`"""
+    def __init__(self, clock, delay=0.0):
+        self.clock, self.delay = clock, delay
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=500):
+        self.calls.append((since, limit))
+        time.sleep(self.delay)
+        now = int(self.clock() * 1000)
+        current = now - now % STEP
+        start = since if since is not None else current - (limit - 1) * STEP
+        return [[ts, 1.0, 2.0, 0.5, ts / STEP, 10.0] for ts in range(start, current + 1, STEP)][:limit]
+
+
+def test_concurrent_requests_share_one_upstream_call(tmp_path):
+    now = [1_000_000.0]
+    exchange = FakeExchange(lambda: now[0], delay=0.2)
+    cache = CandleCache(exchange, live_dir=str(tmp_path), history_dir=None, ttl=5.0, clock=lambda: now[0])
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("BTC/USDT", "1m", 100))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(exchange.calls) == 1
+    assert all(r == results[0] and len(r) == 100 for r in results)
+
+    # Within ttl: memory only. After: just the tail since the last (forming) candle
+    cache.get("BTC/USDT", "1m", 50)
+    assert len(exchange.calls) == 1
+    now[0] += 185
+    candles = cache.get("BTC/USDT", "1m", 100)
+    assert exchange.calls[-1] == (results[0][-1][0], 4)
+    assert [c[0] for c in candles] == [c[0] for c in results[0][3:]] + [results[0][-1][0] + i * STEP for i in (1, 2, 3)]
+
+
+def test_published_candles_fill_the_cache_of_another_process(tmp_path):
+    now = [1_000_000.0]
+    current = int(now[0] * 1000) - int(now[0] * 1000) % STEP
+    closed = [[current - i * STEP, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(200, 0, -1)]
+    assert CandleCache(live_dir=str(tmp_path)).publish("BTC/USDT", "1m", closed) == 200
+    assert (tmp_path / "BTC_USDT_1m").exists() and store_path(str(tmp_path), "BTC/USDT", "1m").endswith("BTC_USDT_1m")
+
+    exchange = FakeExchange(lambda: now[0])
+    cache = CandleCache(exchange, live_dir=str(tmp_path), history_dir=None, clock=lambda: now[0])
+    candles = cache.get("BTC/USDT", "1m", 150)
+    assert exchange.calls == [(closed[-1][0], 2)] # only the last closed + the forming candle
+    assert len(candles) == 150 and candles[-1][0] == current
+
+
+def test_rest_feed_publishes_off_the_fetch_path(tmp_path):
+    from app.market.data_feed import BinanceDataFeed
+
+    now = [1_000_000.0]
+    release = threading.Event()
+
+    class SlowCache(CandleCache):
+        def publish(self, symbol, timeframe, candles):
+            release.wait(5) # slow disk
+            return super().publish(symbol, timeframe, candles)
+
+    feed = BinanceDataFeed("BTC/USDT", "1m", limit=50, cache=SlowCache(live_dir=str(tmp_path)))
+    feed.exchange = FakeExchange(lambda: now[0])
+    started = time.monotonic()
+    df = feed.get_latest()
+    assert time.monotonic() - started < 1.0 and len(df) == 50
+    release.set()
+    feed.pending.join()
+    cache = CandleCache(FakeExchange(lambda: now[0]), live_dir=str(tmp_path), history_dir=None, clock=lambda: now[0])
+    assert len(cache.get("BTC/USDT", "1m", 49)) == 49 and cache.exchange.calls[0][1] == 2 # 49 published closed candles
+
+
+def test_limit_is_clamped_to_the_cache_size(tmp_path):
+    now = [1_000_000.0]
+    exchange = FakeExchange(lambda: now[0])
+    cache = CandleCache(exchange, live_dir=str(tmp_path), history_dir=None, max_candles=100, clock=lambda: now[0])
+    assert len(cache.get("BTC/USDT", "1m", 0)) == 1
+    assert len(cache.get("BTC/USDT", "1m", -5)) == 1
+    assert len(cache.get("BTC/USDT", "1m", 5000)) == 100
+    assert all(0 < limit <= 100 for _, limit in exchange.calls)
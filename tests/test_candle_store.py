@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.storage.candle_store import CandleStore
+from test_backtest_engine import make_candles
+
+
+def test_csv_conversion_and_range_reads(tmp_path):
+    candles = make_candles(n=2000, seed=4)
+    csv_path = os.path.join(tmp_path, "BTC_USDT_5m.csv")
+    candles.to_csv(csv_path, index=False)
+
+    store = CandleStore.for_csv(csv_path)
+    assert len(store) == 2000
+    assert os.path.isdir(os.path.join(tmp_path, "BTC_USDT_5m"))
+
+    full = store.read()
+    pd.testing.assert_frame_equal(full, pd.read_csv(csv_path, parse_dates=["timestamp"]), check_dtype=False)
+
+    start, end = candles["timestamp"].iloc[100], candles["timestamp"].iloc[199]
+    window = store.read(start=start, end=end)
+    assert len(window) == 100
+    assert window["timestamp"].iloc[0] == start and window["timestamp"].iloc[-1] == end
+
+    # Same rows as the runner's "last N days" filter
+    days = store.read_days(2)
+    expected = full[full["timestamp"] >= full["timestamp"].max() - pd.Timedelta(days=2)]
+    assert len(days) == len(expected)
+
+    # Re-opening does not convert again
+    mtime = os.path.getmtime(store.meta_path)
+    assert len(CandleStore.for_csv(csv_path)) == 2000
+    assert os.path.getmtime(store.meta_path) == mtime
+
+
+def test_append_dedupes_and_merge_backfills(tmp_path):
+    candles = make_candles(n=500, seed=9)
+    store = CandleStore(os.path.join(tmp_path, "store"))
+
+    assert store.append(candles.iloc[100:300]) == 200
+    # Overlapping batch only adds the new tail
+    assert store.append(candles.iloc[250:400]) == 100
+    assert len(store) == 300
+
+    # Older history goes through merge (rewrite path)
+    assert store.merge(candles.iloc[:150]) == 100
+    assert len(CandleStore(store.path)) == 400
+
+    df = store.read()
+    assert df["timestamp"].is_monotonic_increasing
+    np.testing.assert_array_equal(df["close"].to_numpy(), candles["close"].iloc[:400].to_numpy())
@@ -0,0 +1,66 @@
+import pytest
+
+from app.engine.backtest_engine import BacktestEngine
+from app.engine.costs import CostModel
+from strategies.btc_ml_strategy import BTCMLStrategy5m
+from test_backtest_engine import RSIModel, make_candles, run_engine
+from test_intrabar_exits import OneEntry, flat_candles
+
+
+def run(df, costs, exits="close"):
+    engine = BacktestEngine(OneEntry(), df, exits=exits, costs=costs)
+    engine.run()
+    return engine
+
+
+def take_profit_candles():
+    df = flat_candles()
+    df.loc[203:, ["open", "high", "low", "close"]] = 101.0
+    df.loc[205:, ["open", "high", "low", "close"]] = 101.5
+    return df
+
+
+def test_zero_cost_model_matches_frictionless_run():
+    def strategy():
+        s = BTCMLStrategy5m()
+        s.model = RSIModel()
+        s.threshold = 0.6
+        return s
+    df = make_candles()
+    plain = run_engine(strategy(), df, "vectorized")
+    costed = BacktestEngine(strategy(), df.copy(), mode="vectorized", costs=CostModel())
+    costed.run()
+    assert [t['pnl'] for t in costed.trades] == [t['pnl'] for t in plain.trades]
+    assert costed.summary()['fees'] == 0.0
+
+
+def test_taker_fees_on_both_sides():
+    trade = run(take_profit_candles(), CostModel(taker_fee=0.001)).trades[0]
+    # 100 units bought at 100, sold at 101: 10.00 + 10.10 in fees
+    assert trade['fees'] == pytest.approx(20.1)
+    assert trade['pnl'] == pytest.approx(100.0 - 20.1)
+
+
+def test_spread_moves_both_fills():
+    trade = run(take_profit_candles(), CostModel(spread_bps=2.0)).trades[0]
+    assert trade['entry'] == pytest.approx(100.0 * 1.0001)
+    # TP is measured from the filled entry (101.01), so 101.0 no longer reaches it
+    assert trade['exit'] == pytest.approx(101.5 * 0.9999)
+    assert trade['slippage'] > 0
+
+
+def test_latency_delays_entry_and_close_exit():
+    df = take_profit_candles()
+    trade = run(df, CostModel(latency_bars=2)).trades[0]
+    assert trade['entry_time'] == df["timestamp"].iloc[202]
+    assert trade['exit_time'] == df["timestamp"].iloc[205]
+    assert trade['exit'] == 101.5
+
+
+def test_resting_take_profit_pays_maker_fee_without_latency():
+    df = flat_candles()
+    df.loc[203, "high"] = 101.5
+    trade = run(df, CostModel(maker_fee=0.0002, taker_fee=0.001, latency_bars=1), exits="high_low").trades[0]
+    assert trade['exit'] == 101.0
+    assert trade['exit_time'] == df["timestamp"].iloc[203]
+    assert trade['fees'] == pytest.approx(10000 * 0.001 + 100 * 101.0 * 0.0002)
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import numpy as np
+
+from app.storage.candle_store import CandleStore
+from scripts.download_data import download_data, find_missing_ranges
+
+TF_MS = 60_000
+NOW = 1_700_000_000_000 + 30_000 # mid-candle
+
+
+class FakeExchange:
+    """ccxt-like exchange serving a deterministic 1m series"""
+    rateLimit = 0
+
+    def __init__(self, holes=()):
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.holes = holes # timestamps the exchange has no data for
+
+    def milliseconds(self):
+        return NOW
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=1000):
+        with self.lock:
+            self.calls += 1
+        start = -(-since // TF_MS) * TF_MS
+        out = []
+        t = start
+        while len(out) < limit and t <= NOW:
+            if t not in self.holes:
+                price = 30000 + (t // TF_MS) % 997
+                out.append([t, price, price + 5, price - 5, price + 1, 10.0])
+            t += TF_MS
+        return out
+
+
+def read_timestamps(output_dir):
+    return CandleStore(os.path.join(output_dir, "BTC_USDT_1m")).column("timestamp")
+
+
+def test_sync_downloads_once_then_only_new_candles(tmp_path):
+    output = str(tmp_path)
+    exchange = FakeExchange()
+    download_data("BTC/USDT", "1m", 3, output, exchange=exchange, workers=4)
+
+    ts = np.array(read_timestamps(output))
+    assert len(ts) == 3 * 24 * 60
+    assert (np.diff(ts) == TF_MS).all()
+    assert ts[-1] + TF_MS <= NOW # forming candle is not stored
+    first_calls = exchange.calls
+    assert first_calls == 5 # 4320 candles / 1000 per request
+
+    # Up to date: no requests at all
+    download_data("BTC/USDT", "1m", 3, output, exchange=exchange)
+    assert exchange.calls == first_calls
+
+    # Longer window: only the older range is backfilled
+    download_data("BTC/USDT", "1m", 4, output, exchange=exchange)
+    assert exchange.calls - first_calls == 2 # 1440 candles -> 2 requests
+    ts = np.array(read_timestamps(output))
+    assert len(ts) == 4 * 24 * 60 and (np.diff(ts) == TF_MS).all()
+
+
+def test_sync_fills_interior_gaps_and_reports_exchange_holes(tmp_path):
+    output = str(tmp_path)
+    end = (NOW // TF_MS) * TF_MS
+    hole = {end - 100 * TF_MS, end - 99 * TF_MS}
+    download_data("BTC/USDT", "1m", 1, output, exchange=FakeExchange(holes=hole))
+    ts = read_timestamps(output)
+    assert len(find_missing_ranges(ts, ts[0], end, TF_MS)) == 1
+    store = CandleStore(os.path.join(output, "BTC_USDT_1m"))
+    assert store.gaps() == [(min(hole), max(hole) + TF_MS)]
+    assert find_missing_ranges(ts, ts[0], end, TF_MS, store.gaps()) == []
+
+    # Recorded hole: not requested again
+    exchange = FakeExchange()
+    download_data("BTC/USDT", "1m", 1, output, exchange=exchange)
+    assert exchange.calls == 0
+
+    # Exchange now has the data: only the gap is requested
+    download_data("BTC/USDT", "1m", 1, output, exchange=exchange, recheck_gaps=True)
+    assert exchange.calls == 1
+    ts = read_timestamps(output)
+    assert find_missing_ranges(ts, ts[0], end, TF_MS) == []
@@ -0,0 +1,43 @@
+import json
+
+from app.monitoring.events import EventHub
+from app.storage.repository import TradeRepository
+
+
+def test_hub_replays_backlog_then_publishes_only_new_data(tmp_path):
+    status, log = tmp_path / "status.json", tmp_path / "trading.log"
+    status.write_text(json.dumps({"price": 1.0}))
+    log.write_text("".join(f"line {i}\n" for i in range(150)))
+    repo = TradeRepository(str(tmp_path / "trades.db"), migrate_csv=None)
+    repo.add_trade("BUY", 100.0, 0.1, ts=1000)
+    repo.flush()
+    hub = EventHub({'status': str(status), 'logs': str(log)}, repository=repo, interval=60)
+
+    q = hub.subscribe()
+    backlog = dict(q.get_nowait() for _ in range(3))
+    assert backlog['status'] == {"price": 1.0}
+    assert backlog['logs'] == [f"line {i}\n" for i in range(50, 150)]
+    assert [(t['label'], t['price']) for t in backlog['trades']] == [("BUY", 100.0)]
+    other = hub.subscribe() # second tab shares the same watcher
+    assert hub.thread is not None
+
+    with open(log, "a") as f:
+        f.write("new line\npartial")
+    repo.add_trade("SELL", 101.0, 0.1, pnl=0.1, tag="SIM", ts=2000)
+    repo.flush()
+    hub.poll()
+    assert q.get_nowait() == ('logs', ["new line\n"]) # partial line held back
+    event, rows = q.get_nowait()
+    assert event == 'trades' and [t['label'] for t in rows] == ["SELL (SIM)"]
+    assert q.empty()
+    hub.poll()
+    assert q.empty() # nothing changed, nothing sent
+
+    log.write_text("rotated\n") # truncated/rotated log starts over
+    hub.poll()
+    assert q.get_nowait() == ('logs', ["rotated\n"])
+    assert other.qsize() == 3 + 3
+
+    hub.unsubscribe(q)
+    hub.unsubscribe(other)
+    assert not hub.subscribers
@@ -0,0 +1,56 @@
+import pytest
+
+from app.execution.binance_spot import BinanceSpot
+from app.execution.state import ExecutionState
+from app.storage.repository import TradeRepository
+
+
+class FakeClient:
+    """ccxt-like client that records every call"""
+    def __init__(self, usdt=1000.0, btc=0.0, price=50000.0):
+        self.calls = []
+        self.usdt, self.btc, self.price = usdt, btc, price
+
+    def load_markets(self):
+        self.calls.append("load_markets")
+        return {"BTC/USDT": {"precision": {"amount": 1e-5},
+                             "limits": {"amount": {"min": 1e-5}, "cost": {"min": 5.0}}}}
+
+    def fetch_balance(self):
+        self.calls.append("fetch_balance")
+        return {"USDT": {"free": self.usdt}, "BTC": {"free": self.btc}}
+
+    def fetch_ticker(self, symbol):
+        self.calls.append("fetch_ticker")
+        return {"last": self.price}
+
+    def create_market_buy_order(self, symbol, amount):
+        self.calls.append("create_market_buy_order")
+        fee = amount * 0.001
+        self.btc += amount - fee
+        self.usdt -= amount * self.price
+        return {"id": "1", "filled": amount, "average": self.price, "cost": amount * self.price,
+                "fee": {"cost": fee, "currency": "BTC"}}
+
+
+def test_rules_round_and_validate():
+    state = ExecutionState()
+    state.load_market(FakeClient())
+    assert state.round_amount(0.0123456) == pytest.approx(0.01234)
+    assert state.validate(0.00005, 50000.0) is not None # $2.50 < min notional
+    assert state.validate(0.001, 50000.0) is None
+
+
+def test_buy_places_order_without_extra_reads_and_reconciles(tmp_path):
+    spot = BinanceSpot(repository=TradeRepository(str(tmp_path / "trades.db"), migrate_csv=None))
+    spot.client, spot.live_mode = FakeClient(), True
+    spot.sync_position()
+    spot.client.calls.clear()
+
+    spot.buy(price=50000.0)
+    assert spot.client.calls[0] == "create_market_buy_order"
+    spot.reconciler.join(5)
+    # Local booking (net of the BTC fee) matched the exchange: no drift, no extra orders
+    assert spot.client.calls[1:] == ["fetch_balance", "fetch_ticker"]
+    assert spot.state.free("BTC") == pytest.approx(spot.client.btc)
+    assert spot.position.size == pytest.approx(0.0198 * 0.999)
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+
+from app.market.features import FEATURES, FeatureCache, compute_features
+from scripts.train_model import feature_engineering
+from strategies.btc_ml_strategy import BTCMLStrategy5m
+from strategies.btc_volatility_breakout import BTCVolatilityBreakout
+from test_backtest_engine import make_candles
+
+
+def test_training_and_strategy_share_features():
+    df = make_candles(n=1500, seed=8)
+    train = feature_engineering(df, "5m")
+    live = BTCMLStrategy5m().indicators(df)
+    pd.testing.assert_frame_equal(train.loc[live.index, FEATURES], live[FEATURES])
+
+    # Base indicators are unchanged from the Vol Breakout strategy
+    base = BTCVolatilityBreakout().indicators(df)
+    for col in ["bb_high", "bb_mid", "bb_low", "adx", "rsi"]:
+        pd.testing.assert_series_equal(train[col], base[col])
+
+
+def test_feature_cache_hits_and_invalidates(tmp_path):
+    cache = FeatureCache(cache_dir=str(tmp_path))
+    df = make_candles(n=1000, seed=1)
+
+    first = cache.features(df, "5m")
+    pd.testing.assert_frame_equal(first, compute_features(df))
+    assert len(os.listdir(tmp_path)) == 1
+
+    # Second call is served from disk (compute_features is not needed)
+    import app.market.features as features
+    original = features.compute_features
+    features.compute_features = None
+    try:
+        pd.testing.assert_frame_equal(cache.features(df, "5m"), first)
+    finally:
+        features.compute_features = original
+
+    # Changing one candle (or the timeframe) gives a new key
+    changed = df.copy()
+    changed.loc[500, "close"] *= 1.01
+    assert cache.key(changed, "5m") != cache.key(df, "5m")
+    assert cache.key(df, "1m") != cache.key(df, "5m")
+    cache.features(changed, "5m")
+    assert len(os.listdir(tmp_path)) == 2
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from app.market.indicators import StreamingIndicators
+from strategies.btc_ml_strategy import BTCMLStrategy5m
+from test_backtest_engine import make_candles
+
+
+def test_streaming_matches_batch_indicators():
+    df = make_candles(n=3000, seed=21)
+    batch = BTCMLStrategy5m().indicators(df).reset_index(drop=True)
+
+    state = StreamingIndicators(history=len(df))
+    state.update_frame(df)
+    stream = state.frame()
+
+    assert len(stream) == len(batch)
+    assert (stream["timestamp"].to_numpy() == batch["timestamp"].to_numpy()).all()
+    for col in state.columns:
+        np.testing.assert_allclose(stream[col], batch[col], rtol=1e-9, atol=1e-9, err_msg=col)
+
+    # Wilder-smoothed features follow ta bit-for-bit
+    for col in ["rsi", "adx", "rsi_lag1", "adx_change"]:
+        assert (stream[col].to_numpy() == batch[col].to_numpy()).all()
+
+
+def test_streaming_feature_vector_and_history():
+    df = make_candles(n=800, seed=3)
+    strategy = BTCMLStrategy5m()
+    batch = strategy.indicators(df)
+
+    state = StreamingIndicators(history=250)
+    assert not state.ready
+    state.update_frame(df.iloc[:199])
+    assert not state.ready # SMA 200 still warming up
+
+    state.update_frame(df.iloc[199:])
+    assert state.ready
+    assert len(state.frame()) == 250
+    assert state.frame()["timestamp"].iloc[-1] == df["timestamp"].iloc[-1]
+
+    X = state.features(strategy.features_list)
+    expected = batch[strategy.features_list].iloc[-1].to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(X[0], expected, rtol=1e-9, atol=1e-9)
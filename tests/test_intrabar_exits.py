@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from app.engine.backtest_engine import BacktestEngine
+from app.storage.candle_store import CandleStore
+from app.strategies.base import StrategyBase
+
+
+class OneEntry(StrategyBase):
+    """Enters once at row 200; TP +1% / SL -1%"""
+    name = "one_entry"
+
+    def indicators(self, df):
+        return df
+
+    def entry_signals(self, df):
+        signals = np.zeros(len(df), dtype=bool)
+        signals[200] = True
+        return signals
+
+    def exit_barriers(self):
+        return 1.01, 0.99
+
+
+def flat_candles(n=220):
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="5min"),
+        "open": np.full(n, 100.0), "high": np.full(n, 100.2), "low": np.full(n, 99.8),
+        "close": np.full(n, 100.0), "volume": np.ones(n),
+    })
+
+
+def run(df, exits="high_low", sub_bars=None):
+    engine = BacktestEngine(OneEntry(), df, exits=exits, sub_bars=sub_bars)
+    engine.run()
+    return engine
+
+
+def test_wick_through_take_profit_exits_at_barrier():
+    df = flat_candles()
+    df.loc[203, "high"] = 101.5
+
+    assert len(run(df.copy(), exits="close").trades) == 0 # close never reaches TP
+    trade = run(df).trades[0]
+    assert trade['exit'] == 101.0
+    assert trade['exit_time'] == df["timestamp"].iloc[203]
+
+
+def test_gap_through_stop_fills_at_open():
+    df = flat_candles()
+    df.loc[203, ["open", "low", "close"]] = [98.0, 97.5, 98.2]
+    assert run(df).trades[0]['exit'] == 98.0
+
+
+def both_barriers_bar():
+    df = flat_candles()
+    df.loc[203, ["high", "low"]] = [101.5, 98.5]
+    # 1m sub-bars of bar 203: TP touched in the 2nd minute, SL in the 4th
+    start = df["timestamp"].iloc[203]
+    sub = pd.DataFrame({
+        "timestamp": pd.date_range(start, periods=5, freq="1min"),
+        "open": [100.0, 100.5, 101.2, 100.0, 98.8],
+        "high": [100.6, 101.3, 101.2, 100.1, 99.0],
+        "low": [99.9, 100.4, 100.0, 98.6, 98.5],
+        "close": [100.5, 101.2, 100.0, 98.8, 99.5],
+        "volume": np.ones(5),
+    })
+    return df, sub
+
+
+def test_ambiguous_bar_without_sub_bars_assumes_stop_first():
+    df, _ = both_barriers_bar()
+    engine = run(df)
+    assert engine.trades[0]['exit'] == 99.0
+    assert engine.intrabar == {'ambiguous': 1, 'resolved': 0}
+
+
+def test_ambiguous_bar_resolved_from_candle_store(tmp_path):
+    df, sub = both_barriers_bar()
+    store = CandleStore(str(tmp_path / "BTC_USDT_1m"))
+    store.append(sub)
+
+    engine = run(df, sub_bars=store)
+    assert engine.trades[0]['exit'] == 101.0
+    assert engine.intrabar == {'ambiguous': 1, 'resolved': 1}
@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.market.kline_replay import KlineReplayServer
+from app.market.kline_stream import KlineStreamFeed
+from test_backtest_engine import make_candles
+
+
+def test_stream_feed_replays_closed_candles():
+    candles_5m = make_candles(n=400, seed=1, freq="5min")
+    candles_1h = make_candles(n=240, seed=2, freq="1h")
+    server = KlineReplayServer({"5m": candles_5m, "1h": candles_1h}).start()
+
+    feed = KlineStreamFeed(timeframe="5m", limit=300, url=server.url, seed_exchange=None)
+    feed.start()
+    try:
+        assert feed.wait_for_close(timeout=5)
+        assert server.finished.wait(5)
+
+        # Wait until the whole replay has been consumed
+        for _ in range(100):
+            if feed.get_latest()["timestamp"].iloc[-1] == candles_5m["timestamp"].iloc[-1]:
+                break
+            feed.wait_for_close(timeout=0.1)
+
+        df = feed.get_latest()
+        assert len(df) == 300 # ring buffer keeps the last `limit` closed candles
+        expected = candles_5m.tail(300).reset_index(drop=True)
+        assert (df["timestamp"].to_numpy() == expected["timestamp"].to_numpy()).all()
+        for col in ["open", "high", "low", "close", "volume"]:
+            np.testing.assert_allclose(df[col], expected[col])
+
+        # Forming-candle updates are ignored (replay sends close == open for them)
+        assert (df["close"].to_numpy() == expected["close"].to_numpy()).all()
+
+        closes = candles_1h["close"]
+        expected_trend = 1 if closes.iloc[-1] > closes.rolling(200).mean().iloc[-1] else -1
+        assert feed.get_1h_trend() == expected_trend
+        assert len(feed.get_latest(limit=5)) == 5
+    finally:
+        feed.stop()
+        server.stop()
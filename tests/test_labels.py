@@ -0,0 +1,40 @@
+import numpy as np
+
+from app.market.labels import triple_barrier_labels
+from scripts.train_model import LABEL_BARRIERS, feature_engineering
+from test_backtest_engine import make_candles
+
+
+def loop_labels(closes, highs, lows, tp, sl, t_horizon):
+    """Original per-row labeling loop from train_model.feature_engineering"""
+    targets = []
+    for i in range(len(closes) - t_horizon):
+        curr_close = closes[i]
+        high_chg = highs[i+1 : i+1+t_horizon] / curr_close - 1
+        low_chg = lows[i+1 : i+1+t_horizon] / curr_close - 1
+        tp_hit = np.where(high_chg >= tp)[0]
+        sl_hit = np.where(low_chg <= -sl)[0]
+        first_tp = tp_hit[0] if len(tp_hit) > 0 else t_horizon + 1
+        first_sl = sl_hit[0] if len(sl_hit) > 0 else t_horizon + 1
+        targets.append(1 if first_tp < first_sl else 0)
+    targets.extend([0] * t_horizon)
+    return np.array(targets)
+
+
+def test_vectorized_labels_match_loop():
+    df = make_candles(n=5000, seed=13)
+    closes, highs, lows = df["close"].values, df["high"].values, df["low"].values
+    for tp, sl in LABEL_BARRIERS.values():
+        for horizon in [1, 15, 60]:
+            expected = loop_labels(closes, highs, lows, tp, sl, horizon)
+            got = triple_barrier_labels(closes, highs, lows, tp, sl, horizon)
+            assert (got == expected).all()
+            assert expected.sum() > 0
+
+
+def test_feature_engineering_uses_strategy_barriers():
+    df = make_candles(n=1000, seed=2)
+    out = feature_engineering(df, "1m", horizon=30)
+    tp, sl = LABEL_BARRIERS["1m"]
+    expected = loop_labels(df["close"].values, df["high"].values, df["low"].values, tp, sl, 30)
+    assert (out["target"].to_numpy() == expected).all()
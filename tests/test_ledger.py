@@ -0,0 +1,31 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from app.engine.ledger import Position, TradeLedger
+
+def test_ledger_grows_and_reads_back_trades():
+    ledger = TradeLedger(capacity=2)
+    start = pd.Timestamp("2024-01-01")
+    for i in range(5):
+        ledger.append(100.0, 101.0 + i, 1.0 + i, 0.01, start, start + pd.Timedelta(minutes=i + 1), 1.0)
+
+    assert len(ledger) == 5
+    assert len(ledger.data) == 8
+    assert np.allclose(ledger.column('pnl'), [1, 2, 3, 4, 5])
+    trade = ledger[4]
+    assert trade['exit'] == 105.0
+    assert trade['exit_time'] == start + pd.Timedelta(minutes=5)
+    assert trade['duration'] == pd.Timedelta(minutes=5)
+    assert [t['pnl'] for t in ledger] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert list(ledger.to_frame()['duration']) == [pd.Timedelta(minutes=i + 1) for i in range(5)]
+
+def test_position_is_slotted_and_snapshots():
+    pos = Position(100.0, 0.5, pd.Timestamp("2024-01-01"), fees=0.05)
+    assert not hasattr(pos, '__dict__')
+    assert pos.capital == 50.0
+
+    copy = pickle.loads(pickle.dumps(pos))
+    assert copy.snapshot() == pos.snapshot()
+    assert Position.restore(pos.snapshot()).snapshot() == pos.snapshot()
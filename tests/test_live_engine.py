@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+import app.engine.live_engine as live_engine
+from app.config.state_bus import StateChannel
+from app.engine.live_engine import LiveEngine
+from test_backtest_engine import make_candles
+
+
+class BarrierFeed:
+    """Both calls block until the other one has started (fails unless they run concurrently)"""
+    def __init__(self):
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def get_latest(self, limit=None):
+        self.barrier.wait()
+        return make_candles(n=300)
+
+    def get_1h_trend(self):
+        self.barrier.wait()
+        return 1
+
+
+class AlwaysEnter:
+    name = "always"
+    timeframe_str = "5m"
+
+    def streaming_indicators(self):
+        return None
+
+    def indicators(self, df):
+        return df
+
+    def should_enter(self, df):
+        return True
+
+
+class RecordingExecutor:
+    position = None
+
+    def __init__(self):
+        self.orders = []
+
+    def has_position(self):
+        return bool(self.orders)
+
+    def buy(self, price=None):
+        self.orders.append(("buy", price))
+
+
+class AllowAll:
+    def can_trade(self):
+        return True
+
+
+def test_cycle_fetches_concurrently_and_orders_at_signal_close(monkeypatch):
+    statuses = []
+    monkeypatch.setattr(live_engine, "update_status", statuses.append)
+    executor = RecordingExecutor()
+    engine = LiveEngine(AlwaysEnter(), BarrierFeed(), executor, AllowAll())
+    snapshots = []
+    engine.metrics.save = snapshots.append
+
+    async def one_cycle():
+        await engine.cycle()
+        await asyncio.gather(*engine.background)
+
+    asyncio.run(one_cycle())
+    close = make_candles(n=300)["close"].iloc[-1]
+    assert executor.orders == [("buy", close)]
+    assert statuses[-1]["position"] == "LONG"
+    stages = snapshots[-1]["stages"]
+    for stage in ["fetch", "indicators", "inference", "risk", "order", "close_to_order", "cycle"]:
+        assert stages[stage]["count"] == 1
+
+
+class Tunable(AlwaysEnter):
+    def __init__(self):
+        self.params = []
+
+    def update_parameters(self, config):
+        self.params.append(config)
+
+
+def test_config_change_reaches_the_engine_without_waiting_for_a_candle(monkeypatch):
+    bus = StateChannel(f"t_{uuid.uuid4().hex[:10]}", size=4096)
+    monkeypatch.setattr(live_engine, "config_version", bus.version)
+    monkeypatch.setattr(live_engine, "load_config", lambda: bus.read()[1])
+    strategy = Tunable()
+    engine = LiveEngine(strategy, BarrierFeed(), RecordingExecutor(), AllowAll())
+
+    async def publish_and_wait():
+        watcher = asyncio.create_task(engine.watch_config())
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        bus.publish({"take_profit_pct": 2.0})
+        while not strategy.params and time.perf_counter() - started < 5:
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+        return time.perf_counter() - started
+
+    try:
+        elapsed = asyncio.run(publish_and_wait())
+    finally:
+        bus.unlink()
+        bus.close()
+    assert strategy.params == [{"take_profit_pct": 2.0}]
+    assert elapsed < 1.0
+
+
+class LaggingStreamFeed:
+    """Stream feed whose newest closed candle ended 50ms ago by the exchange clock,
+    while the host clock lags 200ms behind"""
+    def __init__(self, interval):
+        candles = make_candles(n=10)
+        exchange_now = time.time() + 0.2
+        opened = exchange_now - 0.05 - interval
+        step = pd.Timedelta(seconds=interval)
+        candles["timestamp"] = [pd.Timestamp(opened, unit='s') - step * (9 - i) for i in range(10)]
+        self.candles = candles
+
+    def wait_for_close(self, timeout=None):
+        return True
+
+    def get_latest(self, limit=None):
+        return self.candles
+
+
+def test_push_feed_keeps_the_candle_that_just_closed():
+    engine = LiveEngine(AlwaysEnter(), LaggingStreamFeed(300), RecordingExecutor(), AllowAll())
+    feed = engine.data_feed
+    assert len(engine.closed_candles(feed.get_latest())) == 10
+
+    class RestFeed:
+        pass
+    engine.data_feed = RestFeed()
+    assert len(engine.closed_candles(feed.get_latest())) == 9 # wall-clock cutoff still applies to REST
@@ -0,0 +1,66 @@
+import logging
+from logging.handlers import RotatingFileHandler
+
+from app.monitoring.logtail import LogTail
+
+
+def test_tail_starts_at_a_record_and_cursor_reads_only_new_lines(tmp_path):
+    path = tmp_path / "trading.log"
+    records = [f"2024-01-01 00:00:{i:02d} [INFO] decision {i}\n  prob=0.{i}\n" for i in range(30)]
+    path.write_text("".join(records))
+    tail = LogTail(str(path))
+
+    lines, cursor = tail.read(last=5)
+    assert lines[0].startswith("2024-01-01 00:00:28") # not the dangling "prob=" line
+    assert len(lines) == 4
+
+    with open(path, "a") as f:
+        f.write("2024-01-01 00:01:00 [INFO] next\npart")
+    lines, cursor = tail.read(cursor)
+    assert lines == ["2024-01-01 00:01:00 [INFO] next\n"]
+    assert tail.read(cursor) == ([], cursor)
+    with open(path, "a") as f:
+        f.write("ial\n")
+    assert tail.read(cursor)[0] == ["partial\n"]
+
+
+def test_cursor_follows_rotation(tmp_path):
+    path = tmp_path / "trading.log"
+    logger = logging.getLogger("logtail-test")
+    logger.propagate = False
+    handler = RotatingFileHandler(path, maxBytes=200, backupCount=2)
+    handler.setFormatter(logging.Formatter("2024-01-01 00:00:00 %(message)s"))
+    logger.addHandler(handler)
+    try:
+        tail = LogTail(str(path))
+        logger.warning("first")
+        lines, cursor = tail.read()
+        assert [l.split(" ", 2)[2] for l in lines] == ["first\n"]
+
+        for i in range(8): # rolls over once (~30 bytes per record)
+            logger.warning(f"message {i}")
+        lines, cursor = tail.read(cursor)
+        assert [l.split(" ", 2)[2] for l in lines] == [f"message {i}\n" for i in range(8)]
+        assert (tmp_path / "trading.log.1").exists()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def test_rotated_file_is_drained_before_the_new_one(tmp_path):
+    path = tmp_path / "trading.log"
+    old = [f"2024-01-01 00:00:{i:02d} old {i}\n" for i in range(10)]
+    path.write_text("".join(old))
+    tail = LogTail(str(path), max_bytes=100) # ~4 records per read
+    lines, cursor = tail.read(last=0)
+
+    with open(path, "a") as f:
+        f.write("".join(f"2024-01-01 00:01:{i:02d} more {i}\n" for i in range(10)))
+    path.rename(tmp_path / "trading.log.1")
+    path.write_text("2024-01-01 00:02:00 new\n")
+
+    seen = []
+    for _ in range(10):
+        lines, cursor = tail.read(cursor)
+        seen += lines
+    assert [l.split(" ", 2)[2] for l in seen] == [f"more {i}\n" for i in range(10)] + ["new\n"]
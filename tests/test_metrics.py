@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+
+from app.monitoring.metrics import LatencyHistogram, Metrics, prometheus_text, summarize
+
+
+def test_histogram_percentiles_within_bucket_error():
+    samples = np.random.default_rng(3).lognormal(mean=-4, sigma=1.0, size=20000)
+    hist = LatencyHistogram()
+    for s in samples:
+        hist.record(s)
+
+    for q in [50, 90, 99]:
+        exact = np.percentile(samples, q)
+        assert abs(hist.percentile(q) - exact) / exact < 0.04
+    assert hist.percentile(100) == samples.max()
+
+    copy = LatencyHistogram.from_dict(json.loads(json.dumps(hist.to_dict())))
+    assert copy.percentile(99) == hist.percentile(99)
+
+
+def test_prometheus_export_and_span_dump(tmp_path):
+    spans = tmp_path / "spans.jsonl"
+    metrics = Metrics(span_path=str(spans))
+    metrics.next_cycle()
+    for seconds in [0.002, 0.004, 0.2]:
+        metrics.record("fetch", seconds)
+    with metrics.span("order"):
+        pass
+
+    snapshot = metrics.snapshot()
+    metrics.save(snapshot, path=str(tmp_path / "metrics.json"))
+    text = prometheus_text(snapshot)
+    assert '# TYPE live_stage_seconds histogram' in text
+    assert 'live_stage_seconds_bucket{stage="fetch",le="0.005"} 2' in text
+    assert 'live_stage_seconds_bucket{stage="fetch",le="+Inf"} 3' in text
+    assert 'live_stage_seconds_count{stage="order"} 1' in text
+    assert summarize(snapshot)["fetch"]["count"] == 3
+
+    rows = [json.loads(line) for line in spans.read_text().splitlines()]
+    assert [r["stage"] for r in rows] == ["fetch", "fetch", "fetch", "order"]
+    assert all(r["cycle"] == 1 for r in rows)
+
+
+def test_prometheus_buckets_count_samples_just_below_the_bound():
+    hist = LatencyHistogram()
+    for seconds in [0.00499, 0.0099, 0.0249]:
+        hist.record(seconds)
+    assert hist.cumulative([0.001, 0.005, 0.01, 0.025]) == [0, 1, 2, 3]
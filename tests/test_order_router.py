@@ -0,0 +1,151 @@
+import pytest
+
+from app.execution.binance_spot import BinanceSpot
+from app.execution.matching import LocalMatchingEngine
+from app.execution.router import OrderRouter
+from app.execution.state import ExecutionState
+from app.monitoring.metrics import Metrics
+from app.storage.repository import TradeRepository
+
+
+def make_router(venue, **kwargs):
+    state = ExecutionState()
+    state.load_market(venue)
+    return OrderRouter(venue, state, timeout=1.0, poll_interval=0.5, sleep=lambda s: None, **kwargs)
+
+
+def test_post_only_fills_as_maker_and_saves_the_spread():
+    # Ask trades down through our bid on the second poll
+    venue = LocalMatchingEngine(100.0, 100.2, path=[(100.0, 100.2), (99.8, 100.0)])
+    router = make_router(venue)
+    result = router.execute("buy", 1.0)
+
+    assert result['filled'] == pytest.approx(1.0)
+    assert result['average'] == 100.0
+    assert result['maker'] == pytest.approx(1.0) and result['taker'] == 0
+    report = router.report()
+    assert report['fill_rate_pct'] == pytest.approx(100.0)
+    assert report['spread_saved'] == pytest.approx(0.2) # vs lifting the 100.2 ask at arrival
+    assert venue.balances['BTC'] == pytest.approx(1.0)
+
+
+def test_unfilled_post_is_chased_then_sent_at_market():
+    # Market drifts up and never comes back to our bids
+    venue = LocalMatchingEngine(100.0, 100.2, path=[(100.1 + 0.1 * i, 100.3 + 0.1 * i) for i in range(20)])
+    router = make_router(venue, max_chases=1)
+    result = router.execute("buy", 0.5)
+
+    posted = [o for o in venue.orders.values() if o['type'] == "limit"]
+    assert len(posted) == 2 and all(o['status'] == 'canceled' for o in posted)
+    assert result['taker'] == pytest.approx(0.5)
+    assert result['average'] == venue.ask
+    assert router.report()['fill_rate_pct'] == 0.0
+    assert router.report()['spread_saved'] < 0
+
+
+def test_large_orders_are_sliced():
+    venue = LocalMatchingEngine(100.0, 100.2, path=[(99.8, 100.0), (100.0, 100.2)] * 10)
+    router = make_router(venue, twap_notional=50.0, twap_slices=4)
+    result = router.execute("buy", 2.0)
+
+    assert result['filled'] == pytest.approx(2.0)
+    assert len([o for o in venue.orders.values() if o['status'] == 'closed']) == 4
+
+
+def test_submit_and_fill_are_timed_as_separate_stages():
+    venue = LocalMatchingEngine(100.0, 100.2, path=[(100.0, 100.2), (99.8, 100.0)])
+    metrics = Metrics()
+    router = make_router(venue, metrics=metrics)
+    router.execute("buy", 1.0)
+
+    stages = metrics.snapshot()['stages']
+    assert stages['order_submit']['count'] == 1 # one post-only order, acked
+    assert stages['order_fill']['count'] == 1 # then filled while resting
+
+
+def live_spot(tmp_path, venue):
+    spot = BinanceSpot(repository=TradeRepository(str(tmp_path / "trades.db"), migrate_csv=None))
+    spot.client, spot.live_mode, spot.exchange_exits = venue, True, True
+    spot.router = OrderRouter(venue, spot.state, timeout=1.0, poll_interval=0.5, sleep=lambda s: None)
+    spot.sync_position()
+    return spot
+
+
+def test_exchange_side_oco_closes_the_position(tmp_path):
+    venue = LocalMatchingEngine(100.0, 100.2, balances={'USDT': 1000.0, 'BTC': 0.0}, path=[(99.8, 100.0)])
+    spot = live_spot(tmp_path, venue)
+    spot.buy(price=100.0, barriers=(1.01, 0.99))
+    spot.reconciler.join(5)
+    assert spot.position.entry == 100.0
+    assert spot.bracket is not None
+
+    venue.set_quote(101.0, 101.2) # take-profit leg trades
+    spot.refresh_state()
+    assert spot.position is None and spot.bracket is None
+    assert len(spot.trades) == 1
+    assert spot.trades[0]['exit'] == 101.0
+    assert spot.trades[0]['pnl'] > 0
+    spot.repository.flush()
+    assert [t['label'] for t in spot.repository.trades()] == ["SELL (OCO)", "BUY"]
+
+
+def test_signal_exit_cancels_the_resting_oco(tmp_path):
+    venue = LocalMatchingEngine(100.0, 100.2, balances={'USDT': 1000.0, 'BTC': 0.0}, path=[(99.8, 100.0)])
+    spot = live_spot(tmp_path, venue)
+    spot.buy(price=100.0, barriers=(1.01, 0.99))
+    spot.reconciler.join(5)
+
+    venue.path = [(100.2, 100.4)] # ask trades up through our resting sell
+    spot.sell(price=100.2)
+    spot.reconciler.join(5)
+    oco_legs = [o for o in venue.orders.values() if o['side'] == "sell" and o['status'] == 'canceled']
+    assert len(oco_legs) == 2
+    assert spot.position is None
+    assert venue.balances['BTC'] == pytest.approx(0.0, abs=1e-5)
+
+
+def test_restart_restores_position_and_resting_oco(tmp_path):
+    venue = LocalMatchingEngine(100.0, 100.2, balances={'USDT': 1000.0, 'BTC': 0.0}, path=[(99.8, 100.0)])
+    spot = live_spot(tmp_path, venue)
+    spot.buy(price=100.0, barriers=(1.01, 0.99))
+    spot.reconciler.join(5)
+
+    restarted = live_spot(tmp_path, venue) # OCO locks all the BTC: free 0, total 9.9
+    assert restarted.position.size == pytest.approx(venue.balances['BTC'])
+    assert restarted.bracket == spot.bracket
+
+    venue.set_quote(101.0, 101.2)
+    restarted.refresh_state()
+    assert restarted.position is None and restarted.bracket is None
+    assert restarted.trades[0]['exit'] == 101.0
+    assert len(venue.order_lists) == 1
+
+
+def test_signal_exit_after_unbooked_oco_fill_books_it_instead(tmp_path):
+    venue = LocalMatchingEngine(100.0, 100.2, balances={'USDT': 1000.0, 'BTC': 0.0}, path=[(99.8, 100.0)])
+    spot = live_spot(tmp_path, venue)
+    spot.buy(price=100.0, barriers=(1.01, 0.99))
+    spot.reconciler.join(5)
+    list_id = spot.bracket[0]
+
+    venue.set_quote(101.0, 101.2) # TP fills before the next background refresh
+    assert spot.router.cancel_bracket(list_id) is False # "Unknown order list sent."
+    spot.sell(price=101.0)
+    assert spot.position is None and spot.bracket is None
+    assert spot.trades[0]['exit'] == 101.0
+    assert [o['type'] for o in venue.orders.values() if o['side'] == "sell"] == ["limit", "limit"] # no extra sell
+
+
+def test_sell_that_fills_nothing_keeps_the_position(tmp_path):
+    venue = LocalMatchingEngine(100.0, 100.2, balances={'USDT': 1000.0, 'BTC': 0.0}, path=[(99.8, 100.0)])
+    spot = live_spot(tmp_path, venue)
+    spot.exchange_exits = False
+    spot.buy(price=100.0)
+    spot.reconciler.join(5)
+    held = spot.state.free('BTC')
+
+    spot.router.execute = lambda side, amount: spot.router.new_result(side, amount, 100.0, 100.2) # nothing filled
+    spot.sell(price=100.0)
+    assert spot.position is not None
+    assert len(spot.trades) == 0
+    assert spot.state.free('BTC') == pytest.approx(held)
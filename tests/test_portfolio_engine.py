@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from app.engine.portfolio_engine import AlignedCandles, PortfolioEngine, Sleeve
+from app.storage.candle_store import CandleStore
+from strategies.btc_ml_strategy import BTCMLStrategy5m
+from test_backtest_engine import RSIModel, make_candles, run_engine
+
+
+def make_strategy():
+    strategy = BTCMLStrategy5m()
+    strategy.model = RSIModel()
+    strategy.threshold = 0.6
+    return strategy
+
+
+def test_single_sleeve_matches_backtest_engine():
+    df = make_candles()
+    candles = AlignedCandles.from_frames({"BTC/USDT": df}, 300_000)
+    for compounding in (False, True):
+        engine = PortfolioEngine(candles, [Sleeve("BTC/USDT", make_strategy(), 1.0)], compounding=compounding)
+        engine.run()
+        single = run_engine(make_strategy(), df, "vectorized", compounding=compounding)
+
+        assert len(engine.trades) == len(single.trades) > 0
+        assert [t['pnl'] for t in engine.trades] == [t['pnl'] for t in single.trades]
+        assert engine.equity == single.equity
+
+
+def test_aligned_store_array_fills_gaps_with_nan(tmp_path):
+    a = make_candles(500, seed=1)
+    b = make_candles(500, seed=2).drop(index=range(100, 110)).iloc[50:]
+    stores = {}
+    for symbol, df in [("BTC/USDT", a), ("ETH/USDT", b)]:
+        stores[symbol] = CandleStore(str(tmp_path / symbol.replace("/", "_")))
+        stores[symbol].append(df)
+
+    candles = AlignedCandles.from_stores(stores, 300_000, path=str(tmp_path / "aligned.npy"))
+    assert candles.values.shape == (5, 2, 500)
+    eth = candles.column("close", "ETH/USDT")
+    assert np.isnan(eth[:50]).all() and np.isnan(eth[100:110]).all()
+    assert np.array_equal(eth[110:], b["close"].to_numpy()[50:])
+    assert len(candles.frame("ETH/USDT")) == len(b)
+
+
+def test_correlation_cap_limits_same_symbol_sleeves():
+    df = make_candles()
+    candles = AlignedCandles.from_frames({"BTC/USDT": df}, 300_000)
+    sleeves = [Sleeve("BTC/USDT", make_strategy(), 0.5), Sleeve("BTC/USDT", make_strategy(), 0.5)]
+
+    # Two identical sleeves on one symbol: the cap only leaves room for one at a time
+    engine = PortfolioEngine(candles, sleeves, max_correlated_exposure=0.5)
+    engine.run()
+    assert engine.skipped['correlation'] > 0
+    trades = pd.DataFrame(engine.trades)
+    assert set(trades['sleeve']) == {sleeves[0].name}
@@ -0,0 +1,61 @@
+import pytest
+
+from app.storage.repository import TradeRepository
+
+
+def make_repo(tmp_path, **kwargs):
+    return TradeRepository(str(tmp_path / "trades.db"), migrate_csv=None, **kwargs)
+
+
+def test_writes_are_batched_and_pages_follow_the_ts_index(tmp_path):
+    repo = make_repo(tmp_path)
+    for i in range(120):
+        repo.add_trade("BUY" if i % 2 == 0 else "SELL", 100.0 + i, 0.5, pnl=None if i % 2 == 0 else 1.0, ts=i * 1000)
+    repo.flush()
+    assert repo.connect().execute("SELECT COUNT(*) FROM trades").fetchone()[0] == 120
+
+    first = repo.trades(limit=50)
+    assert [t['ts'] for t in first[:2]] == [119000, 118000]
+    second = repo.trades(limit=50, before=repo.page_key(first[-1]))
+    assert second[0]['ts'] == first[-1]['ts'] - 1000
+    assert len(repo.trades(limit=50, before=repo.page_key(second[-1]))) == 20
+
+    sells = repo.trades(start=10000, end=20000, side="sell")
+    assert [t['ts'] for t in sells] == [19000, 17000, 15000, 13000, 11000]
+    assert repo.since(118)[0]['ts'] == 118000
+
+    plan = " ".join(r[-1] for r in repo.connect().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM trades WHERE ts >= 0 ORDER BY ts DESC, id DESC LIMIT 50"))
+    assert "trades_ts" in plan
+
+
+def test_pnl_summary_and_buckets(tmp_path):
+    repo = make_repo(tmp_path)
+    repo.add_trade("BUY", 100.0, 1.0, ts=0)
+    repo.add_trade("SELL", 110.0, 1.0, pnl=10.0, ts=1000)
+    repo.add_trade("SELL", 95.0, 1.0, pnl=-5.0, ts=86_400_000 + 1000)
+    repo.flush()
+    summary = repo.pnl_summary()
+    assert summary['trades'] == 2 and summary['pnl'] == pytest.approx(5.0)
+    assert summary['win_rate'] == pytest.approx(50.0)
+    days = repo.pnl_summary(bucket_ms=86_400_000)
+    assert [(d['bucket'], d['pnl']) for d in days] == [(0, 10.0), (86_400_000, -5.0)]
+    assert repo.pnl_summary(start=86_400_000)['pnl'] == pytest.approx(-5.0)
+
+
+def test_legacy_csv_is_imported_once(tmp_path):
+    csv_path = tmp_path / "live_trades.csv"
+    csv_path.write_text(
+        "Timestamp,Side,Price,Size (BTC),Value (USDT),PnL (USDT),PnL (%)\n"
+        "2024-01-01 10:00:00,BUY (SIM),100.00,0.500000,50.00,,\n"
+        "2024-01-01 11:00:00,SELL (SIM),110.00,0.500000,55.00,5.00,10.00%\n"
+    )
+    repo = TradeRepository(str(tmp_path / "trades.db"), migrate_csv=str(csv_path))
+    assert repo.migrate_csv(str(csv_path)) == 0
+    assert TradeRepository(str(tmp_path / "trades.db"), migrate_csv=str(csv_path)).migrate_csv(str(csv_path)) == 0
+
+    sell, buy = repo.trades()
+    assert (sell['side'], sell['tag'], sell['label']) == ("SELL", "SIM", "SELL (SIM)")
+    assert sell['pnl'] == 5.0 and sell['pnl_pct'] == 10.0
+    assert buy['pnl'] is None
+    assert sell['ts'] - buy['ts'] == 3_600_000
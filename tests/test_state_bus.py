@@ -0,0 +1,95 @@
+import json
+import multiprocessing
+import threading
+import uuid
+
+import pytest
+
+from app.config import dynamic_config
+from app.config.state_bus import StateChannel
+from app.monitoring.events import EventHub
+
+
+@pytest.fixture
+def bus():
+    channel = StateChannel(f"t_{uuid.uuid4().hex[:10]}", size=4096)
+    yield channel
+    channel.unlink()
+    channel.close()
+
+
+def test_versioned_snapshots_and_no_torn_reads(bus):
+    assert bus.read() == (0, None)
+    assert bus.publish({"price": 1.0}) == 1
+    assert bus.read() == (1, {"price": 1.0})
+
+    stop = threading.Event()
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            bus.publish({"a": i, "b": i, "pad": "x" * (i % 1000)})
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        versions = []
+        for _ in range(2000):
+            version, data = bus.read()
+            if version > 1:
+                assert data["a"] == data["b"] and len(data["pad"]) == data["a"] % 1000
+            versions.append(version)
+        assert versions == sorted(versions)
+    finally:
+        stop.set()
+        thread.join()
+    with pytest.raises(ValueError):
+        bus.publish({"pad": "x" * 5000})
+
+
+def publish_from_child(name):
+    StateChannel(name).publish({"strategy_name": "btc_ml_1m"})
+
+
+def test_other_process_sees_the_change(bus):
+    version = bus.version()
+    child = multiprocessing.get_context("fork").Process(target=publish_from_child, args=(bus.name,))
+    child.start()
+    assert bus.wait(version, timeout=5)
+    child.join(5)
+    assert bus.read()[1] == {"strategy_name": "btc_ml_1m"}
+    assert not bus.wait(bus.version(), timeout=0.05)
+
+
+def test_event_hub_pushes_status_on_version_change(bus):
+    hub = EventHub({}, status_bus=bus, interval=60)
+    q = hub.subscribe()
+    backlog = dict(q.get_nowait() for _ in range(3))
+    assert backlog['status']["position"] == "FLAT" # defaults until the engine publishes
+    bus.publish({"price": 2.0, "position": "LONG"})
+    hub.poll()
+    hub.poll()
+    event, status = q.get_nowait()
+    assert event == 'status' and status["price"] == 2.0 and status["strategy"] == "Initializing..."
+    assert q.empty() # published once
+    hub.unsubscribe(q)
+
+
+def test_bus_setting_is_read_on_first_use_and_startup_reseeds_from_file(monkeypatch, tmp_path):
+    config_file = tmp_path / "config.json"
+    monkeypatch.setattr(dynamic_config, "CONFIG_FILE", str(config_file))
+    monkeypatch.setattr(dynamic_config, "_channels", {})
+    monkeypatch.setenv("STATE_BUS", "off") # set after import (as .env would be)
+    assert dynamic_config.channel("config") is None
+
+    monkeypatch.setattr(dynamic_config, "_channels", {})
+    monkeypatch.setenv("STATE_BUS", f"t_{uuid.uuid4().hex[:10]}")
+    bus = dynamic_config.channel("config")
+    try:
+        dynamic_config.save_config({"take_profit_pct": 2.0})
+        config_file.write_text(json.dumps({"take_profit_pct": 3.0})) # edited while the engine was stopped
+        assert dynamic_config.load_config() == {"take_profit_pct": 2.0}
+        assert dynamic_config.reload_config() == {"take_profit_pct": 3.0}
+        assert dynamic_config.load_config() == {"take_profit_pct": 3.0}
+    finally:
+        bus.unlink()
+        bus.close()
@@ -0,0 +1,45 @@
+from app.engine.sweep import heatmap, run_sweep
+from strategies.btc_ml_strategy import BTCMLStrategy1m
+from sweep_runner import parse_grid
+from test_backtest_engine import RSIModel, make_candles, run_engine
+
+
+def make_strategy():
+    strategy = BTCMLStrategy1m()
+    strategy.model = RSIModel()
+    strategy.threshold = 0.55
+    strategy.dynamic_tp = 0.004
+    strategy.dynamic_sl = 0.0035
+    return strategy
+
+
+def test_sweep_point_matches_backtest_engine():
+    df = make_candles(seed=11, freq="1min")
+    table = run_sweep(make_strategy(), df, tps=[0.003, 0.004], sls=[0.0035, 0.005],
+                      thresholds=[0.5, 0.55, 0.6], workers=2)
+    assert len(table) == 2 * 2 * 3 * 2
+
+    for compounding in (False, True):
+        engine = run_engine(make_strategy(), df, "vectorized", compounding=compounding)
+        row = table[(table['tp_pct'] == 0.4) & (table['sl_pct'] == 0.35) &
+                    (table['threshold'] == 0.55) & (table['compounding'] == compounding)].iloc[0]
+        expected = engine.summary()
+        assert row['trades'] == expected['trades']
+        assert row['final_equity'] == expected['final_equity']
+        assert row['max_drawdown_pct'] == expected['max_drawdown_pct']
+
+
+def test_sweep_ranking_and_heatmap():
+    df = make_candles(3000, seed=4, freq="1min")
+    table = run_sweep(make_strategy(), df, tps=[0.003, 0.006], sls=[0.003, 0.006, 0.009],
+                      thresholds=[0.5, 0.6], compounding_modes=(False,), workers=1)
+    assert table['return_pct'].is_monotonic_decreasing
+
+    grid = heatmap(table)
+    assert list(grid.index) == [0.3, 0.6]
+    assert list(grid.columns) == [0.3, 0.6, 0.9]
+
+
+def test_parse_grid():
+    assert parse_grid("0.3:0.6:0.1", 0.01) == [0.003, 0.004, 0.005, 0.006]
+    assert parse_grid("0.5,0.75") == [0.5, 0.75]
@@ -0,0 +1,28 @@
+import numpy as np
+
+from scripts.train_model import feature_engineering, parallel_search
+from app.market.features import FEATURES
+from test_backtest_engine import make_candles
+
+def test_parallel_search_ranks_candidates():
+    df = feature_engineering(make_candles(3000, seed=2)).dropna()
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    y = df["target"].to_numpy()
+
+    results = parallel_search(X, y, ratio=1.0, n_iter=3, cv=2, n_jobs=1, early_stopping_rounds=5)
+
+    assert len(results) == 3
+    scores = [r["score"] for r in results]
+    assert scores == sorted(scores, reverse=True)
+    for r in results:
+        # Early stopping never grows past the sampled upper bound
+        assert 1 <= r["n_estimators"] <= r["params"]["n_estimators"]
+
+def test_parallel_search_stops_at_budget():
+    df = feature_engineering(make_candles(2000, seed=3)).dropna()
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    y = df["target"].to_numpy()
+
+    # A tiny budget still evaluates the first batch, then stops
+    results = parallel_search(X, y, ratio=1.0, n_iter=10, cv=2, n_jobs=1, budget_seconds=1e-9, early_stopping_rounds=5)
+    assert len(results) == 1
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from app.engine.backtest_engine import BacktestEngine
+from strategies.btc_ml_strategy import BTCMLStrategy5m
+from walk_forward_runner import make_windows, walk_forward
+from test_backtest_engine import RSIModel, make_candles
+
+
+def test_windows_roll_without_overlapping_tests():
+    ts = make_candles(30 * 288)["timestamp"]
+    windows = make_windows(ts, train_days=10, test_days=5)
+
+    assert len(windows) == 3
+    for train_start, train_end, test_end in windows:
+        assert train_end - train_start == pd.Timedelta(days=10)
+        assert test_end - train_end == pd.Timedelta(days=5)
+        assert test_end <= ts.max()
+    # Default step = test length: test windows tile the timeline
+    assert all(a[2] == b[1] for a, b in zip(windows, windows[1:]))
+
+
+def test_trade_start_skips_warmup_rows():
+    strategy = BTCMLStrategy5m()
+    strategy.model = RSIModel()
+    strategy.threshold = 0.6
+    df = make_candles()
+    start = df["timestamp"].iloc[3000]
+
+    engine = BacktestEngine(strategy, df.copy(), trade_start=start)
+    engine.run()
+    assert engine.trades
+    assert min(t['entry_time'] for t in engine.trades) >= start
+
+
+def test_walk_forward_retrains_per_window():
+    data = make_candles(24 * 288, seed=5)
+    results = walk_forward(data, "ml_5m", train_days=10, test_days=4, workers=1)
+
+    assert list(results['window']) == list(range(len(results)))
+    assert len(results) == 3
+    assert (results['model'] == 'retrained').all()
+    assert (results['test_start'] > results['train_start']).all()
+    assert {'trades', 'win_rate', 'return_pct', 'max_drawdown_pct'} <= set(results.columns)
@@ -0,0 +1,170 @@
+from app.engine.backtest_engine import BacktestEngine
+from strategies.btc_ml_strategy import BTCMLStrategy5m, BTCMLStrategy1m
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import sys
+sys.path.append(os.getcwd()) # Ensure root is in path
+from backtest_runner import load_data
+from scripts.train_model import feature_engineering, select_threshold
+from app.market.features import FEATURES
+from xgboost import XGBClassifier
+
+# Walk-forward optimization: train on a rolling window, trade the window right after it,
+# slide forward by `step` and repeat. Every test window is out-of-sample for its model,
+# so the per-window table shows how stable the edge is across market regimes.
+
+STRATEGIES = {"ml_5m": (BTCMLStrategy5m, "5m"), "ml_1m": (BTCMLStrategy1m, "1m")}
+
+# Fixed model params for per-window retraining (full searches live in train_model.py)
+WINDOW_PARAMS = {'n_estimators': 200, 'learning_rate': 0.05, 'max_depth': 5, 'subsample': 0.8, 'colsample_bytree': 0.8}
+
+# Candles before each test window used only to warm up indicators (SMA 200 + engine lookback)
+WARMUP_CANDLES = 2 * BacktestEngine.min_lookback
+
+def make_windows(timestamps, train_days, test_days, step_days=None):
+    """Rolling (train_start, train_end, test_end) timestamps; train is [start, end), test is [end, test_end)"""
+    step = pd.Timedelta(days=step_days or test_days)
+    train = pd.Timedelta(days=train_days)
+    test = pd.Timedelta(days=test_days)
+    first, last = pd.Timestamp(timestamps.min()), pd.Timestamp(timestamps.max())
+
+    windows = []
+    train_start = first
+    while train_start + train + test <= last:
+        windows.append((train_start, train_start + train, train_start + train + test))
+        train_start += step
+    return windows
+
+def train_window(train_df, strategy_type, min_signals=50):
+    """XGBoost model + threshold from one training window.
+    The last 20% of the window (chronological, no shuffling) picks the threshold."""
+    df = feature_engineering(train_df, strategy_type)
+    breakouts = df[df["breakout"] == True].dropna(subset=FEATURES)
+    if len(breakouts) < 20 or breakouts["target"].nunique() < 2:
+        return None, None
+
+    split = int(len(breakouts) * 0.8)
+    X_fit, y_fit = breakouts[FEATURES].iloc[:split], breakouts["target"].iloc[:split]
+    X_val, y_val = breakouts[FEATURES].iloc[split:], breakouts["target"].iloc[split:]
+
+    ratio = float(np.sum(y_fit == 0)) / max(1, np.sum(y_fit == 1))
+    clf = XGBClassifier(**WINDOW_PARAMS, scale_pos_weight=ratio, random_state=42, eval_metric='logloss',
+                        tree_method='hist', n_jobs=1)
+    clf.fit(X_fit, y_fit)
+
+    threshold, _, _ = select_threshold(y_val, clf.predict_proba(X_val)[:, 1], min_trades=min_signals)
+    return clf, threshold
+
+def run_window(job):
+    """One walk-forward step (runs in a worker process). Returns a results-table row."""
+    started = time.time()
+    strategy_name, window_id, train_df, test_df, test_start, retrain, compounding = job
+    strategy_cls, strategy_type = STRATEGIES[strategy_name]
+
+    # Engine/strategy output of parallel workers would interleave; keep only the table
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy = strategy_cls()
+        if retrain:
+            # Too few breakouts to train leaves the window without a model (no trades)
+            strategy.model, threshold = train_window(train_df, strategy_type)
+            if strategy.model is not None:
+                strategy.threshold = threshold
+
+        engine = BacktestEngine(strategy, test_df, compounding=compounding, trade_start=test_start)
+        if strategy.model is not None:
+            engine.run()
+
+    row = {
+        'window': window_id,
+        'train_start': train_df["timestamp"].iloc[0],
+        'test_start': test_start,
+        'test_end': test_df["timestamp"].iloc[-1],
+        'model': ('retrained' if retrain else 'shipped') if strategy.model is not None else 'none',
+        'threshold': round(float(strategy.threshold), 3),
+    }
+    row.update(engine.summary())
+    row['seconds'] = round(time.time() - started, 1)
+    return row
+
+def walk_forward(data, strategy_name="ml_5m", train_days=60, test_days=14, step_days=None,
+                 retrain=True, compounding=False, workers=None):
+    """Runs every window in a process pool. Returns the per-window results table."""
+    data = data.sort_values("timestamp").reset_index(drop=True)
+    timestamps = data["timestamp"]
+
+    jobs = []
+    for window_id, (train_start, train_end, test_end) in enumerate(make_windows(timestamps, train_days, test_days, step_days)):
+        train_df = data[(timestamps >= train_start) & (timestamps < train_end)].reset_index(drop=True)
+        # Test slice carries WARMUP_CANDLES of history so indicators are valid at the first test candle
+        test_lo = max(0, int(np.searchsorted(timestamps, train_end)) - WARMUP_CANDLES)
+        test_hi = int(np.searchsorted(timestamps, test_end))
+        test_df = data.iloc[test_lo:test_hi].reset_index(drop=True)
+        jobs.append((strategy_name, window_id, train_df, test_df, train_end, retrain, compounding))
+
+    if not jobs:
+        print("Not enough data for a single train/test window.")
+        return pd.DataFrame()
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Running {len(jobs)} walk-forward windows ({train_days}d train / {test_days}d test) on {workers} workers...")
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for row in pool.map(run_window, jobs):
+            print(f"Window {row['window']}: {row['test_start']:%Y-%m-%d} | Trades: {row['trades']} | "
+                  f"Return: {row['return_pct']:.2f}% | WR: {row['win_rate']:.1f}% | {row['seconds']}s")
+            rows.append(row)
+
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward optimization over rolling train/test windows")
+    parser.add_argument("data_path", nargs="?", default="data/historical/BTC_USDT_5m.csv", help="Path to historical data CSV")
+    parser.add_argument("--strategy", type=str, default="ml_5m", choices=list(STRATEGIES), help="Strategy to run")
+    parser.add_argument("--days", type=int, default=365, help="Days of history to use")
+    parser.add_argument("--train-days", type=int, default=60, help="Training window length")
+    parser.add_argument("--test-days", type=int, default=14, help="Out-of-sample test window length")
+    parser.add_argument("--step-days", type=int, default=None, help="Window step (default: test window length)")
+    parser.add_argument("--reuse-model", action="store_true", help="Backtest the shipped model in every window instead of retraining")
+    parser.add_argument("--compounding", action="store_true", help="Enable compounding (reinvest profits)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output", type=str, default="data/walk_forward", help="Directory for the results table")
+    args = parser.parse_args()
+
+    timeframe = STRATEGIES[args.strategy][1]
+    if args.data_path == "data/historical/BTC_USDT_5m.csv" and timeframe == "1m":
+        args.data_path = "data/historical/BTC_USDT_1m.csv"
+
+    print(f"Loading data from {args.data_path} (Last {args.days} Days)...")
+    data = load_data(args.data_path, timeframe=timeframe, days=args.days)
+    if data is None:
+        return
+
+    results = walk_forward(data, args.strategy, args.train_days, args.test_days, args.step_days,
+                           retrain=not args.reuse_model, compounding=args.compounding, workers=args.workers)
+    if results.empty:
+        return
+
+    print("\n--- Walk-Forward Results ---")
+    print(results.drop(columns=['seconds']).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    # Stability across regimes
+    print("\n--- Stability ---")
+    print(f"Profitable Windows: {(results['return_pct'] > 0).sum()}/{len(results)}")
+    print(f"Return per Window: mean {results['return_pct'].mean():.2f}% | std {results['return_pct'].std():.2f}% | "
+          f"worst {results['return_pct'].min():.2f}%")
+    print(f"Worst Drawdown: {results['max_drawdown_pct'].min():.2f}%")
+
+    os.makedirs(args.output, exist_ok=True)
+    out_path = os.path.join(args.output, f"{args.strategy}_{pd.Timestamp.now():%Y%m%d_%H%M%S}.csv")
+    results.to_csv(out_path, index=False)
+    print(f"Results saved to {out_path}")
+
+if __name__ == "__main__":
+    main()